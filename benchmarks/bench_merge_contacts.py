@@ -0,0 +1,132 @@
+"""
+Benchmark merge_contacts_into_main against the old row-by-row implementation
+and check that both produce identical output.
+
+    python -m benchmarks.bench_merge_contacts [--scale 20]
+
+--scale repeats the input files with fresh org numbers to simulate larger extracts.
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from src.utils.merge_contacts import (
+    merge_contacts_into_main, _norm_orgnr, _has_value, _emails_to_list, _dedupe_emails,
+)
+
+MAIN_CSV = "data/details/details_rev-2000-2000000_nump-2000_sort-revenueDesc.csv"
+OTHER_CSV = "data/old/cccc.csv"
+
+
+def reference_merge_contacts_into_main(
+    main_csv: str,
+    other_csv: str,
+    *,
+    key: str = "org_number",
+    website_col: str = "website",
+    emails_col: str = "emails",
+):
+    """
+    The original iterrows() implementation, kept as the reference for the output.
+    """
+    main = pd.read_csv(main_csv, dtype=str)
+    other = pd.read_csv(other_csv, dtype=str)
+
+    if website_col not in main.columns:
+        main[website_col] = ""
+    if emails_col not in main.columns:
+        main[emails_col] = "[]"
+    if website_col not in other.columns:
+        other[website_col] = ""
+    if emails_col not in other.columns:
+        other[emails_col] = "[]"
+
+    main["_k"] = main[key].apply(_norm_orgnr)
+    other["_k"] = other[key].apply(_norm_orgnr)
+
+    main[website_col] = main[website_col].fillna("").astype(str).str.strip()
+    other[website_col] = other[website_col].fillna("").astype(str).str.strip()
+
+    main[emails_col] = main[emails_col].apply(_emails_to_list)
+    other[emails_col] = other[emails_col].apply(_emails_to_list)
+
+    other_map: dict[str, dict[str, object]] = {}
+    for _, r in other.iterrows():
+        k = r["_k"]
+        if not k:
+            continue
+
+        w = r[website_col]
+        e = _dedupe_emails(r[emails_col])
+
+        if k not in other_map:
+            other_map[k] = {"website": w, "emails": e}
+        else:
+            if not _has_value(other_map[k]["website"]) and _has_value(w):
+                other_map[k]["website"] = w
+            other_map[k]["emails"] = _dedupe_emails(list(other_map[k]["emails"]) + e)
+
+    for i, r in main.iterrows():
+        k = r["_k"]
+        if not k or k not in other_map:
+            main.at[i, emails_col] = _dedupe_emails(r[emails_col])
+            continue
+
+        src = other_map[k]
+
+        if not _has_value(r[website_col]) and _has_value(src["website"]):
+            main.at[i, website_col] = src["website"]
+
+        merged = _dedupe_emails(r[emails_col] + list(src["emails"]))
+        main.at[i, emails_col] = merged
+
+    return main.drop(columns="_k")
+
+
+def scaled_copy(csv_path: str, scale: int, out_dir: Path) -> str:
+    """
+    `scale` copies of the file, each with its org numbers shifted so keys stay unique
+    per copy but still line up between the main and other file.
+    """
+    if scale == 1:
+        return csv_path
+    df = pd.read_csv(csv_path, dtype=str)
+    copies = []
+    for i in range(scale):
+        c = df.copy()
+        c["org_number"] = c["org_number"].fillna("").map(lambda s: f"{i:02d}{s}" if s else s)
+        copies.append(c)
+    out = out_dir / f"x{scale}_{Path(csv_path).name}"
+    pd.concat(copies, ignore_index=True).to_csv(out, index=False)
+    return str(out)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def run(scale: int = 1, main_csv: str = MAIN_CSV, other_csv: str = OTHER_CSV):
+    with tempfile.TemporaryDirectory() as tmp:
+        main_path = scaled_copy(main_csv, scale, Path(tmp))
+        other_path = scaled_copy(other_csv, scale, Path(tmp))
+
+        expected, t_ref = timed(reference_merge_contacts_into_main, main_path, other_path)
+        result, t_new = timed(merge_contacts_into_main, main_path, other_path)
+
+    pd.testing.assert_frame_equal(result, expected)
+    print(f"* rows= {len(result)}\treference= {t_ref:.3f}s\tvectorized= {t_new:.3f}s\tspeedup= {t_ref / t_new:.1f}x\t(identical output)")
+    return t_ref, t_new
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--main", default=MAIN_CSV)
+    parser.add_argument("--other", default=OTHER_CSV)
+    args = parser.parse_args()
+    run(args.scale, args.main, args.other)
@@ -0,0 +1,188 @@
+"""
+Offline benchmarks for the scrape and merge hot paths.
+
+    python -m benchmarks.run [-k merge] [--rounds 5] [--latency 0.02] [--error-rate 0.01]
+                             [--save results.json] [--compare baseline.json]
+
+Scrape cases run against the local stand-in (benchmarks/stand_in.py), with the
+http cache off. Each case is timed over --rounds rounds and reports the median,
+the min and the throughput (items/sec), then one more round under tracemalloc
+gives the peak python memory. --compare prints the change against a saved run
+and exits non-zero when a case got slower than --threshold.
+"""
+import argparse
+import contextlib
+import gc
+import json
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from benchmarks.stand_in import StandInServer, routed_to
+from src.scrape.setup import Concurrency
+
+MAIN_CSV = "data/details/details_rev-2000-2000000_nump-2000_sort-revenueDesc.csv"
+OTHER_CSV = "data/old/cccc.csv"
+
+CASES = {}
+
+
+def case(name):
+    """
+    Register a benchmark. The function gets the run options and returns
+    (fn, items): fn() is what gets timed, items is what one call processes.
+    """
+    def register(setup):
+        CASES[name] = setup
+        return setup
+    return register
+
+
+# ===============================
+# SCRAPE CASES (stand-in server)
+# ===============================
+@case("get_company_links")
+def bench_company_links(opts):
+    from src.scrape.scrape_allabolag import get_company_links
+    pages = range(1, opts.pages + 1)
+    return lambda: [get_company_links(p, use_cache=False) for p in pages], opts.pages
+
+
+@case("extract_company_details")
+def bench_company_details(opts):
+    from src.scrape.scrape_allabolag import extract_company_details
+    companies = opts.server.profile_urls(opts.profiles)
+    return lambda: [extract_company_details(dict(c), use_cache=False) for c in companies], len(companies)
+
+
+@case("extract_many_company_details")
+def bench_many_company_details(opts):
+    from src.scrape.scrape_allabolag import extract_many_company_details
+    companies = opts.server.profile_urls(opts.profiles)
+
+    def run():
+        return list(extract_many_company_details(
+            [dict(c) for c in companies], workers=Concurrency.WORKERS.value, rate=1000.0, use_cache=False,
+        ))
+    return run, len(companies)
+
+
+@case("find_emails_on_website")
+def bench_find_emails(opts):
+    from src.scrape.scrape_mail import find_emails_on_website
+    urls = [opts.server.site_url(r["_org"]) for r in opts.server.rows[:opts.sites]]
+    return lambda: [find_emails_on_website(u, use_cache=False) for u in urls], len(urls)
+
+
+# ===============================
+# FILE CASES
+# ===============================
+@case("merge_contacts_into_main")
+def bench_merge_contacts(opts):
+    from src.utils.merge_contacts import merge_contacts_into_main
+    rows = sum(1 for _ in open(MAIN_CSV, encoding="utf-8")) - 1
+    return lambda: merge_contacts_into_main(MAIN_CSV, OTHER_CSV), rows
+
+
+@case("snicode")
+def bench_snicode(opts):
+    from src.utils import snicode
+    out_dir = tempfile.mkdtemp(prefix="bench-")
+
+    def run():
+        with contextlib.redirect_stdout(None):
+            snicode.run(OTHER_CSV, f"{out_dir}/unique.csv", f"{out_dir}/map.csv")
+    rows = sum(1 for _ in open(OTHER_CSV, encoding="utf-8")) - 1
+    return run, rows
+
+
+# ===============================
+# RUNNER
+# ===============================
+def measure(fn, items: int, rounds: int) -> dict:
+    fn()  # warm up (imports, connection pools, page cache)
+    times = []
+    for _ in range(rounds):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    median = statistics.median(times)
+    return {
+        "items": items,
+        "rounds": rounds,
+        "min_s": round(min(times), 6),
+        "median_s": round(median, 6),
+        "items_per_s": round(items / median, 2) if median else None,
+        "peak_mb": round(peak / 1024 ** 2, 2),
+    }
+
+
+def report(results: dict, baseline: dict | None, threshold: float) -> list[str]:
+    slower = []
+    print(f"\n{'case':32} {'items':>7} {'median':>10} {'min':>10} {'items/s':>10} {'peak MB':>8}  vs baseline")
+    for name, r in results.items():
+        change = ""
+        if baseline and name in baseline:
+            ratio = r["median_s"] / baseline[name]["median_s"] - 1
+            change = f"{ratio:+.1%}"
+            if ratio > threshold:
+                change += "  << slower"
+                slower.append(name)
+        print(f"{name:32} {r['items']:>7} {r['median_s']:>9.3f}s {r['min_s']:>9.3f}s "
+              f"{r['items_per_s'] or 0:>10.1f} {r['peak_mb']:>8.1f}  {change}")
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", dest="select", default="", help="only cases whose name contains this")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--pages", type=int, default=20, help="listing pages per round")
+    parser.add_argument("--profiles", type=int, default=100, help="profiles per round")
+    parser.add_argument("--sites", type=int, default=20, help="company websites per round")
+    parser.add_argument("--latency", type=float, default=0.0, help="stand-in latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of 503 answers")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save", help="write the results as JSON")
+    parser.add_argument("--compare", help="JSON from an earlier --save")
+    parser.add_argument("--threshold", type=float, default=0.10, help="slowdown that counts as a regression")
+    opts = parser.parse_args(argv)
+
+    names = [n for n in CASES if opts.select in n]
+    baseline = json.loads(Path(opts.compare).read_text())["results"] if opts.compare else None
+
+    results = {}
+    with StandInServer(latency=opts.latency, jitter=opts.jitter, error_rate=opts.error_rate, seed=opts.seed) as server, \
+            routed_to(server):
+        opts.server = server
+        for name in names:
+            fn, items = CASES[name](opts)
+            print(f"* {name} ...", flush=True)
+            results[name] = measure(fn, items, opts.rounds)
+
+    slower = report(results, baseline, opts.threshold)
+    if opts.save:
+        meta = {k: v for k, v in vars(opts).items() if k not in ("server", "save", "compare")}
+        Path(opts.save).parent.mkdir(parents=True, exist_ok=True)
+        Path(opts.save).write_text(json.dumps({"options": meta, "python": sys.version.split()[0], "results": results}, indent=2))
+        print(f"\n✅ Saved {opts.save}")
+    if slower:
+        print(f"\n❌ Slower than {opts.compare} by more than {opts.threshold:.0%}: {', '.join(slower)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
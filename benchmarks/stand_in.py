@@ -0,0 +1,297 @@
+"""
+Local stand-in for allabolag.se and company websites, for offline benchmarks.
+
+    with StandInServer(latency=0.05, error_rate=0.01) as server, routed_to(server):
+        get_company_links(1, use_cache=False)          # served by the stand-in
+        find_emails_on_website(server.site_url(org))   # a fake company website
+
+Pages come from recordings in benchmarks/fixtures/ when there are any
+(python -m benchmarks.stand_in --record N saves real pages there), otherwise
+they are rendered from the rows of a companies CSV with the same markup the
+parsers read (listings honour revenueFrom/revenueTo). Latency (with jitter) and the share of 503 answers are configurable
+and seeded, so runs are reproducible; with max_rate, requests above that rate
+get a 429 with Retry-After, like a rate-limiting server.
+"""
+import argparse
+import html
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from urllib.parse import urlsplit, urlunsplit, parse_qs, quote
+
+import pandas as pd
+from requests.adapters import HTTPAdapter
+
+from src.scrape import http_client
+from src.scrape.setup import AllaBolag
+from src.utils.helpers import str_to_list
+
+FIXTURES = Path(__file__).parent / "fixtures"
+DATA_CSV = "data/old/cccc.csv"  # companies with the FIELDNAMES columns in order
+PAGE_SIZE = 10  # cards per result page, as on allabolag
+
+_ORG = re.compile(r"/(\d{10})/?$")
+
+
+def _e(v) -> str:
+    return html.escape("" if pd.isna(v) else str(v))
+
+
+def render_listing(rows) -> str:
+    cards = "".join(
+        f'<div class="SegmentationSearchResultCard-card"><a href="/foretag/{quote(str(r["name"]).lower().replace(" ", "-"))}'
+        f'/{quote(str(r["city"]).lower())}/-/{r["_org"]}">{_e(r["name"])}</a></div>'
+        for r in rows
+    )
+    return f"<html><body><div>{cards}</div></body></html>"
+
+
+def render_profile(r, site_url: str) -> str:
+    def official(key, value):
+        return (f'<span class="OfficialCompanyInformationCard-propertyList"><span class="OfficialCompanyInformationCard-property">{key}</span>'
+                f'<span class="OfficialCompanyInformationCard-propertyValue">{value}</span></span>')
+
+    def contact(key, value):
+        return (f'<span class="ContactInformationCard-smallPropertyList"><span class="ContactInformationCard-smallProperty">{key}</span>'
+                f'<span class="ContactInformationCard-smallPropertyValue">{value}</span></span>')
+
+    sni = "".join(f'<a href="/bransch?naceIndustry={_e(s[:5])}">{_e(s)}</a>' for s in str_to_list(r.get("sni_codes")))
+    return (
+        "<html><body>"
+        '<table class="AccountFiguresWidget-accountingtable"><tr><th>År</th><td>2024</td></tr>'
+        f'<tr><th>Omsättning <span>(tkr)</span></th><td>{_e(r.get("revenue"))}</td></tr></table>'
+        "<div>"
+        + official("Juridiskt namn", _e(r.get("legal_name")))
+        + official("Organisationsnummer", _e(r.get("org_number")))
+        + official("Registreringsdatum", _e(r.get("registration_date")))
+        + official("Bolagsform", _e(r.get("company_type")))
+        + official("Antal anställda", _e(r.get("employees")))
+        + official("Aktiekapital", _e(r.get("share_capital")))
+        + official("Adress", _e(r.get("address")))
+        + official("Postadress", _e(r.get("postal_address")))
+        + official("Verkställande direktör", _e(r.get("ceo")))
+        + official("Branscher", sni)
+        + "</div>"
+        + contact("Telefon", _e(r.get("phone")))
+        + contact("Hemsida", f'<a href="{_e(site_url)}">{_e(site_url)}</a>')
+        + '<div class="MuiGrid-root MuiGrid-direction-xs-row MuiGrid-grid-xs-12 MuiTypography-root '
+        f'MuiTypography-body2 mui-18twy0e">{_e(r.get("business_purpose"))}</div>'
+        "</body></html>"
+    )
+
+
+def render_site(org: str, page: str) -> str | None:
+    if page == "":
+        return (f"<html><body><h1>Välkommen</h1><p>{'Lorem ipsum dolor sit amet. ' * 40}</p>"
+                '<a href="/">Hem</a><a href="kontakt">Kontakta oss</a></body></html>')
+    if page == "kontakt":
+        return (f"<html><body><p>Ring eller maila oss: info@{org}.se, "
+                f"order@{org}.se</p><p>{'Lorem ipsum. ' * 40}</p></body></html>")
+    return None
+
+
+class StandInServer:
+    def __init__(self, data_csv: str = DATA_CSV, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, seed: int = 1, fixtures: Path = FIXTURES, limit: int | None = None,
+                 max_rate: float | None = None):
+        df = pd.read_csv(data_csv, dtype=str, nrows=limit)
+        df["_org"] = df["org_number"].fillna("").str.replace(r"\D", "", regex=True)
+        df["_revenue"] = pd.to_numeric(df["revenue"].str.replace(r"[^\d-]", "", regex=True), errors="coerce").fillna(0)
+        self.rows = df[df["_org"].str.len() == 10].to_dict(orient="records")
+        self.by_org = {r["_org"]: r for r in self.rows}
+        self.latency, self.jitter, self.error_rate = latency, jitter, error_rate
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+        self.fixtures = fixtures
+        self.requests = 0
+        self.throttled = 0
+        self.max_rate = max_rate
+        self.allowance = max_rate or 0.0
+        self.allowance_at = time.monotonic()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                status, body = server.respond(self.path)
+                data = body.encode("utf-8")
+                self.send_response(status)
+                if status == 429:
+                    self.send_header("Retry-After", "1")
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.address = f"127.0.0.1:{self.httpd.server_address[1]}"
+
+    # --- URLs ---
+    def site_url(self, org: str) -> str:
+        return f"http://{self.address}/site/{org}"
+
+    def profile_urls(self, n: int | None = None) -> list[dict]:
+        rows = self.rows[:n] if n else self.rows
+        return [{"name": r["name"], "profile_url": f"{AllaBolag.BASE_URL.value}/foretag/x/-/{r['_org']}"} for r in rows]
+
+    # --- responses ---
+    def _fixture(self, name: str) -> str | None:
+        path = self.fixtures / name
+        return path.read_text(encoding="utf-8") if path.exists() else None
+
+    def _in_revenue_band(self, lo, hi) -> list[dict]:
+        if lo is None and hi is None:
+            return self.rows
+        lo = float(lo) if lo is not None else float("-inf")
+        hi = float(hi) if hi is not None else float("inf")
+        return [r for r in self.rows if lo <= r["_revenue"] <= hi]
+
+    def respond(self, path: str) -> tuple[int, str]:
+        with self.random_lock:
+            self.requests += 1
+            delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+            failed = self.random.random() < self.error_rate
+            if self.max_rate:
+                now = time.monotonic()
+                self.allowance = min(self.max_rate, self.allowance + (now - self.allowance_at) * self.max_rate)
+                self.allowance_at = now
+                if self.allowance < 1:
+                    self.throttled += 1
+                    return 429, "<html><body>Too Many Requests</body></html>"
+                self.allowance -= 1
+        if delay:
+            time.sleep(delay)
+        if failed:
+            return 503, "<html><body>Service Unavailable</body></html>"
+
+        url = urlsplit(path)
+        if url.path == "/segmentering":
+            query = parse_qs(url.query)
+            page = int(query.get("page", ["1"])[0])
+            recorded = self._fixture(f"segmentering-{page}.html")
+            if recorded is not None:
+                return 200, recorded
+            rows = self._in_revenue_band(query.get("revenueFrom", [None])[0], query.get("revenueTo", [None])[0])
+            return 200, render_listing(rows[(page - 1) * PAGE_SIZE:page * PAGE_SIZE])
+        if url.path.startswith("/foretag/"):
+            match = _ORG.search(url.path)
+            org = match.group(1) if match else ""
+            recorded = self._fixture(f"profile-{org}.html")
+            if recorded is not None:
+                return 200, recorded
+            row = self.by_org.get(org)
+            if row is None:
+                return 404, "<html><body>Not found</body></html>"
+            return 200, render_profile(row, self.site_url(org))
+        if url.path.startswith("/site/"):
+            parts = url.path.split("/")
+            org, page = parts[2], "/".join(parts[3:])
+            body = render_site(org, page) if org in self.by_org else None
+            return (200, body) if body is not None else (404, "<html><body>Not found</body></html>")
+        return 404, "<html><body>Not found</body></html>"
+
+    # --- lifecycle ---
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _RouteAdapter(HTTPAdapter):
+    """
+    Sends every request to `address` over plain http, keeping path and query.
+    """
+    def __init__(self, address: str, **kwargs):
+        super().__init__(**kwargs)
+        self.address = address
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        request.url = urlunsplit(("http", self.address, parts.path, parts.query, ""))
+        return super().send(request, **kwargs)
+
+
+@contextmanager
+def routed_to(server: StandInServer, prefix: str = AllaBolag.BASE_URL.value):
+    """
+    Route the shared http_client session's requests for `prefix` to the stand-in,
+    with the same retry policy as the real adapter.
+    """
+    session = http_client.get_session()
+    retries = session.get_adapter("https://").max_retries
+    session.mount(prefix, _RouteAdapter(server.address, max_retries=retries))
+    try:
+        yield server
+    finally:
+        session.adapters.pop(prefix, None)
+
+
+def _fixture_name(url: str) -> str | None:
+    parts = urlsplit(url)
+    if parts.path == "/segmentering":
+        return f"segmentering-{parse_qs(parts.query).get('page', ['1'])[0]}.html"
+    match = _ORG.search(parts.path)
+    return f"profile-{match.group(1)}.html" if match else None
+
+
+def record(pages: int = 1, profiles: int = 20, fixtures: Path = FIXTURES):
+    """
+    Save real listing pages and the profiles on them as fixtures (needs network).
+    """
+    from src.scrape.scrape_allabolag import get_company_links, fetch_company_page
+
+    fixtures.mkdir(parents=True, exist_ok=True)
+
+    def save(response, *args, **kwargs):
+        name = _fixture_name(response.url)
+        if name and response.status_code == 200:
+            (fixtures / name).write_text(response.text, encoding="utf-8")
+
+    session = http_client.get_session()
+    session.hooks["response"].append(save)
+    try:
+        companies = []
+        for page in range(1, pages + 1):
+            companies += get_company_links(page, use_cache=False)
+        for company in companies[:profiles]:
+            fetch_company_page(company, use_cache=False)
+    finally:
+        session.hooks["response"].remove(save)
+    print(f"✅ Recorded {pages} listing pages and {min(profiles, len(companies))} profiles in {fixtures}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the stand-in server, or record fixtures")
+    parser.add_argument("--record", type=int, metavar="PAGES", help="record PAGES real listing pages and their profiles")
+    parser.add_argument("--profiles", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.record, args.profiles)
+    else:
+        with StandInServer(latency=args.latency, error_rate=args.error_rate) as server:
+            print(f"* Stand-in on http://{server.address}/ ({len(server.rows)} companies), Ctrl-C to stop")
+            try:
+                while True:
+                    time.sleep(3600)
+            except KeyboardInterrupt:
+                pass
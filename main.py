@@ -1,113 +1,173 @@
-from src.scrape.scrape_allabolag import scrape_multiple_pages, extract_company_details
-from src.scrape.search_for_website import google_search_website
-from src.scrape.scrape_mail import find_emails_on_website
-from src.scrape.setup import AllaBolag, SLEEP_TIME
-from src.utils.helpers import str_to_list
+from src.scrape.scrape_allabolag import ListingError, default_segment, scrape_multiple_pages, extract_many_company_details, fetch_with_retries
+from src.scrape.parse_pool import parse_profiles_in_pool
+from src.scrape.pipeline import run_pipeline
+from src.scrape.website_search import WebsiteSearch
+from src.scrape.crawl_scheduler import (
+    crawl_segments, partition_segments, segments_from_config, segments_tag, write_membership,
+)
+from src.scrape.setup import AllaBolag, FIELDNAMES, Metrics, Refresh, Storage
+from src.utils.checkpoint import Journal, company_key, seed_journal
+from src.utils.storage import write_table, read_records, convert, to_csv_row
+from src.utils.refresh import RefreshAborted, refresh_details
+from src.utils import metrics
 
 import time
 import csv
+import argparse
+import atexit
+from functools import partial
 from pathlib import Path
-import pandas as pd
-import json 
-
-
-fieldnames = [
-    "name",
-    "profile_url",
-    "emails",
-    "org_number",
-    "revenue",
-    "legal_name",
-    "registration_date",
-    "company_type",
-    "employees",
-    "ceo",
-    "address",
-    "postal_address",
-    "city",
-    "share_capital",
-    "sni_codes",
-    "business_purpose",
-    "phone",
-    "website",
-]
+
+
+fieldnames = FIELDNAMES
 
 def filename_tag():
     return f"rev-{AllaBolag.REVENUE_LIMITS.value[0]}-{AllaBolag.REVENUE_LIMITS.value[1]}_nump-{AllaBolag.NUM_PAGES.value}_sort-{AllaBolag.SORT_BY.value}"
     
 
-def combine_csv(left_filename, right_filename, filepath : str = "data/plc/"):
-    # Ensure theat the files exist
-    if not Path(left_filename).exists():
-        return []
-        
-    if not Path(right_filename).exists():
-        with open(right_filename, 'w+', newline ='', encoding='utf-8') as file:    
-            writer = csv.DictWriter(file, fieldnames = fieldnames)
-            writer.writeheader()
-    
-    # Read as strings to avoid NaN/type surprises
-    left  = pd.read_csv(left_filename, dtype=str)
-    right = pd.read_csv(right_filename, dtype=str)
-
-    # Normalize key (strip + lowercase); adjust if you need case-sensitive
-    left["_key"]  = left["name"].fillna("").str.strip().str.lower()
-    right_keys = set(right["name"].fillna("").str.strip().str.lower())
-
-    # Keep rows whose key is NOT in right
-    only_in_left = left[~left["_key"].isin(right_keys)].drop(columns="_key")
-    placeholder_filename = f"{filepath}plc_{filename_tag()}.csv"
-    only_in_left.to_csv(placeholder_filename, index=False)
-    
-    return pd.read_csv(
-        placeholder_filename, 
-        converters={"emails": str_to_list}).to_dict(orient="records"
-    )   
-        
-    
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pipeline", action="store_true",
+                        help="fetch profiles on threads and parse them on a process pool (all cores)")
+    parser.add_argument("--refresh", action="store_true",
+                        help="re-scrape the listing and re-fetch only new, stale or moved companies")
+    parser.add_argument("--force", action="store_true",
+                        help="with --refresh: go ahead even if the listing shrank below Refresh.MIN_LISTING_SHARE of the last one")
+    parser.add_argument("--segments", action="store_true",
+                        help="crawl every AllaBolag.CITIES x REVENUE_BANDS x PROFIT_BANDS segment, deduped by org number")
+    parser.add_argument("--split", action="store_true",
+                        help="split the search (or each segment) into bands of at most AllaBolag.PAGE_BUDGET pages, crawled in parallel")
+    parser.add_argument("--stream", action="store_true",
+                        help="run listing, profiles and website emails as one streaming pipeline into the details file")
+    parser.add_argument("--search", action="store_true",
+                        help="with --stream: look up a website (Search.PROVIDERS, cached, within Search.DAILY_QUOTA) for companies without one")
+    parser.add_argument("--metrics", nargs="?", const=Metrics.DUMP_PATH.value, default=None, metavar="PATH",
+                        help="write request/parse/stage metrics when the run ends (.json or Prometheus text)")
+    args = parser.parse_args()
+    if args.search and not args.stream:
+        parser.error("--search needs --stream")
+    if args.metrics:
+        atexit.register(lambda: (metrics.dump(args.metrics), print(f"* Metrics written to {args.metrics}")))
+    # Profiles that fail are retried after a backoff before they are marked failed
+    fetch_details = partial(fetch_with_retries, parse_profiles_in_pool if args.pipeline else extract_many_company_details)
+
+    segments = segments_from_config() if args.segments else ([default_segment()] if args.split else None)
+    # Named after the configured search, not the bands, which depend on the data
+    tag = (segments_tag(segments) if args.segments else filename_tag()) + ("_split" if args.split else "")
+
+    def list_companies(journal_dir, use_cache=True):
+        """
+        Listing for the single configured search, or all segments (or their bands) deduped.
+        """
+        if segments is None:
+            journal_path = f"{journal_dir}pages_{tag}.journal.jsonl" if journal_dir else None
+            return scrape_multiple_pages(journal_path=journal_path, use_cache=use_cache)
+        bands = partition_segments(segments, use_cache=use_cache) if args.split else segments
+        companies, membership = crawl_segments(bands, journal_dir=journal_dir, use_cache=use_cache)
+        write_membership(membership, f"data/companies/segments_{tag}.csv")
+        return companies
+
+    if args.stream:
+        print("\n--- STREAM ALLABOLAG.SE ---")
+        print("====================================")
+
+        # Profiles start with the first listing page; resumes from the same journal as the batch run
+        try:
+            bands = partition_segments(segments) if args.split else segments
+        except ListingError as e:
+            raise SystemExit(f"❌ Splitting the segments failed, {e}. Run again.")
+        search = WebsiteSearch() if args.search else None
+        try:
+            run_pipeline(f"data/details/details_{tag}.csv", segments=bands, fetch_details=fetch_details, search=search)
+        except ListingError as e:
+            # The rows written so far are journaled, a new run picks up from there
+            raise SystemExit(f"❌ Listing incomplete, {e}. Run again to resume.")
+        finally:
+            if search is not None:
+                print(search.meter.summary() or "* Website search: no lookups")
+        raise SystemExit(0)
+
+    if args.refresh:
+        print("\n--- REFRESH ALLABOLAG.SE ---")
+        print("====================================")
+
+        companies_filename = f"data/companies/companies_{tag}.{Storage.FORMAT.value}"
+        company_details_filename = f"data/details/details_{tag}.csv"
+        previous = read_records(companies_filename, columns=["name", "profile_url"]) if Path(companies_filename).exists() else []
+
+        # Fresh listing and profiles, the http cache would hand back what we already have.
+        # A listing that failed or came back short leaves both files as they are.
+        try:
+            companies = list_companies(journal_dir=None, use_cache=False)
+            refresh_details(
+                companies,
+                partial(fetch_details, use_cache=False),
+                company_details_filename,
+                delta_path=f"data/refresh/delta_{tag}_{time.strftime('%Y%m%d-%H%M%S')}.jsonl",
+                previous_listing=previous,
+                min_share=0.0 if args.force else Refresh.MIN_LISTING_SHARE.value,
+            )
+        except (ListingError, RefreshAborted) as e:
+            raise SystemExit(f"❌ Refresh aborted, nothing written: {e}")
+        write_table(companies, companies_filename)
+        if Storage.FORMAT.value == "parquet":
+            convert(company_details_filename, company_details_filename.removesuffix(".csv") + ".parquet")
+        raise SystemExit(0)
+
     print("\n--- START SCRAPING ALLABOLAG.SE ---")
     print("====================================")
     
     # Get companies (name and profile-url)
     filepath = "data/companies/"
-    companies_filename = f"{filepath}companies_{filename_tag()}.csv"
+    companies_filename = f"{filepath}companies_{tag}.{Storage.FORMAT.value}"
     if not Path(companies_filename).exists():
-        companies = scrape_multiple_pages()
-        companies_df = pd.DataFrame(companies)
-        companies_df.to_csv(companies_filename, index=False)
+        try:
+            companies = list_companies(journal_dir=filepath)
+        except ListingError as e:
+            # The pages done so far are journaled, a new run picks up from there
+            raise SystemExit(f"❌ Listing incomplete, {e}. Run again to resume.")
+        write_table(companies, companies_filename)
     else:
         print(f"Already done, file exists: {companies_filename}")
-        companies = pd.read_csv(companies_filename).to_dict(orient="records")
+        companies = read_records(companies_filename, columns=["name", "profile_url"])
         
     print("\n--- GET COMPANY DETAILS ---")
     print("====================================")
     
     # Extract company details
     filepath = "data/details/"
-    company_details_filename = f"{filepath}details_{filename_tag()}.csv"
+    company_details_filename = f"{filepath}details_{tag}.csv"
     
-    companies = combine_csv(companies_filename, company_details_filename)
+    journal_filename = f"{filepath}details_{tag}.journal.jsonl"
     
-    company_details = []
-    if len(companies) > 0:
-        with open(company_details_filename, 'w+', newline ='', encoding='utf-8') as file:    
-            writer = csv.DictWriter(file, fieldnames = fieldnames)
+    # Resume from the journal; rows are only ever appended to the details file
+    details_exists = Path(company_details_filename).exists()
+    seed_journal(journal_filename, company_details_filename)
+    with open(company_details_filename, 'a', newline ='', encoding='utf-8') as file, \
+            Journal(journal_filename, companions=[file]) as journal:
+        writer = csv.DictWriter(file, fieldnames = fieldnames)
+        if not details_exists:
             writer.writeheader()
-            
-            for company in companies:
-                print("|",end="")
-                details = extract_company_details(company)
-                company_details.append(details)
-                time.sleep(SLEEP_TIME)
-                writer.writerow(details)
-                
-        company_details_df = pd.DataFrame(company_details)
-        company_details_df["emails"] = company_details_df["emails"].apply(json.dumps)
-        company_details_df.to_csv(company_details_filename, index=False)
-    else:
-        print(f"Already done, file exists: {company_details_filename}")
-        company_details = pd.read_csv(company_details_filename, converters={"emails": str_to_list}).to_dict(orient="records")   
+        
+        companies = [c for c in companies if not journal.is_done(company_key(c))]
+        if len(companies) > 0:
+            with metrics.Progress("details", total=len(companies)) as progress:
+                for details in fetch_details(companies):
+                    progress.advance()
+                    if "sni_codes" not in details:
+                        # Profile could not be fetched, try again next run
+                        journal.record(company_key(details), state="failed")
+                        metrics.inc("details_total", result="failed")
+                        continue
+                    writer.writerow(to_csv_row(details))
+                    journal.record(company_key(details))
+                    metrics.inc("details_total", result="ok")
+        else:
+            print(f"Already done, file exists: {company_details_filename}")
+
+    if Storage.FORMAT.value == "parquet":
+        # Typed snapshot for the downstream steps
+        convert(company_details_filename, company_details_filename.removesuffix(".csv") + ".parquet")
 
     """ print("\n\n--- FIND COMPANY WEBSITE AND EMAILS ---")
     print("====================================")
@@ -115,7 +175,7 @@ if __name__ == "__main__":
     # Find company website and emails
     # ========================================
     filepath = "data/web/"
-    company_web_emails_filename = f"{filepath}web-emails_{filename_tag()}.csv" 
+    company_web_emails_filename = f"{filepath}web-emails_{tag}.csv" 
     
     company_details_full = combine_csv(company_details_filename, company_web_emails_filename)
        
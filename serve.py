@@ -0,0 +1,244 @@
+"""
+Local JSON API for index.html (DataTables server-side protocol).
+
+    python serve.py [--data out.csv] [--port 8000]
+
+Open http://localhost:8000/ and the viewer only fetches the rows it shows.
+/api/companies pages the rows (at most MAX_PAGE at a time); /api/companies.csv
+takes the same filters and streams every matching row, for the Download button.
+"""
+from src.utils.company_index import CompanyIndex
+from src.utils.storage import to_int
+
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, unquote
+from functools import partial
+from pathlib import Path
+import argparse
+import csv
+import gzip
+import hashlib
+import io
+import json
+import math
+import posixpath
+
+import numpy as np
+
+SEARCH_COLUMNS = ["name", "org_number", "legal_name", "postal_address", "city", "website"]
+MAX_PAGE = 1000
+# The only files served next to the API: the viewer and the optional data bundle
+ROOT = Path(__file__).resolve().parent
+STATIC_FILES = {"/", "/index.html"}
+STATIC_DIRS = ("/bundle/",)
+
+
+def _clean(v):
+    if v is None or (isinstance(v, float) and math.isnan(v)):
+        return ""
+    if isinstance(v, (list, tuple)):
+        return ", ".join(map(str, v))
+    return v if isinstance(v, (int, str)) else str(v)
+
+
+class CompanyStore:
+    """
+    CompanyIndex plus what the table needs: a lowercased search text per row
+    and a precomputed rank per sortable column.
+    """
+    def __init__(self, path):
+        self.index = CompanyIndex.load(path)
+        df = self.index.df
+        self.columns = list(df.columns)
+        self.haystack = np.array([
+            " ".join(str(_clean(v)).lower() for v in row)
+            for row in df[[c for c in SEARCH_COLUMNS if c in df.columns]].itertuples(index=False)
+        ], dtype=object)
+        self.version = hashlib.sha1(f"{path}:{len(df)}:{sum(map(len, self.haystack))}".encode()).hexdigest()[:12]
+        self._ranks = {}
+
+    def rank(self, column):
+        """
+        Position of every row when sorted by `column` (revenue numerically).
+        """
+        if column not in self._ranks:
+            values = self.index.df[column]
+            if column == "revenue":
+                keys = [to_int(v) for v in values]
+                keys = [(k is None, k or 0) for k in keys]
+            else:
+                keys = [str(_clean(v)).lower() for v in values]
+            order = sorted(range(len(keys)), key=keys.__getitem__)
+            rank = np.empty(len(keys), dtype=np.int32)
+            rank[order] = np.arange(len(keys), dtype=np.int32)
+            self._ranks[column] = rank
+        return self._ranks[column]
+
+    def query(self, search="", revenue_min=None, revenue_max=None, order_column=None, descending=False):
+        ids = self.index.filter(revenue_min=revenue_min, revenue_max=revenue_max)
+        terms = search.lower().split()
+        if terms:
+            hay = self.haystack[ids]
+            keep = np.fromiter((all(t in h for t in terms) for h in hay), dtype=bool, count=len(ids))
+            ids = ids[keep]
+        if order_column in self.columns:
+            r = self.rank(order_column)[ids]
+            ids = ids[np.argsort(-r if descending else r, kind="stable")]
+        return ids
+
+    def rows(self, ids, columns=None):
+        return [{k: _clean(v) for k, v in row.items()} for row in self.index.rows(ids, columns)]
+
+
+def _int_param(params, key, default: int) -> int:
+    value = params.get(key, [""])[0].strip()
+    if value == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{key} must be an integer") from None
+
+
+def _param(params, key, default=""):
+    return params.get(key, [default])[0]
+
+
+def _filtered_ids(store, params):
+    """
+    Row ids for the search, revenue range and order of a DataTables request.
+    """
+    order_idx = _param(params, "order[0][column]")
+    order_column = _param(params, f"columns[{order_idx}][data]") if order_idx != "" else None
+    return store.query(
+        search=_param(params, "search[value]"),
+        revenue_min=to_int(_param(params, "revMin")),
+        revenue_max=to_int(_param(params, "revMax")),
+        order_column=order_column,
+        descending=_param(params, "order[0][dir]") == "desc",
+    )
+
+
+def _fields(store, params):
+    return [c for c in _param(params, "fields").split(",") if c in store.columns] or None
+
+
+def datatables_response(store, params):
+    """
+    Answer a DataTables server-side request (draw, start, length, search[value],
+    order[0][column], order[0][dir], columns[i][data]) plus revMin/revMax.
+    Raises ValueError for a malformed draw/start/length. At most MAX_PAGE rows
+    are returned, also for length=-1 ("all"); csv_export has them all.
+    """
+    ids = _filtered_ids(store, params)
+    draw = _int_param(params, "draw", 0)
+    start = max(0, _int_param(params, "start", 0))
+    length = _int_param(params, "length", 25)
+    length = MAX_PAGE if length < 0 else min(length, MAX_PAGE)
+    page = ids[start:start + length]
+
+    return {
+        "draw": draw,
+        "recordsTotal": len(store.index),
+        "recordsFiltered": int(len(ids)),
+        "data": store.rows(page, _fields(store, params)),
+    }
+
+
+def csv_export(store, params):
+    """
+    Every row matching the filters of a DataTables request, in its order, as
+    CSV text chunks of MAX_PAGE rows (the `fields` columns, default all).
+    """
+    ids = _filtered_ids(store, params)
+    columns = _fields(store, params) or store.columns
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    for start in range(0, len(ids), MAX_PAGE):
+        writer.writerows(store.rows(ids[start:start + MAX_PAGE], columns))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+class Handler(SimpleHTTPRequestHandler):
+    store: CompanyStore = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        if url.path == "/api/meta":
+            return self.send_json({"columns": self.store.columns, "rows": len(self.store.index), "version": self.store.version})
+        if url.path == "/api/companies":
+            try:
+                payload = datatables_response(self.store, params)
+            except ValueError as e:
+                return self.send_error(400, str(e))
+            return self.send_json(payload)
+        if url.path == "/api/companies.csv":
+            return self.send_csv(csv_export(self.store, params))
+        if url.path == "/api/company":
+            row = self.store.index.get(params.get("org", [""])[0])
+            if row is None:
+                return self.send_error(404, "Unknown org_number")
+            return self.send_json({k: _clean(v) for k, v in row.items()})
+        return super().do_GET()
+
+    def send_head(self):
+        # GET and HEAD for files: only the viewer, never the repo (.git/, data/, journals)
+        raw = unquote(urlparse(self.path).path)
+        path = posixpath.normpath(raw)
+        allowed = path in STATIC_FILES or (path.startswith(STATIC_DIRS) and not raw.endswith("/"))
+        if not allowed:
+            self.send_error(404, "File not found")
+            return None
+        return super().send_head()
+
+    def send_csv(self, chunks):
+        # Streamed without a Content-Length; the HTTP/1.0 connection closes at the end
+        self.send_response(200)
+        self.send_header("Content-Type", "text/csv; charset=utf-8")
+        self.send_header("Content-Disposition", 'attachment; filename="filtered_companies.csv"')
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        for chunk in chunks:
+            self.wfile.write(chunk.encode("utf-8"))
+
+    def send_json(self, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        etag = f'W/"{self.store.version}-{hashlib.sha1(body).hexdigest()[:16]}"'
+        if etag in self.headers.get("If-None-Match", ""):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        gzipped = "gzip" in self.headers.get("Accept-Encoding", "") and len(body) > 1024
+        if gzipped:
+            body = gzip.compress(body, compresslevel=5)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("ETag", etag)
+        self.send_header("Vary", "Accept-Encoding")
+        if gzipped:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", default="out.csv", help="CSV or Parquet from the pipeline")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    Handler.store = CompanyStore(args.data)
+    print(f"* Loaded {len(Handler.store.index)} companies from {args.data}")
+    print(f"* Serving on http://{args.host}:{args.port}/")
+    ThreadingHTTPServer((args.host, args.port), partial(Handler, directory=str(ROOT))).serve_forever()
@@ -0,0 +1,290 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+from src.scrape.setup import Concurrency
+from src.utils import metrics
+
+CONGESTION_STATUSES = (429, 503)
+
+
+class TokenBucket:
+    """
+    Classic token bucket: `rate` tokens per second, at most `burst` saved up.
+    acquire() blocks until a token is available.
+    """
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class HostRateLimiter:
+    """
+    One TokenBucket per host, created on first use.
+    """
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.buckets: dict[str, TokenBucket] = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, url: str) -> TokenBucket:
+        host = urlparse(url).netloc
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rate, self.burst)
+            return self.buckets[host]
+
+    def acquire(self, url: str):
+        self.bucket(url).acquire()
+
+
+class FairRateLimiter:
+    """
+    One global token bucket shared by several lanes (e.g. crawl segments).
+    Waiting lanes are served round-robin, so a lane with many queued requests
+    can't starve the others. lane(key) gives an object with acquire(url) that
+    can stand in for a HostRateLimiter.
+    """
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.cond = threading.Condition()
+        self.waiting: dict[str, deque] = {}
+        self.ring: deque = deque()  # lanes with waiters, next to be served first
+
+    def acquire(self, key):
+        ticket = object()
+        with self.cond:
+            self.waiting.setdefault(key, deque()).append(ticket)
+            if key not in self.ring:
+                self.ring.append(key)
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.ring[0] == key and self.waiting[key][0] is ticket and self.tokens >= 1:
+                    self.tokens -= 1
+                    self.waiting[key].popleft()
+                    self.ring.popleft()
+                    if self.waiting[key]:
+                        self.ring.append(key)
+                    self.cond.notify_all()
+                    return
+                wait = max(0.0, (1 - self.tokens) / self.rate)
+                self.cond.wait(timeout=wait or None)
+
+    def lane(self, key):
+        limiter = self
+
+        class Lane:
+            def acquire(self, url=None):
+                limiter.acquire(key)
+        return Lane()
+
+
+def retry_after_seconds(value) -> float | None:
+    """
+    Retry-After header (seconds or an HTTP date) as seconds from now.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class _HostState:
+    def __init__(self, rate: float, limit: float, burst: int):
+        self.rate = rate
+        self.limit = limit              # requests in flight allowed, float so it can grow by fractions
+        self.in_flight = 0
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0         # Retry-After
+        self.last_decrease = 0.0
+        self.latency = None             # EWMA, seconds
+        self.cond = threading.Condition()
+
+
+class AdaptiveLimiter:
+    """
+    AIMD control of the request rate and the requests in flight, per host.
+
+    Every answer is fed back through release(): a fast success adds about one
+    request/sec per second to the rate and one request in flight per window
+    (additive increase); a 429/503 (also when urllib3 retried it away), a
+    timeout or an answer slower than `latency_target` multiplies both by
+    `decrease`, at most once per round-trip so a burst of 429s counts once.
+    A Retry-After pauses the host for that long. Drop-in for HostRateLimiter
+    when passed to http_client.get(limiter=...), which calls release().
+    """
+    def __init__(
+            self,
+            rate: float = Concurrency.RATE_PER_HOST.value,
+            max_in_flight: int = Concurrency.WORKERS.value,
+            burst: int = Concurrency.BURST.value,
+            min_rate: float = Concurrency.MIN_RATE.value,
+            max_rate: float = Concurrency.MAX_RATE.value,
+            latency_target: float = Concurrency.LATENCY_TARGET.value,
+            decrease: float = Concurrency.DECREASE.value,
+        ):
+        self.start_rate = rate
+        self.max_in_flight = max_in_flight
+        self.burst = max(1, int(burst))
+        self.min_rate, self.max_rate = min_rate, max(max_rate, rate)  # an explicit higher start rate is a ceiling too
+        self.latency_target = latency_target
+        self.decrease = decrease
+        self.hosts: dict[str, _HostState] = {}
+        self.lock = threading.Lock()
+
+    def host(self, url: str) -> _HostState:
+        host = urlparse(url).netloc
+        with self.lock:
+            if host not in self.hosts:
+                # Start in the middle, so there is room both ways
+                self.hosts[host] = _HostState(self.start_rate, max(1, self.max_in_flight // 2), self.burst)
+            return self.hosts[host]
+
+    def acquire(self, url: str):
+        h = self.host(url)
+        with h.cond:
+            while True:
+                now = time.monotonic()
+                h.tokens = min(self.burst, h.tokens + (now - h.updated) * h.rate)
+                h.updated = now
+                if now < h.paused_until:
+                    wait = h.paused_until - now
+                elif h.in_flight >= int(h.limit):
+                    wait = None  # until a release
+                elif h.tokens < 1:
+                    wait = (1 - h.tokens) / h.rate
+                else:
+                    h.tokens -= 1
+                    h.in_flight += 1
+                    return
+                h.cond.wait(timeout=wait)
+
+    def release(self, url: str, response=None, latency: float | None = None):
+        """
+        Feed back one answer: the response (None if the request raised) and its latency.
+        """
+        h = self.host(url)
+        host = urlparse(url).netloc
+        status = getattr(response, "status_code", None)
+        retries = getattr(getattr(response, "raw", None), "retries", None)
+        retried = [r.status for r in getattr(retries, "history", ()) if r.status in CONGESTION_STATUSES]
+        retry_after = retry_after_seconds(response.headers.get("Retry-After")) if response is not None else None
+
+        with h.cond:
+            h.in_flight = max(0, h.in_flight - 1)
+            now = time.monotonic()
+            if latency is not None:
+                h.latency = latency if h.latency is None else 0.8 * h.latency + 0.2 * latency
+
+            if response is None or status in CONGESTION_STATUSES or retried or retry_after is not None:
+                reason = "error" if response is None else "throttled"
+            elif latency is not None and latency > self.latency_target:
+                reason = "slow"
+            else:
+                reason = None
+
+            if reason is None:
+                h.rate = min(self.max_rate, h.rate + 1 / h.rate)
+                h.limit = min(self.max_in_flight, h.limit + 1 / h.limit)
+            elif now - h.last_decrease >= max(h.latency or 0.0, 1 / h.rate):
+                h.last_decrease = now
+                h.rate = max(self.min_rate, h.rate * self.decrease)
+                h.limit = max(1.0, h.limit * self.decrease)
+                metrics.inc("http_throttle_total", host=host, reason=reason)
+            if retry_after:
+                h.paused_until = max(h.paused_until, now + retry_after)
+            h.cond.notify_all()
+
+    def snapshot(self) -> dict[str, dict]:
+        with self.lock:
+            hosts = dict(self.hosts)
+        return {host: {"rate": round(h.rate, 2), "in_flight": h.in_flight, "limit": int(h.limit)}
+                for host, h in hosts.items()}
+
+
+class RetryQueue:
+    """
+    Items waiting for another attempt, each after its own backoff: `delay`
+    seconds after the first failure, doubled per attempt, until `max_attempts`.
+    """
+    def __init__(self, delay: float = Concurrency.RETRY_DELAY.value, max_attempts: int = Concurrency.RETRY_ATTEMPTS.value):
+        self.delay = delay
+        self.max_attempts = max_attempts
+        self.heap = []
+        self.seq = itertools.count()
+
+    def __len__(self):
+        return len(self.heap)
+
+    def put(self, item, attempts: int) -> bool:
+        """
+        Queue `item` after its `attempts`-th failure; False if it has no attempts left.
+        """
+        if attempts >= self.max_attempts:
+            return False
+        due = time.monotonic() + self.delay * 2 ** (attempts - 1)
+        heapq.heappush(self.heap, (due, next(self.seq), item, attempts))
+        return True
+
+    def due(self) -> list[tuple]:
+        """
+        Wait for the next item, then return [(item, attempts)] for all that are due.
+        """
+        if not self.heap:
+            return []
+        time.sleep(max(0.0, self.heap[0][0] - time.monotonic()))
+        now = time.monotonic()
+        out = []
+        while self.heap and self.heap[0][0] <= now:
+            _, _, item, attempts = heapq.heappop(self.heap)
+            out.append((item, attempts))
+        return out
+
+
+def bounded_map(fn, items, workers: int = 8, max_in_flight: int | None = None):
+    """
+    Like map(fn, items) but runs on a thread pool with at most `max_in_flight`
+    calls pending. Items are consumed lazily and results are yielded in input order.
+    """
+    max_in_flight = max_in_flight or workers
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for item in items:
+            pending.append(pool.submit(fn, item))
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
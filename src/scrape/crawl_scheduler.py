@@ -0,0 +1,156 @@
+import csv
+import hashlib
+import math
+from itertools import product
+from pathlib import Path
+
+from src.scrape.setup import AllaBolag, Cache, Concurrency
+from src.scrape.concurrency import FairRateLimiter, HostRateLimiter, bounded_map
+from src.scrape.scrape_allabolag import Segment, require_listing_page, scrape_multiple_pages
+from src.utils.checkpoint import company_key
+
+
+def segments_from_config(
+        cities=AllaBolag.CITIES.value,
+        revenue_bands=AllaBolag.REVENUE_BANDS.value,
+        profit_bands=AllaBolag.PROFIT_BANDS.value,
+        sort: str = AllaBolag.SORT_BY.value,
+    ) -> list[Segment]:
+    """
+    Every city x revenue band x profit band combination.
+    """
+    return [
+        Segment(city, tuple(revenue), tuple(profit), sort)
+        for city, revenue, profit in product(cities, revenue_bands, profit_bands)
+    ]
+
+
+def segments_tag(segments) -> str:
+    """
+    Short stable name for a set of segments, for file names.
+    """
+    digest = hashlib.sha1("|".join(sorted(s.tag for s in segments)).encode("utf-8")).hexdigest()[:8]
+    return f"segments-{len(segments)}_{digest}"
+
+
+def split_band(lo: int, hi: int) -> tuple[tuple[int, int], tuple[int, int]] | None:
+    """
+    Two halves of [lo, hi] (None if it can't be split). Positive ranges are
+    split at the geometric mean, since revenue is roughly log-distributed.
+    """
+    if hi - lo < 1:
+        return None
+    mid = math.isqrt(lo * hi) if lo > 0 else (lo + hi) // 2
+    mid = min(max(mid, lo), hi - 1)
+    return (lo, mid), (mid + 1, hi)
+
+
+def partition_segments(
+        segments,
+        page_budget: int = AllaBolag.PAGE_BUDGET.value,
+        field: str = AllaBolag.SPLIT_FIELD.value,
+        workers: int = Concurrency.WORKERS.value,
+        rate: float = Concurrency.RATE_PER_HOST.value,
+        burst: int = Concurrency.BURST.value,
+        use_cache: bool = Cache.ENABLED.value,
+        max_depth: int = 16,
+    ) -> list[Segment]:
+    """
+    Split each segment's `field` band ("revenue" or "profit") in two until the
+    band has at most `page_budget` result pages, i.e. page page_budget + 1 is
+    empty. Each round probes the whole frontier in parallel (one request per
+    band), so the depth, not the number of pages, sets the serial round-trips.
+    The bands of each segment come back in its sort order (high to low for a
+    "...Desc" sort), so crawl_segments merges them into one ordered listing.
+    """
+    limiter = HostRateLimiter(rate, burst)
+
+    def too_big(segment):
+        # A probe page that can't be fetched raises ListingError rather than passing for empty
+        return bool(require_listing_page(segment, page_budget + 1, use_cache, limiter))
+
+    segments = list(segments)
+    done, frontier = [], list(enumerate(segments))  # (index of the original segment, band)
+    for depth in range(max_depth + 1):
+        if not frontier:
+            break
+        next_frontier = []
+        probes = bounded_map(too_big, [segment for _, segment in frontier], workers=workers)
+        for (origin, segment), over in zip(frontier, probes):
+            halves = split_band(*getattr(segment, field)) if over else None
+            if halves is None or depth == max_depth:
+                if over:
+                    print(f"* [{segment.tag}] more than {page_budget} pages but can't be split further")
+                done.append((origin, segment))
+                continue
+            next_frontier += [(origin, segment._replace(**{field: band})) for band in halves]
+        frontier = next_frontier
+    done += frontier
+
+    def order(entry):
+        origin, segment = entry
+        lo = getattr(segment, field)[0]
+        return origin, -lo if segment.sort.endswith("Desc") else lo
+
+    print(f"* Split {len(segments)} segments into {len(done)} bands of at most {page_budget} pages")
+    return [segment for _, segment in sorted(done, key=order)]
+
+
+def crawl_segments(
+        segments,
+        journal_dir: str | None = "data/companies/",
+        workers: int = Concurrency.WORKERS.value,
+        rate: float = Concurrency.RATE_PER_HOST.value,
+        burst: int = Concurrency.BURST.value,
+        use_cache: bool = Cache.ENABLED.value,
+        parallel: int | None = None,
+    ):
+    """
+    Crawl the result pages of all `segments` under one shared rate budget.
+
+    Up to `parallel` segments (default: all, at most `workers`) run at once and
+    split the `workers`; their page requests draw from one FairRateLimiter, so
+    the segments get the budget round-robin. Companies are deduped on
+    company_key across overlapping segments, so each profile is fetched once.
+    Returns (companies, membership) where membership maps key -> segment tags.
+    """
+    segments = list(dict.fromkeys(segments))
+    parallel = max(1, parallel or min(len(segments), workers))
+    per_segment = max(1, workers // parallel)
+    limiter = FairRateLimiter(rate, burst)
+
+    def crawl(segment):
+        journal_path = f"{journal_dir}pages_{segment.tag}.journal.jsonl" if journal_dir else None
+        return scrape_multiple_pages(
+            journal_path=journal_path,
+            workers=per_segment,
+            use_cache=use_cache,
+            segment=segment,
+            limiter=limiter.lane(segment.tag),
+        )
+
+    companies, membership = {}, {}
+    listed = 0
+    for segment, found in zip(segments, bounded_map(crawl, segments, workers=parallel)):
+        listed += len(found)
+        for company in found:
+            key = company_key(company)
+            companies.setdefault(key, company)
+            tags = membership.setdefault(key, [])
+            if segment.tag not in tags:
+                tags.append(segment.tag)
+
+    print(f"* {listed} listings in {len(segments)} segments -> {len(companies)} unique companies")
+    return list(companies.values()), membership
+
+
+def write_membership(membership: dict, path: str):
+    """
+    key, segments (";"-separated) per company, to trace which searches found it.
+    """
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["key", "segments"])
+        for key, tags in membership.items():
+            writer.writerow([key, ";".join(tags)])
@@ -0,0 +1,47 @@
+from urllib.parse import urlparse
+
+
+class DomainMatcher:
+    """
+    Exclusion rules like "allabolag.se" or "google.com/maps".
+
+    A domain rule matches the domain itself and every subdomain ("www.na.se" but
+    not "hanna.se"). A rule with a path only matches urls under that path. Lookup
+    hashes each suffix of the host, so a check costs O(number of labels) no
+    matter how many rules there are.
+    """
+    def __init__(self, rules):
+        self.domains: set[str] = set()
+        self.paths: dict[str, list[str]] = {}
+        for rule in rules:
+            self.add(rule)
+
+    def add(self, rule: str):
+        rule = rule.strip().lower()
+        if "://" in rule:
+            rule = rule.split("://", 1)[1]
+        host, _, path = rule.partition("/")
+        host = host.removeprefix("www.")
+        if path.strip("/"):
+            self.paths.setdefault(host, []).append("/" + path.strip("/"))
+        else:
+            self.domains.add(host)
+
+    def matches(self, url: str) -> bool:
+        parsed = urlparse(url if "://" in url else "http://" + url)
+        host = (parsed.hostname or "").lower().rstrip(".")
+        if not host:
+            return False
+        path = parsed.path.lower()
+        labels = host.split(".")
+        for i in range(len(labels)):
+            suffix = ".".join(labels[i:])
+            if suffix in self.domains:
+                return True
+            for prefix in self.paths.get(suffix, ()):
+                if path == prefix or path.startswith(prefix + "/"):
+                    return True
+        return False
+
+    def __contains__(self, url: str) -> bool:
+        return self.matches(url)
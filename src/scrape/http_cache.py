@@ -0,0 +1,137 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from src.scrape.setup import Cache
+
+# Only these are kept; the stored body is already decoded, so Content-Encoding
+# and Content-Length must not come back with it.
+_KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+
+def cache_key(url: str) -> str:
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    SQLite-backed cache of GET responses keyed by URL.
+
+    Bodies are zlib-compressed. Entries older than `ttl` are revalidated with
+    If-None-Match / If-Modified-Since, and the least recently used entries are
+    evicted once the stored bodies exceed `max_bytes`.
+    """
+    def __init__(
+            self,
+            path: str = Cache.PATH.value,
+            ttl: float = Cache.TTL.value,
+            max_bytes: int = Cache.MAX_BYTES.value,
+        ):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed_at)")
+        self.db.commit()
+        self.total_bytes = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def lookup(self, url: str):
+        """
+        Returns (response, is_fresh) or None if the URL is not cached.
+        """
+        with self.lock:
+            row = self.db.execute(
+                "SELECT headers, body, fetched_at FROM responses WHERE key = ?", (cache_key(url),)
+            ).fetchone()
+            if row is None:
+                return None
+            self.db.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), cache_key(url))
+            )
+            self.db.commit()
+        headers, body, fetched_at = row
+        response = _to_response(url, json.loads(headers), zlib.decompress(body))
+        return response, (time.time() - fetched_at) < self.ttl
+
+    def store(self, url: str, response: requests.Response):
+        headers = {h: response.headers[h] for h in _KEPT_HEADERS if h in response.headers}
+        body = zlib.compress(response.content, 6)
+        now = time.time()
+        key = cache_key(url)
+        with self.lock:
+            old = self.db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self.db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, url, json.dumps(headers), body, len(body), now, now),
+            )
+            self.total_bytes += len(body) - (old[0] if old else 0)
+            self._evict()
+            self.db.commit()
+
+    def refresh(self, url: str):
+        """
+        Mark an entry as fresh again (after a 304 Not Modified).
+        """
+        with self.lock:
+            now = time.time()
+            self.db.execute(
+                "UPDATE responses SET fetched_at = ?, accessed_at = ? WHERE key = ?",
+                (now, now, cache_key(url)),
+            )
+            self.db.commit()
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes:
+            rows = self.db.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at LIMIT 100"
+            ).fetchall()
+            if not rows:
+                self.total_bytes = 0
+                return
+            for key, size in rows:
+                self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.total_bytes -= size
+                if self.total_bytes <= self.max_bytes:
+                    break
+
+
+def _to_response(url: str, headers: dict, body: bytes) -> requests.Response:
+    response = requests.Response()
+    response.url = url
+    response.status_code = 200
+    response.reason = "OK"
+    response.headers = CaseInsensitiveDict(headers)
+    response.encoding = get_encoding_from_headers(response.headers)
+    response._content = body
+    response.from_cache = True
+    return response
+
+
+def conditional_headers(cached: requests.Response) -> dict:
+    headers = {}
+    if "ETag" in cached.headers:
+        headers["If-None-Match"] = cached.headers["ETag"]
+    if "Last-Modified" in cached.headers:
+        headers["If-Modified-Since"] = cached.headers["Last-Modified"]
+    return headers
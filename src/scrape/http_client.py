@@ -0,0 +1,143 @@
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from src.scrape.setup import Http
+from src.scrape.http_cache import ResponseCache, conditional_headers
+from src.utils import metrics
+
+try:
+    import brotli  # noqa: F401  (urllib3 decodes "br" when installed)
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+DEFAULT_TIMEOUT = (Http.CONNECT_TIMEOUT.value, Http.READ_TIMEOUT.value)
+
+_session = None
+_session_lock = threading.Lock()
+_cache = None
+
+
+def make_session(
+        pool_connections: int = Http.POOL_CONNECTIONS.value,
+        pool_maxsize: int = Http.POOL_MAXSIZE.value,
+        retries: int = Http.RETRIES.value,
+        backoff_factor: float = Http.BACKOFF_FACTOR.value,
+    ) -> requests.Session:
+    """
+    A Session with keep-alive pools per host and retry with exponential
+    backoff on 429/5xx (Retry-After is respected).
+    """
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=Http.RETRY_STATUSES.value,
+        allowed_methods=["GET", "HEAD"],
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+    return session
+
+
+def get_session() -> requests.Session:
+    """
+    The process-wide shared session, created on first use.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = make_session()
+    return _session
+
+
+def get_cache() -> ResponseCache:
+    """
+    The process-wide response cache (setup.Cache), opened on first use.
+    """
+    global _cache
+    if _cache is None:
+        with _session_lock:
+            if _cache is None:
+                _cache = ResponseCache()
+    return _cache
+
+
+def _timed_get(session, url, limiter=None, **kwargs) -> requests.Response:
+    """
+    session.get, recording count per host and status, bytes and latency per host.
+    With a `limiter`, the request waits for limiter.acquire(url) and the answer
+    is fed back to limiter.release() if it has one (AdaptiveLimiter).
+    """
+    host = urlsplit(url).hostname or ""
+    if limiter is not None:
+        limiter.acquire(url)
+    release = getattr(limiter, "release", None)
+    response = None
+    start = time.perf_counter()
+    try:
+        response = session.get(url, **kwargs)
+    except requests.RequestException:
+        metrics.inc("http_requests_total", host=host, status="error")
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.observe("http_request_seconds", elapsed, host=host)
+        if release is not None:
+            release(url, response, elapsed)
+    metrics.inc("http_requests_total", host=host, status=response.status_code)
+    metrics.inc("http_response_bytes_total", len(response.content), host=host)
+    return response
+
+
+def get(url, *, headers=None, params=None, timeout=None, cache: bool = False, limiter=None) -> requests.Response:
+    """
+    GET through the shared session. Timeout defaults to (connect, read) from setup.Http.
+
+    With cache=True a fresh cached copy is returned without touching the network,
+    a stale one is revalidated with ETag/Last-Modified, and 200 responses are stored.
+    `limiter` (HostRateLimiter, AdaptiveLimiter) only applies to requests that
+    go out, so cache hits don't use up the rate.
+    """
+    session = get_session()
+    timeout = timeout or DEFAULT_TIMEOUT
+    if not cache:
+        return _timed_get(session, url, limiter, headers=headers, params=params, timeout=timeout)
+
+    if params:
+        url = requests.Request("GET", url, params=params).prepare().url
+    store = get_cache()
+    hit = store.lookup(url)
+    if hit is not None:
+        cached, fresh = hit
+        if fresh:
+            metrics.inc("http_cache_total", result="hit")
+            return cached
+        headers = {**(headers or {}), **conditional_headers(cached)}
+
+    response = _timed_get(session, url, limiter, headers=headers, timeout=timeout)
+    if hit is not None and response.status_code == 304:
+        metrics.inc("http_cache_total", result="revalidated")
+        store.refresh(url)
+        return cached
+    metrics.inc("http_cache_total", result="miss")
+    if response.status_code == 200:
+        store.store(url, response)
+    return response
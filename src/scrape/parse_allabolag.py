@@ -0,0 +1,384 @@
+import re
+
+from bs4 import BeautifulSoup
+import soupsieve
+
+from src.scrape.setup import AllaBolag, Parser
+from src.utils import metrics
+
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+except ImportError:
+    lxml_html = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:
+    HTMLParser = None
+
+
+ORG_FROM_URL_RE = re.compile(r"/(\d{10})$")
+CITY_RE = re.compile(r"\d{3}\s*\d{2}\s+(.+)")
+
+# CSS selectors (bs4 and selectolax)
+CARD = "div.SegmentationSearchResultCard-card"
+ACCOUNTING_ROWS = "table.AccountFiguresWidget-accountingtable tr"
+OFFICIAL_ITEM = "span.OfficialCompanyInformationCard-propertyList"
+OFFICIAL_KEY = "span.OfficialCompanyInformationCard-property"
+OFFICIAL_VALUE = "span.OfficialCompanyInformationCard-propertyValue"
+CONTACT_ITEM = "span.ContactInformationCard-smallPropertyList"
+CONTACT_LABEL = "span.ContactInformationCard-smallProperty"
+CONTACT_VALUE = "span.ContactInformationCard-smallPropertyValue"
+SNI_LINK = "span.OfficialCompanyInformationCard-propertyValue a[href*='naceIndustry']"
+DESCRIPTION = "div.MuiGrid-root.MuiGrid-direction-xs-row.MuiGrid-grid-xs-12.MuiTypography-root.MuiTypography-body2.mui-18twy0e"
+
+
+# ===============================
+# BACKENDS
+# ===============================
+# Every backend turns raw html into the same plain structure, which
+# build_company_details() then applies to the company dict:
+#   links(html)   -> [(name, href), ...]
+#   profile(html) -> {"revenue_text", "official", "contacts", "sni", "description"}
+
+# --- bs4 (pure python, the reference implementation) ---
+_SV_CARD = soupsieve.compile(CARD)
+_SV_ACCOUNTING_ROWS = soupsieve.compile(ACCOUNTING_ROWS)
+_SV_OFFICIAL_ITEM = soupsieve.compile(OFFICIAL_ITEM)
+_SV_OFFICIAL_KEY = soupsieve.compile(OFFICIAL_KEY)
+_SV_OFFICIAL_VALUE = soupsieve.compile(OFFICIAL_VALUE)
+_SV_CONTACT_ITEM = soupsieve.compile(CONTACT_ITEM)
+_SV_CONTACT_LABEL = soupsieve.compile(CONTACT_LABEL)
+_SV_CONTACT_VALUE = soupsieve.compile(CONTACT_VALUE)
+_SV_SNI_LINK = soupsieve.compile(SNI_LINK)
+_SV_DESCRIPTION = soupsieve.compile(DESCRIPTION)
+
+
+def _bs4_links(html):
+    soup = BeautifulSoup(html, "html.parser")
+    links = []
+    for card in _SV_CARD.select(soup):
+        a_tag = card.find("a", href=True)
+        if a_tag:
+            links.append((a_tag.text.strip(), a_tag["href"]))
+    return links
+
+
+def _bs4_profile(html):
+    soup = BeautifulSoup(html, "html.parser")
+    raw = {"revenue_text": None, "official": [], "contacts": [], "sni": [], "description": None}
+
+    for row in _SV_ACCOUNTING_ROWS.select(soup):
+        header = row.find("th")
+        if header and "Omsättning" in header.text:
+            td = row.find("td")
+            if td:
+                raw["revenue_text"] = td.get_text(strip=True)
+            break
+
+    for item in _SV_OFFICIAL_ITEM.select(soup):
+        key = _SV_OFFICIAL_KEY.select_one(item)
+        value = _SV_OFFICIAL_VALUE.select_one(item)
+        if key and value:
+            raw["official"].append((key.text.strip().lower(), value.get_text(strip=True)))
+
+    for block in _SV_CONTACT_ITEM.select(soup):
+        label = _SV_CONTACT_LABEL.select_one(block)
+        value = _SV_CONTACT_VALUE.select_one(block)
+        if not label or not value:
+            continue
+        a_tag = value.find("a", href=True)
+        btn = value.find("button")
+        raw["contacts"].append({
+            "label": label.text.strip().lower(),
+            "label_stripped": label.get_text(strip=True).lower(),
+            "value": value.get_text(strip=True),
+            "href": a_tag["href"] if a_tag else None,
+            "button": btn.get_text(strip=True) if btn else None,
+        })
+
+    raw["sni"] = [link.text.strip() for link in _SV_SNI_LINK.select(soup)]
+
+    desc = _SV_DESCRIPTION.select_one(soup)
+    raw["description"] = desc.get_text(" ", strip=True) if desc else None
+    return raw
+
+
+# --- lxml (C, precompiled XPath) ---
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def _css_to_classes(selector):
+    tag, *classes = selector.split(".")
+    return f"{tag}[{' and '.join(_has_class(c) for c in classes)}]"
+
+
+if lxml_html is not None:
+    _XP_CARD = etree.XPath(f"//{_css_to_classes(CARD)}")
+    _XP_FIRST_LINK = etree.XPath("(.//a[@href])[1]")
+    _XP_ACCOUNTING_ROWS = etree.XPath("//table[" + _has_class("AccountFiguresWidget-accountingtable") + "]//tr")
+    _XP_FIRST_TH = etree.XPath("(.//th)[1]")
+    _XP_FIRST_TD = etree.XPath("(.//td)[1]")
+    _XP_OFFICIAL_ITEM = etree.XPath(f"//{_css_to_classes(OFFICIAL_ITEM)}")
+    _XP_OFFICIAL_KEY = etree.XPath(f"(.//{_css_to_classes(OFFICIAL_KEY)})[1]")
+    _XP_OFFICIAL_VALUE = etree.XPath(f"(.//{_css_to_classes(OFFICIAL_VALUE)})[1]")
+    _XP_CONTACT_ITEM = etree.XPath(f"//{_css_to_classes(CONTACT_ITEM)}")
+    _XP_CONTACT_LABEL = etree.XPath(f"(.//{_css_to_classes(CONTACT_LABEL)})[1]")
+    _XP_CONTACT_VALUE = etree.XPath(f"(.//{_css_to_classes(CONTACT_VALUE)})[1]")
+    _XP_FIRST_BUTTON = etree.XPath("(.//button)[1]")
+    _XP_SNI_LINK = etree.XPath(f"//{_css_to_classes(OFFICIAL_VALUE)}//a[contains(@href, 'naceIndustry')]")
+    _XP_DESCRIPTION = etree.XPath(f"(//{_css_to_classes(DESCRIPTION)})[1]")
+    _XP_TEXT = etree.XPath("descendant-or-self::text()")
+
+
+def _lx_first(xpath, node):
+    found = xpath(node)
+    return found[0] if found else None
+
+
+def _lx_text(node, separator="", strip=False):
+    """
+    Same result as bs4's node.get_text(separator, strip=strip).
+    """
+    texts = _XP_TEXT(node)
+    if strip:
+        texts = [t for t in (t.strip() for t in texts) if t]
+    return separator.join(texts)
+
+
+def _lx_parse(html):
+    if not html or not html.strip():
+        return None
+    return lxml_html.fromstring(html)
+
+
+def _lxml_links(html):
+    root = _lx_parse(html)
+    if root is None:
+        return []
+    links = []
+    for card in _XP_CARD(root):
+        a_tag = _lx_first(_XP_FIRST_LINK, card)
+        if a_tag is not None:
+            links.append((_lx_text(a_tag).strip(), a_tag.get("href")))
+    return links
+
+
+def _lxml_profile(html):
+    raw = {"revenue_text": None, "official": [], "contacts": [], "sni": [], "description": None}
+    root = _lx_parse(html)
+    if root is None:
+        return raw
+
+    for row in _XP_ACCOUNTING_ROWS(root):
+        header = _lx_first(_XP_FIRST_TH, row)
+        if header is not None and "Omsättning" in _lx_text(header):
+            td = _lx_first(_XP_FIRST_TD, row)
+            if td is not None:
+                raw["revenue_text"] = _lx_text(td, strip=True)
+            break
+
+    for item in _XP_OFFICIAL_ITEM(root):
+        key = _lx_first(_XP_OFFICIAL_KEY, item)
+        value = _lx_first(_XP_OFFICIAL_VALUE, item)
+        if key is not None and value is not None:
+            raw["official"].append((_lx_text(key).strip().lower(), _lx_text(value, strip=True)))
+
+    for block in _XP_CONTACT_ITEM(root):
+        label = _lx_first(_XP_CONTACT_LABEL, block)
+        value = _lx_first(_XP_CONTACT_VALUE, block)
+        if label is None or value is None:
+            continue
+        a_tag = _lx_first(_XP_FIRST_LINK, value)
+        btn = _lx_first(_XP_FIRST_BUTTON, value)
+        raw["contacts"].append({
+            "label": _lx_text(label).strip().lower(),
+            "label_stripped": _lx_text(label, strip=True).lower(),
+            "value": _lx_text(value, strip=True),
+            "href": a_tag.get("href") if a_tag is not None else None,
+            "button": _lx_text(btn, strip=True) if btn is not None else None,
+        })
+
+    raw["sni"] = [_lx_text(link).strip() for link in _XP_SNI_LINK(root)]
+
+    desc = _lx_first(_XP_DESCRIPTION, root)
+    raw["description"] = _lx_text(desc, " ", strip=True) if desc is not None else None
+    return raw
+
+
+# --- selectolax (C, lexbor) ---
+def _sx_text(node, separator="", strip=False):
+    """
+    Same result as bs4's node.get_text(separator, strip=strip).
+    """
+    if not strip:
+        return node.text(deep=True, separator=separator)
+    texts = node.text(deep=True, separator="\x00", strip=True).split("\x00")
+    return separator.join(t for t in texts if t)
+
+
+def _selectolax_links(html):
+    tree = HTMLParser(html)
+    links = []
+    for card in tree.css(CARD):
+        a_tag = card.css_first("a[href]")
+        if a_tag is not None:
+            links.append((_sx_text(a_tag).strip(), a_tag.attributes.get("href")))
+    return links
+
+
+def _selectolax_profile(html):
+    tree = HTMLParser(html)
+    raw = {"revenue_text": None, "official": [], "contacts": [], "sni": [], "description": None}
+
+    for row in tree.css(ACCOUNTING_ROWS):
+        header = row.css_first("th")
+        if header is not None and "Omsättning" in _sx_text(header):
+            td = row.css_first("td")
+            if td is not None:
+                raw["revenue_text"] = _sx_text(td, strip=True)
+            break
+
+    for item in tree.css(OFFICIAL_ITEM):
+        key = item.css_first(OFFICIAL_KEY)
+        value = item.css_first(OFFICIAL_VALUE)
+        if key is not None and value is not None:
+            raw["official"].append((_sx_text(key).strip().lower(), _sx_text(value, strip=True)))
+
+    for block in tree.css(CONTACT_ITEM):
+        label = block.css_first(CONTACT_LABEL)
+        value = block.css_first(CONTACT_VALUE)
+        if label is None or value is None:
+            continue
+        a_tag = value.css_first("a[href]")
+        btn = value.css_first("button")
+        raw["contacts"].append({
+            "label": _sx_text(label).strip().lower(),
+            "label_stripped": _sx_text(label, strip=True).lower(),
+            "value": _sx_text(value, strip=True),
+            "href": a_tag.attributes.get("href") if a_tag is not None else None,
+            "button": _sx_text(btn, strip=True) if btn is not None else None,
+        })
+
+    raw["sni"] = [_sx_text(link).strip() for link in tree.css(SNI_LINK)]
+
+    desc = tree.css_first(DESCRIPTION)
+    raw["description"] = _sx_text(desc, " ", strip=True) if desc is not None else None
+    return raw
+
+
+BACKENDS = {"bs4": (_bs4_links, _bs4_profile)}
+if lxml_html is not None:
+    BACKENDS["lxml"] = (_lxml_links, _lxml_profile)
+if HTMLParser is not None:
+    BACKENDS["selectolax"] = (_selectolax_links, _selectolax_profile)
+
+
+def get_backend(name: str | None = None):
+    name = name or Parser.BACKEND.value
+    if name == "auto":
+        for candidate in ("selectolax", "lxml", "bs4"):
+            if candidate in BACKENDS:
+                return BACKENDS[candidate]
+    if name not in BACKENDS:
+        raise ValueError(f"Parser backend '{name}' is not installed, available: {list(BACKENDS)}")
+    return BACKENDS[name]
+
+
+# ===============================
+# FIELD EXTRACTION
+# ===============================
+def parse_company_links(html, backend: str | None = None):
+    links, _ = get_backend(backend)
+    with metrics.timer("parse_seconds", metrics.PARSE_BUCKETS, kind="parse_company_links"):
+        return [
+            {"name": name, "profile_url": AllaBolag.BASE_URL.value + href}
+            for name, href in links(html)
+        ]
+
+
+def _apply_address(company, postal_address):
+    company["postal_address"] = postal_address
+    city_match = CITY_RE.search(postal_address)
+    if city_match:
+        company["city"] = city_match.group(1).strip()
+
+
+def build_company_details(company, raw):
+    """
+    Apply the extracted page structure to the company dict. The order of the
+    steps decides which source wins when a field shows up in several places.
+    """
+    company["emails"] = []
+
+    # --- Org-nummer from URL fallback ---
+    match_org = ORG_FROM_URL_RE.search(company["profile_url"])
+    company["org_number"] = match_org.group(1) if match_org else None
+
+    # --- Revenue extraction from accounting table ---
+    if raw["revenue_text"] is not None:
+        revenue_text = raw["revenue_text"].replace("\xa0", "").replace(" ", "")
+        try:
+            company["revenue"] = int(revenue_text)
+        except ValueError:
+            company["revenue"] = None
+
+    # --- Official company info block ---
+    for k, v in raw["official"]:
+        if "juridiskt namn" in k:
+            company["legal_name"] = v
+        elif "organisationsnummer" in k:
+            company["org_number"] = v
+        elif "registreringsdatum" in k:
+            company["registration_date"] = v
+        elif "bolagsform" in k:
+            company["company_type"] = v
+        elif "antal anställda" in k:
+            company["employees"] = v
+        elif "aktiekapital" in k:
+            company["share_capital"] = v
+        elif "adress" in k and "post" not in k:
+            company["address"] = v
+        elif "postadress" in k:
+            _apply_address(company, v)
+        elif "verkställande direktör" in k:
+            company["ceo"] = v
+
+    # --- Website and email from contact info (plain values) ---
+    for c in raw["contacts"]:
+        if "e-post" in c["label"]:
+            company["emails"].append(c["value"])
+        elif "hemsida" in c["label"]:
+            company["website"] = c["value"]
+
+    # --- SNI codes ---
+    company["sni_codes"] = list(raw["sni"])
+
+    # --- Contact info block (links, buttons and addresses override the above) ---
+    for c in raw["contacts"]:
+        label_text = c["label_stripped"]
+        if "telefon" in label_text:
+            company["phone"] = c["value"]
+        elif "hemsida" in label_text:
+            if c["href"] is not None:
+                company["website"] = c["href"]
+        elif "e-post" in label_text:
+            if c["button"] is not None:
+                company["emails"].append(c["button"])
+        elif "adress" in label_text and "post" not in label_text:
+            company["address"] = c["value"]
+        elif "postadress" in label_text:
+            _apply_address(company, c["value"])
+
+    # --- Verksamhet & ändamål (verksamhetsbeskrivning) ---
+    company["business_purpose"] = raw["description"]
+
+    return company
+
+
+def parse_company_details(company, html, backend: str | None = None):
+    _, profile = get_backend(backend)
+    with metrics.timer("parse_seconds", metrics.PARSE_BUCKETS, kind="parse_company_details"):
+        return build_company_details(company, profile(html))
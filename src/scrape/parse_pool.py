@@ -0,0 +1,158 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from src.scrape.setup import Cache, Concurrency
+from src.scrape.concurrency import AdaptiveLimiter, HostRateLimiter, bounded_map
+from src.scrape.scrape_allabolag import fetch_company_page
+from src.scrape.parse_allabolag import parse_company_details
+from src.scrape.scrape_mail import find_emails_on_website, scan_page
+from src.utils import metrics
+
+_DONE = object()
+
+
+def _keep_company(company, html):
+    return company
+
+
+def _timed_parse(parse, item, payload):
+    """
+    Runs in the worker process, whose metrics are not seen by the parent:
+    hand the parse time back with the result.
+    """
+    start = time.perf_counter()
+    result = parse(item, payload)
+    return result, time.perf_counter() - start
+
+
+def pooled_parse(
+        items,
+        fetch,
+        parse,
+        fetch_workers: int = Concurrency.WORKERS.value,
+        parse_workers: int | None = Concurrency.PARSE_WORKERS.value,
+        queue_size: int = Concurrency.QUEUE_SIZE.value,
+        on_fetch_failed=_keep_company,
+    ):
+    """
+    Fetch on a thread pool, parse on a process pool.
+
+    fetch(item) -> payload (or None on failure) runs in `fetch_workers` threads
+    which push (item, payload) onto a queue of at most `queue_size` entries.
+    parse(item, payload) must be a top-level (picklable) function; it runs in
+    `parse_workers` processes with at most `queue_size` pages in flight, so a
+    slow parse stage blocks the fetchers instead of piling up html in memory.
+    Results are yielded in input order.
+    """
+    fetched = queue.Queue(maxsize=queue_size)
+    errors = []
+    stop = threading.Event()
+
+    def offer(entry) -> bool:
+        # A put that gives up once the consumer has stopped, so the feeder can't hang
+        while not stop.is_set():
+            try:
+                fetched.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def feeder():
+        try:
+            for item, payload in bounded_map(lambda it: (it, fetch(it)), items, workers=fetch_workers):
+                if not offer((item, payload)):
+                    return
+        except Exception as e:
+            errors.append(e)
+        finally:
+            offer(_DONE)
+
+    threading.Thread(target=feeder, name="pooled_parse-feeder", daemon=True).start()
+
+    pending = deque()
+    try:
+        with ProcessPoolExecutor(max_workers=parse_workers) as pool:
+            while True:
+                entry = fetched.get()
+                if entry is _DONE:
+                    break
+                item, payload = entry
+                if payload is None:
+                    pending.append(on_fetch_failed(item, payload))
+                else:
+                    pending.append(pool.submit(_timed_parse, parse, item, payload))
+                while pending and (len(pending) >= queue_size or _ready(pending[0])):
+                    yield _result(pending.popleft(), parse)
+            while pending:
+                yield _result(pending.popleft(), parse)
+    finally:
+        # The consumer may stop early: release the feeder and drop what's queued
+        stop.set()
+        for entry in pending:
+            if isinstance(entry, Future):
+                entry.cancel()
+        while True:
+            try:
+                fetched.get_nowait()
+            except queue.Empty:
+                break
+
+    if errors:
+        raise errors[0]
+
+
+def _ready(entry):
+    return not isinstance(entry, Future) or entry.done()
+
+
+def _result(entry, parse):
+    if not isinstance(entry, Future):
+        return entry
+    result, seconds = entry.result()
+    metrics.observe("parse_seconds", seconds, metrics.PARSE_BUCKETS, kind=parse.__name__)
+    return result
+
+
+def parse_profiles_in_pool(
+        companies,
+        workers: int | None = None,
+        rate: float = Concurrency.RATE_PER_HOST.value,
+        burst: int = Concurrency.BURST.value,
+        use_cache: bool = Cache.ENABLED.value,
+        adaptive: bool = Concurrency.ADAPTIVE.value,
+        limiter=None,
+        **kwargs,
+    ):
+    """
+    Same output as extract_many_company_details, but the parsing runs on all cores.
+    `workers` (extract_many_company_details' name) stands for fetch_workers.
+    """
+    if workers is not None:
+        kwargs.setdefault("fetch_workers", workers)
+    workers = kwargs.get("fetch_workers", Concurrency.WORKERS.value)
+    limiter = limiter or (AdaptiveLimiter(rate, workers, burst) if adaptive else HostRateLimiter(rate, burst))
+    yield from pooled_parse(companies, lambda company: fetch_company_page(company, use_cache, limiter),
+                            parse_company_details, **kwargs)
+
+
+def find_emails_in_pool(
+        urls,
+        fetch_workers: int = Concurrency.WORKERS.value,
+        parse_workers: int | None = Concurrency.PARSE_WORKERS.value,
+        **kwargs,
+    ):
+    """
+    find_emails_on_website for many sites, `fetch_workers` sites at a time, with
+    the page scanning on a process pool. Same crawl order and early stop.
+    """
+    with ProcessPoolExecutor(max_workers=parse_workers) as pool:
+        def scan(html, base_url=None):
+            result, seconds = pool.submit(_timed_parse, scan_page, html, base_url).result()
+            metrics.observe("parse_seconds", seconds, metrics.PARSE_BUCKETS, kind="extract_emails")
+            return result
+
+        yield from bounded_map(lambda url: find_emails_on_website(url, scan=scan, **kwargs), urls, workers=fetch_workers)
@@ -0,0 +1,216 @@
+"""
+Streaming crawl: listing -> details -> website -> emails -> sink.
+
+    rows = emails(websites(details(listing([segment])), WebsiteSearch()))
+    with open("data/details/details_stream.csv", "a", newline="", encoding="utf-8") as file:
+        write_rows(rows, file)
+
+Every stage is a generator that takes the previous one, so stages compose
+freely; buffered() runs a stage on its own thread at most `size` items ahead,
+so all stages work at once. Profiles are fetched as soon as the first listing
+page is in, and no stage holds more than its buffer and its requests in
+flight, so memory stays flat however long the crawl (only the set of org
+numbers seen grows). run_pipeline() wires the usual chain with a journal.
+"""
+import csv
+import queue
+import threading
+from functools import partial
+from pathlib import Path
+
+from src.scrape.concurrency import AdaptiveLimiter, HostRateLimiter, bounded_map
+from src.scrape.scrape_allabolag import default_segment, extract_many_company_details, fetch_with_retries, require_listing_page
+from src.scrape.scrape_mail import find_emails_on_website
+from src.scrape.setup import AllaBolag, Cache, Concurrency, FIELDNAMES, Search
+from src.utils import metrics
+from src.utils.checkpoint import Journal, company_key, seed_journal
+from src.utils.storage import to_csv_row, to_list
+
+_END = object()
+
+
+def buffered(items, size: int = Concurrency.QUEUE_SIZE.value):
+    """
+    Iterate `items` on a thread of its own, at most `size` items ahead of the
+    consumer. Errors are re-raised in the consumer; closing the consumer stops
+    the thread.
+    """
+    buffer = queue.Queue(maxsize=size)
+    stop = threading.Event()
+    errors = []
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put(item):
+                    break
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            if hasattr(items, "close"):
+                items.close()
+            put(_END)
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _END:
+                break
+            yield item
+        if errors:
+            raise errors[0]
+    finally:
+        stop.set()
+
+
+# ===============================
+# STAGES
+# ===============================
+def listing(
+        segments=None,
+        workers: int = Concurrency.WORKERS.value,
+        rate: float = Concurrency.RATE_PER_HOST.value,
+        burst: int = Concurrency.BURST.value,
+        use_cache: bool = Cache.ENABLED.value,
+        max_pages: int = AllaBolag.NUM_PAGES.value,
+        limiter=None,
+    ):
+    """
+    Companies on the result pages of `segments` (default: the configured
+    search), page by page as they arrive, deduped on company_key. Pages are
+    fetched `workers` at a time up to the first empty one, so unlike
+    scrape_multiple_pages there is no last-page probe before the first company.
+    A page that still fails after its retries raises ListingError instead of
+    being taken for the end of the listing.
+    """
+    limiter = limiter or HostRateLimiter(rate, burst)
+    seen = set()
+    for segment in segments or [default_segment()]:
+        fetch = partial(require_listing_page, segment, use_cache=use_cache, limiter=limiter)
+        for page, companies in enumerate(bounded_map(fetch, range(1, max_pages + 1), workers=workers), start=1):
+            if companies == []:
+                break
+            metrics.REGISTRY.add_rows("listing", len(companies))
+            for company in companies:
+                key = company_key(company)
+                if key not in seen:
+                    seen.add(key)
+                    yield company
+
+
+def details(companies, fetch_details=None, **kwargs):
+    """
+    Profile details per company, with the retry queue (fetch_with_retries).
+    Companies whose profile could not be fetched come through without "sni_codes".
+    """
+    fetch_details = fetch_details or partial(fetch_with_retries, extract_many_company_details)
+    yield from fetch_details(companies, **kwargs)
+
+
+def _has_website(row) -> bool:
+    return isinstance(row.get("website"), str) and bool(row["website"].strip())
+
+
+def websites(rows, search=None, workers: int = Search.WORKERS.value):
+    """
+    Look up a website for the rows that have none, with a WebsiteSearch
+    (or anything with search(name)); rows pass through unchanged without one.
+    """
+    if search is None:
+        yield from rows
+        return
+
+    def fill(row):
+        if "sni_codes" in row and not _has_website(row):
+            row["website"] = search.search(row["name"])
+        return row
+
+    yield from bounded_map(fill, rows, workers=workers)
+
+
+def emails(rows, workers: int = Concurrency.WORKERS.value, use_cache: bool = Cache.ENABLED.value):
+    """
+    Add the emails found on each row's website to row["emails"].
+    """
+    def add(row):
+        if "sni_codes" in row and _has_website(row):
+            found = find_emails_on_website(row["website"], use_cache=use_cache) or []
+            row["emails"] = list(dict.fromkeys(to_list(row.get("emails")) + found))
+        return row
+
+    yield from bounded_map(add, rows, workers=workers)
+
+
+# ===============================
+# SINK
+# ===============================
+def write_rows(rows, file, journal: Journal | None = None, progress_name: str = "stream") -> dict:
+    """
+    Append every complete row to the open CSV `file` (FIELDNAMES columns, lists
+    as JSON like write_table) as it arrives; with a `journal`, record each key
+    as done, or failed for rows without details (the journal flushes `file`
+    before each record when it is one of its companions). Returns {"written": n, "failed": n}.
+    """
+    writer = csv.DictWriter(file, fieldnames=FIELDNAMES, extrasaction="ignore")
+    if file.tell() == 0:
+        writer.writeheader()
+    counts = {"written": 0, "failed": 0}
+    with metrics.Progress(progress_name) as progress:
+        for row in rows:
+            progress.advance()
+            if "sni_codes" not in row:
+                counts["failed"] += 1
+                if journal is not None:
+                    journal.record(company_key(row), state="failed")
+                continue
+            writer.writerow(to_csv_row(row))
+            counts["written"] += 1
+            if journal is not None:
+                journal.record(company_key(row))
+    return counts
+
+
+def run_pipeline(
+        details_path: str,
+        segments=None,
+        journal_path: str | None = None,
+        fetch_details=None,
+        search=None,
+        find_emails: bool = True,
+        buffer: int = Concurrency.QUEUE_SIZE.value,
+        use_cache: bool = Cache.ENABLED.value,
+    ) -> dict:
+    """
+    listing -> details -> (websites) -> (emails) -> `details_path`, every stage
+    on its own thread behind a `buffer`-sized queue. Listing and profile
+    requests share one per-host limiter, since they now run at the same time.
+    With a `journal_path` (default: next to the details file) companies already
+    done are skipped, so an interrupted run picks up where it stopped; a details
+    file from before the journal seeds it first.
+    """
+    limiter = AdaptiveLimiter() if Concurrency.ADAPTIVE.value else HostRateLimiter(Concurrency.RATE_PER_HOST.value, Concurrency.BURST.value)
+    journal_path = journal_path or str(Path(details_path).with_suffix(".journal.jsonl"))
+    Path(details_path).parent.mkdir(parents=True, exist_ok=True)
+    seed_journal(journal_path, details_path)
+    with open(details_path, "a", newline="", encoding="utf-8") as file, \
+            Journal(journal_path, companions=[file]) as journal:
+        companies = (c for c in listing(segments, use_cache=use_cache, limiter=limiter) if not journal.is_done(company_key(c)))
+        rows = details(buffered(companies, buffer), fetch_details, use_cache=use_cache, limiter=limiter)
+        rows = buffered(rows, buffer)
+        if search is not None:
+            rows = buffered(websites(rows, search), buffer)
+        if find_emails:
+            rows = buffered(emails(rows, use_cache=use_cache), buffer)
+        counts = write_rows(rows, file, journal)
+    print(f"* Stream: {counts} -> {details_path}")
+    return counts
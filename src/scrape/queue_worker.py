@@ -0,0 +1,246 @@
+"""
+Crawl through the shared work queue (src/utils/work_queue.py), so any number of
+worker processes, on one box or several, can share one crawl.
+
+    python -m src.scrape.queue_worker seed [--segments] [--split]   # a listing job per result page
+    python -m src.scrape.queue_worker work [--threads 8]            # start as many as you like
+    python -m src.scrape.queue_worker status
+    python -m src.scrape.queue_worker export data/details/details_queue.csv
+
+Jobs fan out: a listing page queues a profile job per company on it, a profile
+with a website queues an emails job. Profile and emails jobs are keyed by org
+number, so a company found by several pages or segments is fetched once.
+--queue (default Queue.URL) is a SQLite path or a redis:// url. Every worker
+process paces itself per host, starting at --rate and adapting to 429/503s
+and latency (Concurrency.ADAPTIVE), so start low when running many workers.
+"""
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.scrape.concurrency import AdaptiveLimiter, HostRateLimiter, bounded_map
+from src.scrape.crawl_scheduler import partition_segments, segments_from_config
+from src.scrape.parse_allabolag import parse_company_details
+from src.scrape.scrape_allabolag import (
+    ListingError, Segment, default_segment, fetch_company_page, fetch_listing_page, find_last_page,
+    require_listing_page,
+)
+from src.scrape.scrape_mail import find_emails_on_website
+from src.scrape.setup import AllaBolag, Cache, Concurrency, Queue
+from src.utils import metrics
+from src.utils.checkpoint import company_key
+from src.utils.storage import to_list, write_table
+from src.utils.work_queue import open_queue
+
+KINDS = ("listing", "profile", "emails")
+
+
+class JobError(Exception):
+    """
+    The job should be retried later (e.g. a non-200 answer).
+    """
+
+
+# ===============================
+# SEED
+# ===============================
+def seed(queue, segments, use_cache: bool = Cache.ENABLED.value, max_pages: int = AllaBolag.NUM_PAGES.value,
+         workers: int = Concurrency.WORKERS.value) -> int:
+    """
+    Queue a listing job for every result page of every segment. A probe page
+    that can't be fetched raises ListingError instead of ending the segment
+    early; seeding again after a failure only adds the missing pages.
+    """
+    segments = list(dict.fromkeys(segments))
+
+    def last_page(segment):
+        return find_last_page(lambda page: require_listing_page(segment, page, use_cache), max_pages=max_pages)
+
+    added = 0
+    for i, (segment, last) in enumerate(zip(segments, bounded_map(last_page, segments, workers=workers))):
+        added += queue.put_many("listing", [
+            (f"{segment.tag}:{page}", {"segment": segment._asdict(), "page": page, "order": [i, page]})
+            for page in range(1, last + 1)
+        ])
+        print(f"* [{segment.tag}] {last} pages")
+    print(f"✅ Queued {added} listing pages")
+    return added
+
+
+# ===============================
+# JOBS
+# ===============================
+def _segment(fields: dict) -> Segment:
+    return Segment(fields["city"], tuple(fields["revenue"]), tuple(fields["profit"]), fields["sort"])
+
+
+def handle_listing(queue, payload, limiter, use_cache):
+    companies = fetch_listing_page(_segment(payload["segment"]), payload["page"], use_cache, limiter)
+    if companies is None:
+        raise JobError("listing page could not be fetched")
+    queue.put_many("profile", [
+        (company_key(c), {"company": c, "order": [*payload["order"], i]}) for i, c in enumerate(companies)
+    ])
+    metrics.REGISTRY.add_rows("listing", len(companies))
+    return {"companies": len(companies)}
+
+
+def handle_profile(queue, payload, limiter, use_cache):
+    company = payload["company"]
+    html = fetch_company_page(dict(company), use_cache, limiter)
+    if html is None:
+        raise JobError("profile page could not be fetched")
+    details = parse_company_details(dict(company), html)
+    if isinstance(details.get("website"), str) and details["website"]:
+        queue.put("emails", company_key(details), {"website": details["website"]})
+    return {"details": details, "order": payload["order"]}
+
+
+def handle_emails(queue, payload, limiter, use_cache):
+    emails = find_emails_on_website(payload["website"], use_cache=use_cache)
+    # An unreachable site stays unreachable on a retry, keep it as done
+    return {"emails": emails or [], "reachable": emails is not None}
+
+
+HANDLERS = {"listing": handle_listing, "profile": handle_profile, "emails": handle_emails}
+
+
+# ===============================
+# WORKER
+# ===============================
+def _open_jobs(queue, kinds) -> int:
+    counts = queue.counts()
+    return sum(counts.get(k, {}).get("ready", 0) + counts.get(k, {}).get("leased", 0) for k in kinds)
+
+
+def run_worker(
+        queue,
+        kinds=KINDS,
+        threads: int = Concurrency.WORKERS.value,
+        rate: float = Concurrency.RATE_PER_HOST.value,
+        burst: int = Concurrency.BURST.value,
+        use_cache: bool = Cache.ENABLED.value,
+        adaptive: bool = Concurrency.ADAPTIVE.value,
+        exit_when_idle: bool = True,
+        poll: float = Queue.POLL_INTERVAL.value,
+    ) -> int:
+    """
+    Lease and run jobs on `threads` threads until the queue has no open jobs of
+    `kinds` left (or forever, if not exit_when_idle). Returns the jobs done.
+    """
+    limiter = AdaptiveLimiter(rate, threads, burst) if adaptive else HostRateLimiter(rate, burst)
+    stop = threading.Event()
+    done = [0]
+    done_lock = threading.Lock()
+    progress = metrics.Progress("queue")
+
+    def loop():
+        while not stop.is_set():
+            jobs = queue.lease(kinds)
+            if not jobs:
+                if exit_when_idle and _open_jobs(queue, kinds) == 0:
+                    return
+                stop.wait(poll)
+                continue
+            job = jobs[0]
+            try:
+                result = HANDLERS[job.kind](queue, job.payload, limiter, use_cache)
+            except Exception as e:
+                queue.fail(job, f"{type(e).__name__}: {e}")
+                outcome = "failed" if job.attempts >= queue.max_attempts else "retry"
+                metrics.inc("queue_jobs_total", kind=job.kind, result=outcome)
+                continue
+            queue.complete(job, result)
+            metrics.inc("queue_jobs_total", kind=job.kind, result="done")
+            with done_lock:
+                done[0] += 1
+            progress.advance()
+
+    pool = ThreadPoolExecutor(max_workers=threads)
+    futures = [pool.submit(loop) for _ in range(threads)]
+    try:
+        while not all(f.done() for f in futures):
+            time.sleep(0.2)
+    except KeyboardInterrupt:
+        # Leased jobs become visible again after the visibility timeout
+        print("\n* Stopping, waiting for the running jobs ...")
+        stop.set()
+    finally:
+        pool.shutdown(wait=True)
+        progress.close()
+    for f in futures:
+        if f.done() and f.exception():
+            raise f.exception()
+    return done[0]
+
+
+# ===============================
+# STATUS / EXPORT
+# ===============================
+def print_status(queue):
+    print(f"{'kind':10} {'ready':>8} {'leased':>8} {'done':>8} {'failed':>8}")
+    for kind, c in queue.counts().items():
+        print(f"{kind:10} {c['ready']:>8} {c['leased']:>8} {c['done']:>8} {c['failed']:>8}")
+
+
+def export(queue, path: str) -> int:
+    """
+    Write the fetched profiles, in listing order and with the emails found on
+    their websites added, as one details file (CSV or Parquet).
+    """
+    emails = {key: r["emails"] for key, r in queue.results("emails")}
+    rows = []
+    for key, r in sorted(queue.results("profile"), key=lambda kv: kv[1]["order"]):
+        details = r["details"]
+        details["emails"] = list(dict.fromkeys(to_list(details.get("emails")) + emails.get(key, [])))
+        rows.append(details)
+    write_table(rows, path)
+    print(f"✅ Exported {len(rows)} companies to {path}")
+    return len(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl through a shared work queue")
+    parser.add_argument("--queue", default=Queue.URL.value, help="SQLite path or redis:// url")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed_cmd = commands.add_parser("seed", help="queue the listing pages")
+    seed_cmd.add_argument("--segments", action="store_true", help="every AllaBolag.CITIES x REVENUE_BANDS x PROFIT_BANDS segment")
+    seed_cmd.add_argument("--split", action="store_true", help="split into bands of at most AllaBolag.PAGE_BUDGET pages first")
+    seed_cmd.add_argument("--no-cache", action="store_true")
+
+    work_cmd = commands.add_parser("work", help="run jobs until the queue is empty")
+    work_cmd.add_argument("--kinds", default=",".join(KINDS), help="comma-separated job kinds to take")
+    work_cmd.add_argument("--threads", type=int, default=Concurrency.WORKERS.value)
+    work_cmd.add_argument("--rate", type=float, default=Concurrency.RATE_PER_HOST.value, help="requests/sec per host, this process")
+    work_cmd.add_argument("--forever", action="store_true", help="keep polling when the queue is empty")
+    work_cmd.add_argument("--no-cache", action="store_true")
+
+    commands.add_parser("status", help="jobs per kind and status")
+
+    export_cmd = commands.add_parser("export", help="write the results as a details file")
+    export_cmd.add_argument("path")
+
+    args = parser.parse_args()
+    queue = open_queue(args.queue)
+    try:
+        if args.command == "seed":
+            use_cache = not args.no_cache
+            segments = segments_from_config() if args.segments else [default_segment()]
+            try:
+                if args.split:
+                    segments = partition_segments(segments, use_cache=use_cache)
+                seed(queue, segments, use_cache=use_cache)
+            except ListingError as e:
+                raise SystemExit(f"❌ Seeding incomplete, {e}. Run seed again to add the rest.")
+        elif args.command == "work":
+            n = run_worker(queue, kinds=args.kinds.split(","), threads=args.threads, rate=args.rate,
+                           use_cache=not args.no_cache, exit_when_idle=not args.forever)
+            print(f"✅ {n} jobs done")
+        elif args.command == "status":
+            print_status(queue)
+        else:
+            export(queue, args.path)
+    finally:
+        queue.close()
@@ -1,169 +1,278 @@
-from bs4 import BeautifulSoup
-import requests
 import time
-import re
+from typing import NamedTuple
+
+import requests
+
+from src.scrape import http_client
+from src.scrape.setup import AllaBolag, Cache, Concurrency
+from src.scrape.concurrency import AdaptiveLimiter, HostRateLimiter, RetryQueue, bounded_map
+from src.scrape.parse_allabolag import parse_company_links, parse_company_details
+from src.utils.checkpoint import Journal
+from src.utils import metrics
+
+
+class ListingError(Exception):
+    """
+    A result page could not be fetched, even after retrying.
+    """
+
+
+class Segment(NamedTuple):
+    """
+    One search on allabolag: a city with a revenue and a profit band.
+    """
+    city: str
+    revenue: tuple[int, int]
+    profit: tuple[int, int]
+    sort: str = AllaBolag.SORT_BY.value
+
+    @property
+    def tag(self) -> str:
+        city = "-".join(self.city.lower().split())
+        return f"{city}_rev-{self.revenue[0]}-{self.revenue[1]}_profit-{self.profit[0]}-{self.profit[1]}_sort-{self.sort}"
+
+
+def default_segment() -> Segment:
+    return Segment(
+        AllaBolag.CITY.value,
+        tuple(AllaBolag.REVENUE_LIMITS.value),
+        tuple(AllaBolag.PROFIT_LIMITS.value),
+        AllaBolag.SORT_BY.value,
+    )
+
 
-from src.scrape.setup import AllaBolag, SLEEP_TIME
+def segment_url(segment: Segment, page: int = 1) -> str:
+    page_param = f"&page={page}" if page != 1 else ""
+    return (
+        f"{AllaBolag.SEARCH_URL.value}?location={segment.city}&sort={segment.sort}"
+        f"&revenueFrom={segment.revenue[0]}&revenueTo={segment.revenue[1]}"
+        f"&profitFrom={segment.profit[0]}&profitTo={segment.profit[1]}{page_param}"
+    )
 
 
-def get_company_links(page=1):
+def fetch_listing_page(segment: Segment, page: int = 1, use_cache: bool = Cache.ENABLED.value, limiter=None):
+    """
+    Companies on one result page, or None if the page could not be fetched
+    (as opposed to [] for a page past the end).
+    """
     # Contruct the url
-    url = f"{AllaBolag.SEARCH_URL.value}?location={AllaBolag.CITY.value}&sort={AllaBolag.SORT_BY.value}&revenueFrom={AllaBolag.REVENUE_LIMITS.value[0]}&revenueTo={AllaBolag.REVENUE_LIMITS.value[1]}&profitFrom={AllaBolag.PROFIT_LIMITS.value[0]}&profitTo={AllaBolag.PROFIT_LIMITS.value[1]}{f"&page={page}" if page != 1 else ""}"
-    
+    url = segment_url(segment, page)
+
     # Send the request
-    response = requests.get(url, headers=AllaBolag.HEADERS.value)
+    try:
+        response = http_client.get(url, headers=AllaBolag.HEADERS.value, cache=use_cache, limiter=limiter)
+    except requests.RequestException as e:
+        print(f"Fel vid hämtning av sida {page}: {type(e).__name__}")
+        return None
     if response.status_code != 200:
         print(f"Fel vid hämtning av sida {page}: {response.status_code}")
-        return []
-    
-    # Parse the msg
-    soup = BeautifulSoup(response.text, "html.parser")
-
-    # Select the "company cards" from the specified list-div
-    cards = soup.select("div.SegmentationSearchResultCard-card")
-
-    companies = []
-    for card in cards:
-        a_tag = card.find("a", href=True)
-        if not a_tag:
-            continue
-        name = a_tag.text.strip()
-        relative_url = a_tag["href"]
-        full_url = AllaBolag.BASE_URL.value + relative_url
-        companies.append({"name": name, "profile_url": full_url})
-    
-    return companies
-
-
-def scrape_multiple_pages():
-    all_companies = []
-    for page in range(1, AllaBolag.NUM_PAGES.value + 1):
-        print(f"* Sida {page}: ", end="")
-        companies = get_company_links(page)
-        if not companies:
-            print("Inga fler företag hittades.")
+        return None
+
+    # Parse the "company cards" from the specified list-div
+    return parse_company_links(response.text)
+
+
+def require_listing_page(
+        segment: Segment,
+        page: int = 1,
+        use_cache: bool = Cache.ENABLED.value,
+        limiter=None,
+        attempts: int = Concurrency.RETRY_ATTEMPTS.value,
+        delay: float = Concurrency.RETRY_DELAY.value,
+    ) -> list[dict]:
+    """
+    fetch_listing_page, tried again after `delay`, 2*`delay`, ... seconds while
+    the page can't be fetched. Raises ListingError after `attempts` tries, so a
+    failed page is never taken for the end of the listing.
+    """
+    for attempt in range(1, attempts + 1):
+        companies = fetch_listing_page(segment, page, use_cache, limiter)
+        if companies is not None:
+            return companies
+        if attempt < attempts:
+            time.sleep(delay * 2 ** (attempt - 1))
+    raise ListingError(f"page {page} of {segment.tag} could not be fetched after {attempts} attempts")
+
+
+def get_company_links(page=1, use_cache: bool = Cache.ENABLED.value, segment: Segment | None = None):
+    return fetch_listing_page(segment or default_segment(), page, use_cache) or []
+
+
+def find_last_page(fetch_page, max_pages: int = AllaBolag.NUM_PAGES.value, known=None):
+    """
+    Last non-empty result page, found with an exponential probe (1, 2, 4, ...)
+    followed by a binary search, i.e. ~2*log2(max_pages) requests.
+    `known` maps page -> bool for pages that are already known to be (non-)empty.
+    """
+    known = dict(known or {})
+
+    def has_companies(page):
+        if page not in known:
+            known[page] = bool(fetch_page(page))
+        return known[page]
+
+    if not has_companies(1):
+        return 0
+    lo, hi = 1, max_pages + 1  # lo is non-empty, hi is empty (or past the end)
+    page = 2
+    while page <= max_pages:
+        if not has_companies(page):
+            hi = page
             break
-        all_companies.extend(companies)
-        print(f"\tFound {len(companies)} companies, total= {len(all_companies)}")
-        time.sleep(SLEEP_TIME)
+        lo = page
+        page *= 2
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if has_companies(mid):
+            lo = mid
+        else:
+            hi = mid
+    return lo
+
+
+def scrape_multiple_pages(
+        journal_path: str | None = None,
+        workers: int = Concurrency.WORKERS.value,
+        rate: float = Concurrency.RATE_PER_HOST.value,
+        burst: int = Concurrency.BURST.value,
+        use_cache: bool = Cache.ENABLED.value,
+        segment: Segment | None = None,
+        limiter=None,
+    ):
+    """
+    Fetch all result pages: find the last page, then fetch the rest concurrently
+    within the per-host rate budget. With a `journal_path`, finished pages are
+    recorded so an interrupted run only fetches the missing ones. A page that
+    can't be fetched raises ListingError (see require_listing_page) instead of
+    passing for the end of the listing; the pages done so far stay journaled.
+    `segment` defaults to the AllaBolag config; a shared `limiter` (anything
+    with acquire(url)) replaces the per-call HostRateLimiter.
+    """
+    label = f"[{segment.tag}] " if segment else ""
+    search = segment or default_segment()
+    journal = Journal(journal_path) if journal_path else None
+    pages = {}
+    known = {}
+    if journal is not None:
+        for key, entry in journal.entries.items():
+            if entry["state"] == "done":
+                pages[int(key)] = entry["companies"]
+                known[int(key)] = True
+        print(f"* {label}Resuming, {len(known)} pages already done")
+
+    limiter = limiter or HostRateLimiter(rate, burst)
+
+    def fetch_page(page):
+        companies = require_listing_page(search, page, use_cache, limiter)
+        pages[page] = companies
+        metrics.REGISTRY.add_rows("listing", len(companies))
+        if journal is not None:
+            journal.record(str(page), state="done" if companies else "empty", companies=companies)
+        return companies
+
+    try:
+        last_page = find_last_page(fetch_page, known=known)
+        print(f"* {label}Last page: {last_page}")
+
+        missing = [p for p in range(1, last_page + 1) if not pages.get(p)]
+        for page, companies in zip(missing, bounded_map(fetch_page, missing, workers=workers)):
+            print(f"* {label}Sida {page}: \tFound {len(companies)} companies")
+    finally:
+        if journal is not None:
+            journal.close()
+
+    all_companies = []
+    for page in range(1, last_page + 1):
+        all_companies.extend(pages.get(page, []))
+    print(f"* {label}Total= {len(all_companies)} companies")
     return all_companies
 
 
-def extract_company_details(company):
-    response = requests.get(company["profile_url"], headers=AllaBolag.HEADERS.value)
+def fetch_company_page(company, use_cache: bool = Cache.ENABLED.value, limiter=None):
+    """
+    Raw html of the company's profile page, or None if it could not be fetched.
+    """
+    try:
+        response = http_client.get(company["profile_url"], headers=AllaBolag.HEADERS.value, cache=use_cache, limiter=limiter)
+    except requests.RequestException as e:
+        print(f"Fel vid hämtning av företagssida: {type(e).__name__}")
+        return None
     if response.status_code != 200:
         print(f"Fel vid hämtning av företagssida: {response.status_code}")
+        return None
+    return response.text
+
+
+def extract_company_details(company, use_cache: bool = Cache.ENABLED.value, limiter=None):
+    html = fetch_company_page(company, use_cache, limiter)
+    if html is None:
         return company
 
-    soup = BeautifulSoup(response.text, "html.parser")
-    
-    company["emails"] = []
-
-    # --- Org-nummer from URL fallback ---
-    match_org = re.search(r"/(\d{10})$", company["profile_url"])
-    company["org_number"] = match_org.group(1) if match_org else None
-
-    # --- Revenue extraction from accounting table ---
-    rows = soup.select("table.AccountFiguresWidget-accountingtable tr")
-    for row in rows:
-        header = row.find("th")
-        if header and "Omsättning" in header.text:
-            td = row.find("td")
-            if td:
-                revenue_text = td.get_text(strip=True).replace("\xa0", "").replace(" ", "")
-                try:
-                    company["revenue"] = int(revenue_text)
-                except ValueError:
-                    company["revenue"] = None
-            break
+    return parse_company_details(company, html)
 
-    # --- Official company info block ---
-    official_info = soup.select("span.OfficialCompanyInformationCard-propertyList")
-    for item in official_info:
-        key = item.select_one("span.OfficialCompanyInformationCard-property")
-        value = item.select_one("span.OfficialCompanyInformationCard-propertyValue")
-        if not key or not value:
-            continue
-        k = key.text.strip().lower()
-        v = value.get_text(strip=True)
-
-        if "juridiskt namn" in k:
-            company["legal_name"] = v
-        elif "organisationsnummer" in k:
-            company["org_number"] = v
-        elif "registreringsdatum" in k:
-            company["registration_date"] = v
-        elif "bolagsform" in k:
-            company["company_type"] = v
-        elif "antal anställda" in k:
-            company["employees"] = v
-        elif "aktiekapital" in k:
-            company["share_capital"] = v
-        elif "adress" in k and "post" not in k:
-            company["address"] = v
-        elif "postadress" in k:
-            company["postal_address"] = v
-            city_match = re.search(r"\d{3}\s*\d{2}\s+(.+)", v)
-            if city_match:
-                company["city"] = city_match.group(1).strip()
-        elif "verkställande direktör" in k:
-            company["ceo"] = v
-
-    # --- Website and email from contact info ---
-    contact_blocks = soup.select("span.ContactInformationCard-smallPropertyList")
-    for block in contact_blocks:
-        label = block.select_one("span.ContactInformationCard-smallProperty")
-        val = block.select_one("span.ContactInformationCard-smallPropertyValue")
-        if not label or not val:
-            continue
-        label_text = label.text.strip().lower()
-        value_text = val.get_text(strip=True)
-        if "e-post" in label_text:
-            company["emails"].append(value_text)
-        elif "hemsida" in label_text:
-            company["website"] = value_text
-
-    # --- SNI codes ---
-    sni_list = []
-    sni_blocks = soup.select("span.OfficialCompanyInformationCard-propertyValue a[href*='naceIndustry']")
-    for link in sni_blocks:
-        sni_list.append(link.text.strip())
-    company["sni_codes"] = sni_list
-    
-    # --- Contact info block (Kontaktuppgifter) ---
-    contact_info_spans = soup.select("span.ContactInformationCard-smallPropertyList")
-    for span in contact_info_spans:
-        label = span.select_one("span.ContactInformationCard-smallProperty")
-        value = span.select_one("span.ContactInformationCard-smallPropertyValue")
-
-        if not label or not value:
-            continue
-
-        label_text = label.get_text(strip=True).lower()
-
-        if "telefon" in label_text:
-            company["phone"] = value.get_text(strip=True)
-        elif "hemsida" in label_text:
-            a_tag = value.find("a", href=True)
-            if a_tag:
-                company["website"] = a_tag["href"]
-        elif "e-post" in label_text:
-            btn = value.find("button")
-            if btn:
-                company["emails"].append(btn.get_text(strip=True))
-        elif "adress" in label_text and "post" not in label_text:
-            company["address"] = value.get_text(strip=True)
-        elif "postadress" in label_text:
-            full_address = value.get_text(strip=True)
-            company["postal_address"] = full_address
-            city_match = re.search(r"\d{3}\s*\d{2}\s+(.+)", full_address)
-            if city_match:
-                company["city"] = city_match.group(1).strip()
-
-    # --- Verksamhet & ändamål (verksamhetsbeskrivning) ---
-    desc = soup.select_one(
-        "div.MuiGrid-root.MuiGrid-direction-xs-row.MuiGrid-grid-xs-12.MuiTypography-root.MuiTypography-body2.mui-18twy0e"
-    )
-    company["business_purpose"] = desc.get_text(" ", strip=True) if desc else None
-    
-    return company
\ No newline at end of file
+
+def extract_many_company_details(
+        companies,
+        workers: int = Concurrency.WORKERS.value,
+        rate: float = Concurrency.RATE_PER_HOST.value,
+        burst: int = Concurrency.BURST.value,
+        use_cache: bool = Cache.ENABLED.value,
+        adaptive: bool = Concurrency.ADAPTIVE.value,
+        limiter=None,
+    ):
+    """
+    Fetch company profiles concurrently, keeping at most `workers` requests in flight
+    and each host under `rate` requests per second (with `adaptive`, the start rate
+    of an AdaptiveLimiter; a shared `limiter` replaces both). Yields the details in
+    the same order as `companies`, so callers can write rows as they arrive.
+    """
+    limiter = limiter or (AdaptiveLimiter(rate, workers, burst) if adaptive else HostRateLimiter(rate, burst))
+    yield from bounded_map(lambda company: extract_company_details(company, use_cache, limiter), companies, workers=workers)
+
+
+def fetch_with_retries(
+        fetch_details,
+        companies,
+        attempts: int = Concurrency.RETRY_ATTEMPTS.value,
+        delay: float = Concurrency.RETRY_DELAY.value,
+        **kwargs,
+    ):
+    """
+    fetch_details(companies, **kwargs) (extract_many_company_details or the
+    pooled version) with a retry queue: profiles that could not be fetched are
+    fetched again after a backoff, up to `attempts` times in all. Details are
+    yielded as they arrive, the retried ones after the rest; what still fails
+    is yielded last, as the bare company (no "sni_codes"), for the caller to mark.
+    Every batch shares one limiter, so the rate learned and any Retry-After
+    pause carry over to the retries.
+    """
+    if kwargs.get("limiter") is None:
+        rate = kwargs.get("rate", Concurrency.RATE_PER_HOST.value)
+        burst = kwargs.get("burst", Concurrency.BURST.value)
+        workers = kwargs.get("workers", kwargs.get("fetch_workers", Concurrency.WORKERS.value))
+        adaptive = kwargs.get("adaptive", Concurrency.ADAPTIVE.value)
+        kwargs["limiter"] = AdaptiveLimiter(rate, workers, burst) if adaptive else HostRateLimiter(rate, burst)
+    retry = RetryQueue(delay, attempts)
+    given_up = []
+
+    def sort_out(details, tries):
+        if "sni_codes" in details:
+            metrics.inc("details_fetch_total", result="ok" if tries == 1 else "retried")
+            return True
+        if not retry.put(details, tries):
+            metrics.inc("details_fetch_total", result="failed")
+            given_up.append(details)
+        return False
+
+    for details in fetch_details(companies, **kwargs):
+        if sort_out(details, 1):
+            yield details
+
+    while retry:
+        batch = retry.due()
+        print(f"* Retrying {len(batch)} companies (attempt {batch[0][1] + 1}), {len(retry)} more waiting")
+        for (company, tries), details in zip(batch, fetch_details([c for c, _ in batch], **kwargs)):
+            if sort_out(details, tries + 1):
+                yield details
+
+    yield from given_up
@@ -1,31 +1,129 @@
 import re
-import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urljoin, urlparse
 from bs4 import BeautifulSoup
-from src.scrape.setup import Mail
-
-def find_emails_on_website(url):
-    email_list = []
-    for page in Mail.MAIL_SEARCH_PAGES.value:
-        complete_url = f"{url}/{page}"
-        try:
-            resp = requests.get(complete_url, timeout=5)
-            if resp.status_code != 200:
-                return email_list
-            
-            # Extract emails
-            soup = BeautifulSoup(resp.text, "html.parser")
-            emails = re.findall(r"[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+", soup.text)
-            
-            # Email TLD filtering
-            valid_emails = []
-            for e in emails:
-                e = e.lower().strip()
-                if any(e.endswith(tld) for tld in Mail.VALID_EMAIL_TLD.value):
-                    valid_emails.append(e)
-                    
-            if valid_emails:
-                email_list = list(set(email_list + valid_emails)) # NOTE: excludes duplicates
-        except Exception as e:
-            return None
-    
-    return email_list
\ No newline at end of file
+from src.scrape import http_client
+from src.scrape.concurrency import bounded_map
+from src.scrape.setup import Cache, Concurrency, Mail
+from src.utils import metrics
+
+EMAIL_RE = re.compile(r"[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+")
+
+
+def _emails_from_soup(soup):
+    emails = EMAIL_RE.findall(soup.text)
+
+    # Email TLD filtering
+    valid_emails = []
+    for e in emails:
+        e = e.lower().strip()
+        if any(e.endswith(tld) for tld in Mail.VALID_EMAIL_TLD.value):
+            valid_emails.append(e)
+    return valid_emails
+
+
+def _same_site(a, b):
+    return urlparse(a).netloc.lower().removeprefix("www.") == urlparse(b).netloc.lower().removeprefix("www.")
+
+
+def _contact_links(soup, base_url):
+    """
+    Same-site links from the page that look like contact/about pages, in page order.
+    """
+    links = []
+    for a in soup.find_all("a", href=True):
+        text = f"{a['href']} {a.get_text(' ', strip=True)}".lower()
+        if not any(k in text for k in Mail.CONTACT_KEYWORDS.value):
+            continue
+        link = urljoin(base_url, a["href"]).split("#")[0]
+        if link.startswith("http") and _same_site(link, base_url) and link not in links:
+            links.append(link)
+    return links
+
+
+def scan_page(html, base_url=None):
+    """
+    (emails, contact links) of a page; links only with a `base_url`, i.e. for
+    the homepage. Top-level so it can run on a process pool.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    return _emails_from_soup(soup), _contact_links(soup, base_url) if base_url else []
+
+
+def _scan_here(html, base_url=None):
+    with metrics.timer("parse_seconds", metrics.PARSE_BUCKETS, kind="extract_emails"):
+        return scan_page(html, base_url)
+
+
+def _get_html(url, use_cache):
+    try:
+        resp = http_client.get(url, cache=use_cache)
+    except Exception:
+        return None
+    return resp.text if resp.status_code == 200 else None
+
+
+def _candidate_urls(url):
+    return [f"{url}/{page}" for page in Mail.MAIL_SEARCH_PAGES.value if page]
+
+
+def find_emails_on_website(
+        url,
+        use_cache: bool = Cache.ENABLED.value,
+        min_emails: int = Mail.MIN_EMAILS.value,
+        workers: int = Mail.WORKERS.value,
+        scan=_scan_here,
+    ):
+    """
+    Crawl the homepage, then contact-looking links found on it, then the usual
+    Mail.MAIL_SEARCH_PAGES paths, `workers` at a time. Stops as soon as
+    `min_emails` emails are found. Returns None if there is no website or it
+    could not be reached. `scan` is scan_page or something that runs it
+    elsewhere (find_emails_in_pool runs it on a process pool).
+    """
+    if not isinstance(url, str) or not url.strip():
+        return None
+    url = url.strip().rstrip("/")
+    try:
+        home = http_client.get(f"{url}/", cache=use_cache)
+    except Exception:
+        return None
+
+    email_list = set()
+    candidates = []
+    if home.status_code == 200:
+        emails, candidates = scan(home.text, home.url or f"{url}/")
+        email_list.update(emails)
+    if len(email_list) >= min_emails:
+        return list(email_list)
+
+    seen = {home.url, f"{url}/"}
+    ordered = []
+    for c in candidates + _candidate_urls(url):
+        if c not in seen:
+            seen.add(c)
+            ordered.append(c)
+
+    def fetch_and_scan(page_url):
+        html = _get_html(page_url, use_cache)
+        return scan(html)[0] if html is not None else []
+
+    # Links from the homepage are submitted first, so they are fetched first
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = [pool.submit(fetch_and_scan, c) for c in ordered]
+        for future in as_completed(futures):
+            email_list.update(future.result())
+            if len(email_list) >= min_emails:
+                break
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    return list(email_list)
+
+
+def find_emails_on_many_websites(urls, workers: int = Concurrency.WORKERS.value, **kwargs):
+    """
+    find_emails_on_website for many sites, `workers` sites at a time, in input order.
+    """
+    yield from bounded_map(lambda url: find_emails_on_website(url, **kwargs), urls, workers=workers)
@@ -1,40 +1,39 @@
 import requests
-from requests import Response
 from bs4 import BeautifulSoup
 import urllib.parse
-from urllib.parse import urlparse
-import re 
-import json
 
+from src.scrape import http_client
+from src.scrape.domain_filter import DomainMatcher
 from src.scrape.setup import Website, GoogleSearch
 
+WEBSITE_EXCLUSIONS = DomainMatcher(Website.WEBSITE_EXCLUSIONS.value)
+GOOGLE_EXCLUSIONS = DomainMatcher(GoogleSearch.WEBSITE_EXCLUSIONS.value)
 
-def ddg_search_website(company_name):
-    query = f"{company_name} site:.se"
-    encoded_query = urllib.parse.quote_plus(query)
-    url = f"{Website.URL.value}?q={encoded_query}"
-
-    try:
-        response = requests.get(url, headers=Website.HEADERS.value, timeout=10)
-        if response.status_code != 200:
-            print("Status code:", response.status_code)
 
-        soup = BeautifulSoup(response.text, "html.parser")
-        results = soup.select("a.result__a")
+# ===============================
+# RAW PROVIDER LOOKUPS
+# ===============================
+# Each returns every result link in ranking order and raises on HTTP/API errors,
+# so callers can tell "no result" apart from "provider failed".
 
-        for link in results:
-            href = link.get("href")
-            if href and href.startswith("http") and all(x not in href for x in Website.WEBSITE_EXCLUSIONS.value):
-                return href
+def ddg_links(company_name) -> list[str]:
+    query = f"{company_name} site:.se"
+    encoded_query = urllib.parse.quote_plus(query)
+    url = f"{Website.DDG_URL.value}?q={encoded_query}"
 
-        return None
+    response = http_client.get(url, headers={"User-Agent": "Mozilla/5.0"})
+    response.raise_for_status()
 
-    except Exception as e:
-        print(f"[Error] {e}")
-        return None
+    soup = BeautifulSoup(response.text, "html.parser")
+    links = []
+    for link in soup.select("a.result__a"):
+        href = link.get("href")
+        if href and href.startswith("http"):
+            links.append(href)
+    return links
 
 
-def brave_search_website(company_name):
+def brave_links(company_name) -> list[str]:
     query = f"{company_name} {Website.QUERY_ADDITION.value}"
     params = {
         "q": query,
@@ -44,40 +43,24 @@ def brave_search_website(company_name):
         "count": 10
     }
 
-    try:
-        response = requests.get(Website.URL.value, headers=Website.HEADERS.value, params=params, timeout=10)
-        if response.status_code != 200:
-            print("Status code:", response.status_code)
-        data = response.json()
-        results = data.get("web", {}).get("results", [])
-        for item in results:
-            href = item.get("url")
-            if href and all(excl not in href for excl in Website.WEBSITE_EXCLUSIONS.value):
-                return href
+    response = http_client.get(Website.URL.value, headers=Website.HEADERS.value, params=params)
+    response.raise_for_status()
+    results = response.json().get("web", {}).get("results", [])
+    return [item["url"] for item in results if item.get("url")]
 
-        return None
 
-    except Exception as e:
-        print(f"[Error] {e}")
-        return None
-    
-    
-def google_search_website(company_name: str, *, num_results: int = 10, timeout: int = 10) -> str | None:
+def google_links(company_name: str, *, num_results: int = 10, timeout: float | None = None) -> list[str]:
     """
-    Search Google's Custom Search JSON API for the company's website (Örebro-biased)
-    and return the first URL not in the exclusion list. Returns None if not found.
+    Google's Custom Search JSON API (Örebro-biased).
 
     Requires:
       - GOOGLE_CSE_API_KEY env var (or replace placeholder)
       - GOOGLE_CSE_CX env var (or replace placeholder)
     """
-    api_key = GoogleSearch.API_KEY.value
-    cx = GoogleSearch.CX.value
-    query = f"{company_name}"
     params = {
-        "key": api_key,
-        "cx": cx,
-        "q": query,
+        "key": GoogleSearch.API_KEY.value,
+        "cx": GoogleSearch.CX.value,
+        "q": f"{company_name}",
         "num": max(1, min(10, num_results)),  # Google: 1..10 per call
         # Light locale biasing (keep it simple)
         "hl": "sv",        # UI language
@@ -86,34 +69,51 @@ def google_search_website(company_name: str, *, num_results: int = 10, timeout:
         "cr": "countrySE", # country restrict
     }
 
+    resp = http_client.get(GoogleSearch.URL.value, params=params, timeout=timeout)
+    if resp.status_code != 200:
+        raise requests.HTTPError(f"[Google CSE] Status code: {resp.status_code} - {resp.text[:200]}", response=resp)
+    items = resp.json().get("items", []) or []
+    return [it["link"] for it in items if it.get("link")]
+
+
+def first_allowed(links, exclusions: DomainMatcher) -> str | None:
+    for href in links:
+        if not exclusions.matches(href):
+            return href
+    return None
+
+
+# ===============================
+# SINGLE LOOKUPS
+# ===============================
+def ddg_search_website(company_name):
     try:
-        print("\na")
-        resp : Response = requests.get(GoogleSearch.URL.value, params=params, timeout=timeout)
-        print("URL:", resp.url)
-        print("Status:", resp.status_code)
-        print("Content-Type:", resp.headers.get("Content-Type"))
-        print("Body head:", resp.text[:300])
-        if resp.status_code != 200:
-            print(f"[Google CSE] Status code: {resp.status_code} - {resp.text[:200]}")
-            return None
-
-        data = json.loads(resp.text) # resp.json()
-        
-        items = data.get("items", []) or []
-
-        exclusions = GoogleSearch.WEBSITE_EXCLUSIONS.value
-        
-        for it in items:
-            href = it.get("link")
-            if href and all(excl not in href for excl in exclusions):
-                return href
+        return first_allowed(ddg_links(company_name), WEBSITE_EXCLUSIONS)
+    except Exception as e:
+        print(f"[Error] {e}")
+        return None
 
+
+def brave_search_website(company_name):
+    try:
+        return first_allowed(brave_links(company_name), WEBSITE_EXCLUSIONS)
+    except Exception as e:
+        print(f"[Error] {e}")
         return None
 
+
+def google_search_website(company_name: str, *, num_results: int = 10, timeout: float | None = None) -> str | None:
+    """
+    Search Google's Custom Search JSON API for the company's website (Örebro-biased)
+    and return the first URL not in the exclusion list. Returns None if not found.
+    """
+    try:
+        links = google_links(company_name, num_results=num_results, timeout=timeout)
+        return first_allowed(links, GOOGLE_EXCLUSIONS)
+
     except requests.Timeout:
         print("[Google CSE] Request timed out.")
         return None
     except Exception as e:
         print(f"[Google CSE] Error: {e}")
         return None
-    
@@ -3,6 +3,94 @@ import os
 
 SLEEP_TIME = 0.5
 
+# Column order of the details/web CSVs (and the columnar schema in utils/storage.py)
+FIELDNAMES = [
+    "name",
+    "profile_url",
+    "emails",
+    "org_number",
+    "revenue",
+    "legal_name",
+    "registration_date",
+    "company_type",
+    "employees",
+    "ceo",
+    "address",
+    "postal_address",
+    "city",
+    "share_capital",
+    "sni_codes",
+    "business_purpose",
+    "phone",
+    "website",
+]
+
+# ===============================
+# CONCURRENCY
+# ===============================
+class Concurrency(Enum):
+    WORKERS = 8            # profile requests in flight
+    RATE_PER_HOST = 4.0    # requests per second per host
+    BURST = 2              # tokens a host may save up
+    PARSE_WORKERS = None   # parser processes in --pipeline mode, None = all cores
+    QUEUE_SIZE = 64        # raw html pages waiting to be parsed
+    ADAPTIVE = True        # AIMD: adjust rate and requests in flight per host to how the server answers
+    MIN_RATE = 0.25        # requests per second a throttled host is slowed down to at most
+    MAX_RATE = 20.0        # ... and sped up to at most
+    LATENCY_TARGET = 1.5   # seconds; slower answers count as congestion
+    DECREASE = 0.5         # rate and in-flight factor on congestion (429/503, Retry-After, timeouts)
+    RETRY_ATTEMPTS = 3     # fetches per profile before it is given up for this run
+    RETRY_DELAY = 10       # seconds before a failed profile is fetched again, doubled per attempt
+
+# ===============================
+# HTTP CLIENT
+# ===============================
+class Http(Enum):
+    CONNECT_TIMEOUT = 5
+    READ_TIMEOUT = 15
+    POOL_CONNECTIONS = 20  # number of hosts to keep a pool for
+    POOL_MAXSIZE = 16      # keep-alive connections per host
+    RETRIES = 3
+    BACKOFF_FACTOR = 0.5   # 0.5s, 1s, 2s ...
+    RETRY_STATUSES = [429, 500, 502, 503, 504]
+
+# ===============================
+# METRICS (utils/metrics.py)
+# ===============================
+class Metrics(Enum):
+    PROGRESS_INTERVAL = 1.0   # seconds between progress line updates
+    DUMP_PATH = "data/metrics/last_run.prom"  # main.py --metrics writes here (.json for JSON)
+
+# ===============================
+# HTTP RESPONSE CACHE
+# ===============================
+class Cache(Enum):
+    ENABLED = True
+    PATH = "data/cache/http.sqlite"
+    TTL = 7 * 24 * 3600             # seconds before an entry is revalidated
+    MAX_BYTES = 2 * 1024 ** 3       # compressed bodies, least recently used evicted first
+
+# ===============================
+# INCREMENTAL REFRESH (main.py --refresh)
+# ===============================
+class Refresh(Enum):
+    STATE_PATH = "data/refresh/state.sqlite"  # last fetch time + content hash per company
+    DELTA_DIR = "data/refresh/"               # one delta_<tag>_<time>.jsonl per run
+    MAX_AGE = 30 * 24 * 3600                  # seconds before a profile is re-fetched anyway
+    RANK_SLACK = 25                           # listing positions a company may move ...
+    RANK_TOLERANCE = 0.02                     # ... or this share of the listing, before it's re-fetched
+    MIN_LISTING_SHARE = 0.8                   # a listing smaller than this share of the previous one aborts the refresh
+
+# ===============================
+# SHARED WORK QUEUE (python -m src.scrape.queue_worker)
+# ===============================
+class Queue(Enum):
+    URL = "data/queue/queue.sqlite"    # a SQLite file (one box), or redis://host:6379/0 (several)
+    VISIBILITY_TIMEOUT = 300           # seconds a leased job is hidden before another worker may take it
+    MAX_ATTEMPTS = 5                   # leases per job before it's marked failed
+    RETRY_DELAY = 30                   # seconds before a failed job is retried, doubled per attempt
+    POLL_INTERVAL = 2.0                # seconds an idle worker waits before asking again
+
 # ===============================
 # ALLABOLAG SCRAPING
 # ===============================
@@ -14,15 +102,36 @@ class AllaBolag(Enum):
     SORT_BY = "revenueDesc"
     PROFIT_LIMITS = [-12153147, 85733000]
     REVENUE_LIMITS = [2000, 2000000]
+    # main.py --segments crawls every CITIES x REVENUE_BANDS x PROFIT_BANDS combination
+    CITIES = ["Örebro"]
+    REVENUE_BANDS = [[2000, 2000000]]
+    PROFIT_BANDS = [[-12153147, 85733000]]
+    PAGE_BUDGET = 50       # main.py --split: result pages a band may have before it's split in two
+    SPLIT_FIELD = "revenue"  # or "profit"
     HEADERS = {
         "User-Agent": "Mozilla/5.0"
     }
     
+# ===============================
+# STORAGE
+# ===============================
+class Storage(Enum):
+    # "csv" or "parquet" (needs pyarrow) for the companies list and details snapshot
+    FORMAT = "csv"
+
+# ===============================
+# HTML PARSING
+# ===============================
+class Parser(Enum):
+    # "auto" picks the fastest installed: selectolax > lxml > bs4 (html.parser)
+    BACKEND = "auto"
+
 # ===============================
 # FINDING WEBSITE
 # ===============================
 class Website(Enum):
     URL = "https://api.search.brave.com/res/v1/web/search"
+    DDG_URL = "https://html.duckduckgo.com/html/"
     API_KEY = "" 
     QUERY_ADDITION = "Örebro"
     WEBSITE_EXCLUSIONS = [
@@ -36,7 +145,7 @@ class Website(Enum):
         "orebro.se",
         "sverigetaxi.se",
         "jaktia.se",
-        "vakanser.se"
+        "vakanser.se",
         "proff.no",
         "proff.se",
         "wikipedia.se",
@@ -92,6 +201,15 @@ class GoogleSearch(Enum):
         "ledigalagenheter.org",
     ]
 
+# Batched lookups through website_search.py: tried in PROVIDERS order, each
+# provider kept under its QPS and daily quota (None = unlimited)
+class Search(Enum):
+    PROVIDERS = ["google", "brave", "ddg"]
+    QPS = {"google": 5.0, "brave": 1.0, "ddg": 0.5}
+    DAILY_QUOTA = {"google": 100, "brave": 2000, "ddg": None}
+    CACHE_PATH = "data/cache/search.sqlite"
+    WORKERS = 4
+
 # ===============================
 # FINDING EMAIL SCRAPING
 # ===============================
@@ -115,4 +233,8 @@ class Mail(Enum):
         "marketing",
         "team",
     ]
-    VALID_EMAIL_TLD = {".se", ".com", ".net", ".org"}
\ No newline at end of file
+    VALID_EMAIL_TLD = {".se", ".com", ".net", ".org"}
+    # Homepage links whose href or text contain these are fetched first
+    CONTACT_KEYWORDS = ["kontakt", "contact", "om-oss", "about", "team", "personal", "medarbetare"]
+    WORKERS = 6            # pages fetched in parallel per site
+    MIN_EMAILS = 2         # stop crawling a site once this many emails are found
\ No newline at end of file
@@ -0,0 +1,180 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import date
+from pathlib import Path
+
+from src.scrape.setup import Search
+from src.scrape.concurrency import TokenBucket, bounded_map
+from src.scrape.search_for_website import (
+    ddg_links, brave_links, google_links, first_allowed, WEBSITE_EXCLUSIONS, GOOGLE_EXCLUSIONS,
+)
+
+PROVIDERS = {
+    "google": (google_links, GOOGLE_EXCLUSIONS),
+    "brave": (brave_links, WEBSITE_EXCLUSIONS),
+    "ddg": (ddg_links, WEBSITE_EXCLUSIONS),
+}
+
+
+def normalize_query(company_name) -> str:
+    return " ".join(str(company_name).lower().split())
+
+
+class SearchCache:
+    """
+    Persistent (provider, query) -> result links, plus calls made per provider and day.
+    Raw links are stored (not the chosen website) so exclusion changes apply to old hits.
+    """
+    def __init__(self, path: str = Search.CACHE_PATH.value):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            """CREATE TABLE IF NOT EXISTS results (
+                provider TEXT NOT NULL,
+                query TEXT NOT NULL,
+                links TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (provider, query)
+            )"""
+        )
+        self.db.execute(
+            """CREATE TABLE IF NOT EXISTS usage (
+                provider TEXT NOT NULL,
+                day TEXT NOT NULL,
+                calls INTEGER NOT NULL,
+                PRIMARY KEY (provider, day)
+            )"""
+        )
+        self.db.commit()
+
+    def get(self, provider, query):
+        with self.lock:
+            row = self.db.execute(
+                "SELECT links FROM results WHERE provider = ? AND query = ?", (provider, query)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, provider, query, links):
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                (provider, query, json.dumps(links), time.time()),
+            )
+            self.db.commit()
+
+    def calls_today(self, provider) -> int:
+        with self.lock:
+            row = self.db.execute(
+                "SELECT calls FROM usage WHERE provider = ? AND day = ?", (provider, date.today().isoformat())
+            ).fetchone()
+        return row[0] if row else 0
+
+    def count_call(self, provider):
+        with self.lock:
+            self.db.execute(
+                """INSERT INTO usage VALUES (?, ?, 1)
+                   ON CONFLICT(provider, day) DO UPDATE SET calls = calls + 1""",
+                (provider, date.today().isoformat()),
+            )
+            self.db.commit()
+
+
+class QuotaMeter:
+    """
+    Per-provider counters: API calls made, cache hits (= calls saved), failures
+    and lookups skipped because the daily quota was used up.
+    """
+    def __init__(self):
+        self.counts = Counter()
+        self.lock = threading.Lock()
+
+    def add(self, provider, what):
+        with self.lock:
+            self.counts[(provider, what)] += 1
+
+    def summary(self) -> str:
+        lines = []
+        for provider in PROVIDERS:
+            c = {what: self.counts[(provider, what)] for what in ("calls", "cache_hits", "failed", "over_quota")}
+            if any(c.values()):
+                lines.append(
+                    f"* {provider}: {c['calls']} calls, {c['cache_hits']} cache hits (calls saved), "
+                    f"{c['failed']} failed, {c['over_quota']} over quota"
+                )
+        return "\n".join(lines)
+
+
+class WebsiteSearch:
+    """
+    Cached, rate-limited website lookup that falls back through `providers` in order
+    until one of them finds a website that isn't excluded.
+    """
+    def __init__(
+            self,
+            providers=Search.PROVIDERS.value,
+            qps=Search.QPS.value,
+            daily_quota=Search.DAILY_QUOTA.value,
+            cache_path: str = Search.CACHE_PATH.value,
+        ):
+        self.providers = [p for p in providers if p in PROVIDERS]
+        self.buckets = {p: TokenBucket(qps.get(p, 1.0)) for p in self.providers}
+        self.daily_quota = daily_quota
+        self.cache = SearchCache(cache_path)
+        self.meter = QuotaMeter()
+        self.quota_lock = threading.Lock()
+
+    def _reserve_call(self, provider) -> bool:
+        quota = self.daily_quota.get(provider)
+        with self.quota_lock:
+            if quota is not None and self.cache.calls_today(provider) >= quota:
+                return False
+            self.cache.count_call(provider)
+            return True
+
+    def links(self, provider, company_name):
+        """
+        Result links from one provider, from the cache when possible.
+        Returns None if the provider failed or is out of quota.
+        """
+        query = normalize_query(company_name)
+        cached = self.cache.get(provider, query)
+        if cached is not None:
+            self.meter.add(provider, "cache_hits")
+            return cached
+
+        if not self._reserve_call(provider):
+            self.meter.add(provider, "over_quota")
+            return None
+
+        lookup, _ = PROVIDERS[provider]
+        self.buckets[provider].acquire()
+        self.meter.add(provider, "calls")
+        try:
+            links = lookup(company_name)
+        except Exception as e:
+            self.meter.add(provider, "failed")
+            print(f"[{provider}] Error: {e}")
+            return None
+        self.cache.put(provider, query, links)
+        return links
+
+    def search(self, company_name) -> str | None:
+        for provider in self.providers:
+            links = self.links(provider, company_name)
+            if not links:
+                continue
+            href = first_allowed(links, PROVIDERS[provider][1])
+            if href:
+                return href
+        return None
+
+    def search_many(self, company_names, workers: int = Search.WORKERS.value):
+        """
+        Websites for many companies, `workers` lookups at a time, in input order.
+        """
+        yield from bounded_map(self.search, company_names, workers=workers)
@@ -0,0 +1,160 @@
+"""
+Build the static data bundle for index.html (GitHub Pages, no server).
+
+    python -m src.utils.bundle [--data out.csv] [--out bundle]
+
+Rows are sorted like the viewer's default order (revenue, descending), normalized
+once here (numeric revenue, prettified website) and split into chunks: a small
+first chunk for the first screenful, then larger ones the page streams in.
+Every file is written as .json plus precompressed .json.gz (and .json.br when
+brotli is installed); manifest.json lists the columns and chunks.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+from src.utils.storage import read_table, to_int, _is_missing
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DISPLAY_COLUMNS = ["name", "org_number", "revenue", "postal_address", "website"]  # as in index.html
+FIRST_CHUNK_ROWS = 100
+CHUNK_ROWS = 2000
+
+
+def pretty_website(url) -> str:
+    """
+    Same label as prettyWebsite() in index.html: host plus the first path part.
+    """
+    s = "" if _is_missing(url) else str(url).strip()
+    if not s:
+        return ""
+    try:
+        u = urlparse(s if s.startswith("http") else "https://" + s)
+    except ValueError:
+        return s
+    if not u.hostname:
+        return s
+    parts = [p for p in u.path.split("/") if p]
+    short = ("/" + parts[0] + ("/…" if len(parts) > 1 else "")) if parts else ""
+    return u.hostname + short
+
+
+def _text(v) -> str:
+    if isinstance(v, (list, tuple)):
+        return ", ".join(map(str, v))
+    return "" if _is_missing(v) else str(v).strip()
+
+
+def bundle_rows(df, display_columns=DISPLAY_COLUMNS):
+    """
+    (display, details) row arrays, revenue-sorted. Display rows get two extra
+    trailing values: numeric revenue and the website label.
+    """
+    display_columns = [c for c in display_columns if c in df.columns]
+    detail_columns = [c for c in df.columns if c not in display_columns]
+
+    revenue = [to_int(v) for v in df["revenue"]] if "revenue" in df.columns else [None] * len(df)
+    order = sorted(range(len(df)), key=lambda i: (revenue[i] is None, -(revenue[i] or 0)))
+
+    display_values = df[display_columns].to_numpy(dtype=object)
+    detail_values = df[detail_columns].to_numpy(dtype=object)
+    website_idx = display_columns.index("website") if "website" in display_columns else None
+
+    display, details = [], []
+    for i in order:
+        row = [_text(v) for v in display_values[i]]
+        row.append(revenue[i])
+        row.append(pretty_website(row[website_idx]) if website_idx is not None else "")
+        display.append(row)
+        details.append([_text(v) for v in detail_values[i]])
+    return display_columns, detail_columns, display, details
+
+
+def _chunks(n, first=FIRST_CHUNK_ROWS, size=CHUNK_ROWS):
+    start, step = 0, first
+    while start < n:
+        yield start, min(n, start + step)
+        start, step = start + step, size
+
+
+def _write_json(out_dir: Path, name: str, rows: list) -> dict:
+    body = json.dumps(rows, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    gz = gzip.compress(body, compresslevel=9, mtime=0)
+    (out_dir / name).write_bytes(body)
+    (out_dir / f"{name}.gz").write_bytes(gz)
+    sizes = {"bytes": len(body), "gz": len(gz)}
+    if brotli is not None:
+        br = brotli.compress(body, quality=11)
+        (out_dir / f"{name}.br").write_bytes(br)
+        sizes["br"] = len(br)
+    return sizes
+
+
+def build_bundle(src="out.csv", out_dir="bundle", display_columns=DISPLAY_COLUMNS,
+                 first_chunk_rows=FIRST_CHUNK_ROWS, chunk_rows=CHUNK_ROWS) -> dict:
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    display_columns, detail_columns, display, details = bundle_rows(read_table(src), display_columns)
+
+    # Content hash in the chunk names, so a new build never mixes with cached old chunks
+    digest = hashlib.sha1()
+    for row in display:
+        digest.update(json.dumps(row, ensure_ascii=False).encode("utf-8"))
+    for row in details:
+        digest.update(json.dumps(row, ensure_ascii=False).encode("utf-8"))
+    version = digest.hexdigest()[:12]
+
+    for old in [*out_dir.glob("rows-*.json*"), *out_dir.glob("details-*.json*")]:
+        old.unlink()
+
+    # Table rows and detail fields are separate files: the table streams in the
+    # rows, details are only fetched when a row in that chunk is expanded.
+    chunks = []
+    for n, (start, end) in enumerate(_chunks(len(display), first_chunk_rows, chunk_rows)):
+        rows_file, details_file = f"rows-{version}-{n:04d}.json", f"details-{version}-{n:04d}.json"
+        chunks.append({
+            "start": start,
+            "rows": end - start,
+            "file": rows_file,
+            "details_file": details_file,
+            **_write_json(out_dir, rows_file, display[start:end]),
+            "details": _write_json(out_dir, details_file, details[start:end]),
+        })
+
+    manifest = {
+        "version": version,
+        "built": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "source": Path(src).name,
+        "rows": len(display),
+        "display_columns": display_columns,
+        "extra_columns": ["revenue_value", "website_label"],
+        "detail_columns": detail_columns,
+        "order": {"column": "revenue", "dir": "desc"},
+        "chunks": chunks,
+    }
+    (out_dir / "manifest.json").write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the static data bundle for index.html")
+    parser.add_argument("--data", default="out.csv", help="CSV or Parquet from the pipeline")
+    parser.add_argument("--out", default="bundle")
+    parser.add_argument("--first-chunk-rows", type=int, default=FIRST_CHUNK_ROWS)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    m = build_bundle(args.data, args.out, first_chunk_rows=args.first_chunk_rows, chunk_rows=args.chunk_rows)
+    for label, sizes in (("rows", m["chunks"]), ("details", [c["details"] for c in m["chunks"]])):
+        kb = {k: sum(c.get(k, 0) for c in sizes) // 1024 for k in ("bytes", "gz", "br")}
+        print(f"* {label}: json {kb['bytes']} KB, gz {kb['gz']} KB" + (f", br {kb['br']} KB" if kb["br"] else ""))
+    print(f"✅ Wrote {m['rows']} rows in {len(m['chunks'])} chunks to {args.out}/")
@@ -0,0 +1,131 @@
+import csv
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+_ORG_FROM_URL = re.compile(r"/(\d{10})$")
+_ORG_DIGITS = re.compile(r"\D+")
+
+
+def company_key(company) -> str:
+    """
+    Stable key for a company at any stage: the 10-digit org number from the
+    profile url (or the org_number field), falling back to the lowercased name.
+    """
+    match = _ORG_FROM_URL.search(str(company.get("profile_url") or ""))
+    if match:
+        return match.group(1)
+    org = _ORG_DIGITS.sub("", str(company.get("org_number") or ""))
+    if org:
+        return org
+    return str(company.get("name") or "").strip().lower()
+
+
+class Journal:
+    """
+    Append-only JSONL journal of per-key state, e.g. {"key": "5567029516", "state": "done"}.
+
+    The whole journal is loaded into a dict on open, so lookups are O(1) and nothing
+    is ever rewritten. Records are flushed right away and fsync'ed every `fsync_every`
+    records; `companions` are files (e.g. the output CSV) that are flushed before
+    each record and fsync'ed before the journal, so the journal never claims more
+    than what was written to them.
+    """
+    def __init__(self, path: str, fsync_every: int = 50, companions=()):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.fsync_every = fsync_every
+        self.companions = list(companions)
+        self.entries: dict[str, dict] = {}
+        self.unsynced = 0
+        self.lock = threading.Lock()
+
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn last line after a crash
+                    self.entries[entry["key"]] = entry
+        self.file = open(self.path, "a", encoding="utf-8")
+        if self.file.tell() > 0:
+            with open(self.path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self.file.write("\n")  # don't glue the next record onto a torn line
+
+    def __contains__(self, key) -> bool:
+        return key in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        return self.entries.get(key, default)
+
+    def state(self, key):
+        entry = self.entries.get(key)
+        return entry["state"] if entry else None
+
+    def is_done(self, key) -> bool:
+        return self.state(key) == "done"
+
+    def record(self, key, state: str = "done", **fields):
+        entry = {"key": key, "state": state, "ts": time.time(), **fields}
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self.lock:
+            for f in self.companions:
+                f.flush()
+            self.entries[key] = entry
+            self.file.write(line)
+            self.file.flush()
+            self.unsynced += 1
+            if self.unsynced >= self.fsync_every:
+                self._sync()
+
+    def sync(self):
+        with self.lock:
+            self._sync()
+
+    def _sync(self):
+        for f in self.companions:
+            f.flush()
+            os.fsync(f.fileno())
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.unsynced = 0
+
+    def close(self):
+        if not self.file.closed:
+            self.sync()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def seed_journal(journal_path: str, details_path: str) -> int:
+    """
+    A details CSV written before its journal existed: record each of its rows
+    as done in a new journal at `journal_path`, so a resumed run doesn't fetch
+    them again. Nothing is done if the journal already exists or the CSV
+    doesn't. The journal only appears once complete, so an interrupted seed is
+    simply redone. Returns the number of companies recorded.
+    """
+    if Path(journal_path).exists() or not Path(details_path).exists():
+        return 0
+    seeding = f"{journal_path}.seeding"
+    Path(seeding).unlink(missing_ok=True)
+    with open(details_path, "r", newline="", encoding="utf-8") as file, Journal(seeding) as journal:
+        for row in csv.DictReader(file):
+            journal.record(company_key(row))
+        seeded = len(journal)
+    os.replace(seeding, journal_path)
+    return seeded
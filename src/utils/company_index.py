@@ -0,0 +1,121 @@
+"""
+In-memory query layer over the details / out data.
+
+    index = CompanyIndex.load("out.csv")
+    index.get("556702-9516")
+    index.rows(index.filter(sni="62", city="Örebro", revenue_min=5000))
+
+The file is read once into arrays; lookups by org number, SNI code prefix, city
+and revenue range then only touch the indexes.
+"""
+import re
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+from src.utils.storage import read_table, to_int, to_list
+
+_ORG_DIGITS = re.compile(r"\D+")
+_SNI_CODE = re.compile(r"^\s*(\d{5})")
+SNI_PREFIX_LENGTHS = (2, 3, 4, 5)  # division, group, class, detailed
+
+
+def norm_orgnr(x) -> str:
+    return _ORG_DIGITS.sub("", str(x or ""))
+
+
+def norm_city(x) -> str:
+    s = str(x or "").strip().lower()
+    return "" if s == "nan" else s
+
+
+class CompanyIndex:
+    def __init__(self, df):
+        self.df = df.reset_index(drop=True)
+        n = len(self.df)
+
+        # Hash index: normalized org number -> row
+        self.by_org: dict[str, int] = {}
+        for i, org in enumerate(self.df["org_number"]):
+            k = norm_orgnr(org)
+            if k and k not in self.by_org:
+                self.by_org[k] = i
+
+        # Inverted indexes: SNI prefix -> rows, city -> rows (sorted row arrays)
+        sni_rows: dict[str, list[int]] = {}
+        for i, sni in enumerate(self.df["sni_codes"]):
+            prefixes = set()
+            for item in to_list(sni):
+                m = _SNI_CODE.match(item)
+                if m:
+                    prefixes.update(m.group(1)[:k] for k in SNI_PREFIX_LENGTHS)
+            for p in prefixes:
+                sni_rows.setdefault(p, []).append(i)
+        self.by_sni = {p: np.asarray(rows, dtype=np.int32) for p, rows in sni_rows.items()}
+
+        city_rows: dict[str, list[int]] = {}
+        for i, city in enumerate(self.df["city"]):
+            c = norm_city(city)
+            if c:
+                city_rows.setdefault(c, []).append(i)
+        self.by_city = {c: np.asarray(rows, dtype=np.int32) for c, rows in city_rows.items()}
+
+        # Sorted revenue for range queries (rows without revenue are left out)
+        revenue = [to_int(v) for v in self.df["revenue"]]
+        known = [(r, i) for i, r in enumerate(revenue) if r is not None]
+        known.sort()
+        self.revenue_sorted = [r for r, _ in known]
+        self.revenue_rows = np.asarray([i for _, i in known], dtype=np.int32)
+        self.all_rows = np.arange(n, dtype=np.int32)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Build the index from a CSV or Parquet file (see utils/storage.py).
+        """
+        return cls(read_table(path))
+
+    def __len__(self):
+        return len(self.df)
+
+    def get(self, org_number):
+        i = self.by_org.get(norm_orgnr(org_number))
+        return None if i is None else self.df.iloc[i].to_dict()
+
+    def revenue_range(self, revenue_min=None, revenue_max=None):
+        lo = 0 if revenue_min is None else bisect_left(self.revenue_sorted, revenue_min)
+        hi = len(self.revenue_sorted) if revenue_max is None else bisect_right(self.revenue_sorted, revenue_max)
+        return np.sort(self.revenue_rows[lo:hi])
+
+    def filter(self, sni=None, city=None, revenue_min=None, revenue_max=None):
+        """
+        Row ids matching all given filters. `sni` is a code or code prefix
+        ("62" matches 62010, 62020, ...); several values in a list are OR'ed.
+        """
+        parts = []
+        if sni is not None:
+            codes = [sni] if isinstance(sni, str) else sni
+            parts.append(np.unique(np.concatenate(
+                [self.by_sni.get(str(c), self.all_rows[:0]) for c in codes] or [self.all_rows[:0]]
+            )))
+        if city is not None:
+            cities = [city] if isinstance(city, str) else city
+            parts.append(np.unique(np.concatenate(
+                [self.by_city.get(norm_city(c), self.all_rows[:0]) for c in cities] or [self.all_rows[:0]]
+            )))
+        if revenue_min is not None or revenue_max is not None:
+            parts.append(self.revenue_range(revenue_min, revenue_max))
+
+        if not parts:
+            return self.all_rows
+        parts.sort(key=len)
+        result = parts[0]
+        for p in parts[1:]:
+            result = np.intersect1d(result, p, assume_unique=True)
+        return result
+
+    def rows(self, ids, columns=None):
+        df = self.df.iloc[ids]
+        if columns is not None:
+            df = df[columns]
+        return df.to_dict(orient="records")
@@ -1,5 +1,214 @@
-import pandas as pd
+"""
+Change-data-capture diff of two company snapshots (CSV or Parquet).
+
+    python -m src.utils.compare_csv old.csv new.csv [--out changes.jsonl] [--mode auto|sorted|hash]
+
+Rows are matched on company_key (org number). Both files are streamed:
+  - sorted: both files are in key order, one merge pass, O(1) memory;
+  - hash:   rows are spread over partition files by hash(key), then one
+            partition at a time is diffed, memory ~ one partition;
+  - auto:   sorted if a quick pass shows both files are in key order, else hash.
+Every change is (status, key, left, right, changes) with status added, removed
+or modified and changes {field: {"old", "new"}} as in the refresh delta files.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import tempfile
+import zlib
 from pathlib import Path
+from typing import NamedTuple
+
+import pandas as pd
+
+from src.utils.checkpoint import company_key
+from src.utils.refresh import changed_fields
+from src.utils.storage import LIST_COLUMNS, to_list, _is_missing
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+PARTITION_BYTES = 64 * 1024 ** 2  # input bytes per hash partition
+
+
+class Change(NamedTuple):
+    status: str          # "added", "removed" or "modified"
+    key: str
+    left: dict | None
+    right: dict | None
+    changes: dict
+
+
+def iter_rows(path, batch_size: int = 10_000):
+    """
+    Stream the rows of a CSV or Parquet file as dicts.
+    """
+    path = Path(path)
+    if path.suffix == ".parquet":
+        if pq is None:
+            raise ImportError("Parquet snapshots need pyarrow: pip install pyarrow")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+            yield from batch.to_pylist()
+        return
+
+    csv.field_size_limit(min(sys.maxsize, 2**31 - 1))
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        yield from csv.DictReader(f)
+
+
+def _value(column, v):
+    if column in LIST_COLUMNS:
+        return sorted(to_list(v))
+    return "" if _is_missing(v) else str(v).strip()
+
+
+def normalize(row: dict) -> dict:
+    """
+    Comparable form of a row, so a CSV and a Parquet snapshot of the same data are equal.
+    """
+    return {k: _value(k, v) for k, v in row.items() if k}
+
+
+def _keyed(rows):
+    for row in rows:
+        key = company_key(row)
+        if key:
+            yield key, row
+
+
+def is_sorted(path) -> bool:
+    previous = None
+    for key, _ in _keyed(iter_rows(path)):
+        if previous is not None and key < previous:
+            return False
+        previous = key
+    return True
+
+
+def _compare(key, left, right):
+    a, b = normalize(left), normalize(right)
+    changes = changed_fields({k: v for k, v in a.items() if k in b}, {k: v for k, v in b.items() if k in a})
+    if changes:
+        return Change("modified", key, left, right, changes)
+    return None
+
+
+def _unique(pairs):
+    """
+    Skip repeated keys (the first row wins) in a key-ordered stream.
+    """
+    previous = None
+    for key, row in pairs:
+        if key != previous:
+            yield key, row
+            previous = key
+
+
+def diff_sorted(left_rows, right_rows):
+    """
+    Merge-join two key-ordered row streams.
+    """
+    left, right = _unique(_keyed(left_rows)), _unique(_keyed(right_rows))
+    lk, lrow = next(left, (None, None))
+    rk, rrow = next(right, (None, None))
+    while lk is not None or rk is not None:
+        if rk is None or (lk is not None and lk < rk):
+            yield Change("removed", lk, lrow, None, {})
+            lk, lrow = next(left, (None, None))
+        elif lk is None or rk < lk:
+            yield Change("added", rk, None, rrow, {})
+            rk, rrow = next(right, (None, None))
+        else:
+            change = _compare(lk, lrow, rrow)
+            if change:
+                yield change
+            lk, lrow = next(left, (None, None))
+            rk, rrow = next(right, (None, None))
+
+
+def _partition(rows, n: int, directory: str, side: str) -> list[str]:
+    paths = [os.path.join(directory, f"{side}-{i:04d}.jsonl") for i in range(n)]
+    files = [open(p, "w", encoding="utf-8") for p in paths]
+    try:
+        for key, row in _keyed(rows):
+            part = zlib.crc32(key.encode("utf-8")) % n
+            files[part].write(json.dumps([key, row], ensure_ascii=False, default=str) + "\n")
+    finally:
+        for f in files:
+            f.close()
+    return paths
+
+
+def _read_partition(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def diff_partitioned(left_rows, right_rows, partitions: int = 16):
+    """
+    Diff unsorted streams: spread both over `partitions` files by hash(key),
+    then hold only one left partition in memory at a time.
+    """
+    with tempfile.TemporaryDirectory(prefix="cdc-") as tmp:
+        left_parts = _partition(left_rows, partitions, tmp, "left")
+        right_parts = _partition(right_rows, partitions, tmp, "right")
+        for left_path, right_path in zip(left_parts, right_parts):
+            left = {}
+            for key, row in _read_partition(left_path):
+                left.setdefault(key, row)
+            seen = set()
+            for key, row in _read_partition(right_path):
+                if key in seen:
+                    continue
+                seen.add(key)
+                if key not in left:
+                    yield Change("added", key, None, row, {})
+                    continue
+                change = _compare(key, left.pop(key), row)
+                if change:
+                    yield change
+            for key, row in left.items():
+                yield Change("removed", key, row, None, {})
+
+
+def diff_snapshots(left_path, right_path, mode: str = "auto", partitions: int | None = None):
+    """
+    Yield the changes from the `left_path` snapshot (old) to `right_path` (new).
+    """
+    if mode == "auto":
+        mode = "sorted" if is_sorted(left_path) and is_sorted(right_path) else "hash"
+    if mode == "sorted":
+        return diff_sorted(iter_rows(left_path), iter_rows(right_path))
+    if mode != "hash":
+        raise ValueError(f"Unknown diff mode: {mode}")
+    if partitions is None:
+        size = max(Path(left_path).stat().st_size, Path(right_path).stat().st_size)
+        partitions = max(1, -(-size // PARTITION_BYTES))
+    return diff_partitioned(iter_rows(left_path), iter_rows(right_path), partitions)
+
+
+def write_changes(changes, out_path) -> dict:
+    """
+    Write changes as JSON lines (key, status, name, changes) and return the counts.
+    """
+    Path(out_path).parent.mkdir(parents=True, exist_ok=True)
+    counts = {"added": 0, "removed": 0, "modified": 0}
+    with open(out_path, "w", encoding="utf-8") as f:
+        for c in changes:
+            counts[c.status] += 1
+            row = c.right if c.right is not None else c.left
+            entry = {"key": c.key, "status": c.status, "name": row.get("name")}
+            if c.status == "modified":
+                entry["changes"] = c.changes
+            else:
+                entry["record"] = normalize(row)
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    return counts
 
 
 def diff_csv_by_orgnr(
@@ -7,15 +216,17 @@ def diff_csv_by_orgnr(
         right_csv: str,
         out_csv: str | None = None,
     ):
-    left  = pd.read_csv(left_csv, dtype=str)
-    right = pd.read_csv(right_csv, dtype=str)
+    """
+    org_numbers of the rows in `left_csv` whose stripped org_number is not in
+    `right_csv` (those rows are written to `out_csv`). Unlike diff_snapshots this
+    matches on org_number alone and keeps every left row, duplicates and blanks included.
+    """
+    def org(row):
+        return "" if _is_missing(row.get("org_number")) else str(row["org_number"]).strip()
 
-    # Normalize org_number
-    left["_org"]  = left["org_number"].str.strip()
-    right_orgs = set(right["org_number"].str.strip())
-
-    # Rows in left but not in right
-    diff = left[~left["_org"].isin(right_orgs)].drop(columns="_org")
+    right_orgs = {org(row) for row in iter_rows(right_csv)}
+    removed = [row for row in iter_rows(left_csv) if org(row) not in right_orgs]
+    diff = pd.DataFrame(removed, columns=list(removed[0]) if removed else ["org_number"])
 
     if out_csv:
         Path(out_csv).parent.mkdir(parents=True, exist_ok=True)
@@ -23,4 +234,22 @@ def diff_csv_by_orgnr(
 
     return diff["org_number"]
 
-print(diff_csv_by_orgnr("data\old\cccc.csv", "data\details\details_rev-2000-2000000_nump-2000_sort-revenueDesc.csv"))
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Added, removed and modified companies between two snapshots")
+    parser.add_argument("left", help="old snapshot (CSV or Parquet)")
+    parser.add_argument("right", help="new snapshot (CSV or Parquet)")
+    parser.add_argument("--out", default=None, help="JSONL file for the changes")
+    parser.add_argument("--mode", choices=["auto", "sorted", "hash"], default="auto")
+    parser.add_argument("--partitions", type=int, default=None)
+    args = parser.parse_args()
+
+    changes = diff_snapshots(args.left, args.right, args.mode, args.partitions)
+    if args.out:
+        counts = write_changes(changes, args.out)
+        print(f"✅ {counts} written to {args.out}")
+    else:
+        counts = {"added": 0, "removed": 0, "modified": 0}
+        for c in changes:
+            counts[c.status] += 1
+            print(f"{c.status}\t{c.key}\t{', '.join(c.changes)}")
+        print(f"* {counts}")
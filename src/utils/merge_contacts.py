@@ -60,6 +60,27 @@ def _dedupe_emails(seq: list[str]) -> list[str]:
     return out
 
 
+def _parse_emails_column(col: pd.Series) -> pd.Series:
+    """
+    _emails_to_list for a whole column, parsing each distinct cell only once
+    (most cells are "[]" or repeat across files).
+    """
+    col = col.fillna("")
+    parsed = {v: _emails_to_list(v) for v in col.unique()}
+    return col.map(parsed)
+
+
+def _fold_emails(lists: list[list[str]]) -> list[str]:
+    """
+    Combine the email lists of all rows sharing a key, deduping after each row
+    exactly like the row-by-row merge did.
+    """
+    merged = _dedupe_emails(lists[0])
+    for e in lists[1:]:
+        merged = _dedupe_emails(list(merged) + _dedupe_emails(e))
+    return merged
+
+
 def merge_contacts_into_main(
     main_csv: str,
     other_csv: str,
@@ -83,51 +104,38 @@ def merge_contacts_into_main(
         other[emails_col] = "[]"
 
     # Normalize keys
-    main["_k"] = main[key].apply(_norm_orgnr)
-    other["_k"] = other[key].apply(_norm_orgnr)
+    main["_k"] = main[key].map(_norm_orgnr)
+    other["_k"] = other[key].map(_norm_orgnr)
 
     # Normalize payload columns
     main[website_col] = main[website_col].fillna("").astype(str).str.strip()
     other[website_col] = other[website_col].fillna("").astype(str).str.strip()
 
-    main[emails_col] = main[emails_col].apply(_emails_to_list)
-    other[emails_col] = other[emails_col].apply(_emails_to_list)
+    main[emails_col] = _parse_emails_column(main[emails_col])
+    other[emails_col] = _parse_emails_column(other[emails_col])
 
-    # Build lookup from other by key
-    other_map: dict[str, dict[str, object]] = {}
-    for _, r in other.iterrows():
-        k = r["_k"]
-        if not k:
-            continue
-
-        w = r[website_col]
-        e = _dedupe_emails(r[emails_col])
-
-        if k not in other_map:
-            other_map[k] = {"website": w, "emails": e}
-        else:
-            # first non-empty website wins
-            if not _has_value(other_map[k]["website"]) and _has_value(w):
-                other_map[k]["website"] = w
-            # extend emails
-            other_map[k]["emails"] = _dedupe_emails(list(other_map[k]["emails"]) + e)
-
-    # Merge into main
-    for i, r in main.iterrows():
-        k = r["_k"]
-        if not k or k not in other_map:
-            main.at[i, emails_col] = _dedupe_emails(r[emails_col])
-            continue
+    # Aggregate other per key: first non-empty website, emails of all rows
+    keyed = other[other["_k"] != ""]
+    src = keyed.groupby("_k", sort=False)[emails_col].agg(list).map(_fold_emails).to_frame("_src_emails")
+    with_website = keyed[keyed[website_col].map(_has_value)]
+    src["_src_website"] = with_website.groupby("_k", sort=False)[website_col].first()
 
-        src = other_map[k]
+    # Merge into main with a single join on the key
+    main = main.join(src, on="_k")
 
-        if not _has_value(r[website_col]) and _has_value(src["website"]):
-            main.at[i, website_col] = src["website"]
+    fill = ~main[website_col].map(_has_value) & main["_src_website"].notna()
+    main.loc[fill, website_col] = main.loc[fill, "_src_website"]
 
-        merged = _dedupe_emails(r[emails_col] + list(src["emails"]))
-        main.at[i, emails_col] = merged
+    main[emails_col] = pd.Series(
+        [
+            _dedupe_emails(e + list(s)) if isinstance(s, list) else _dedupe_emails(e)
+            for e, s in zip(main[emails_col], main["_src_emails"])
+        ],
+        index=main.index,
+        dtype=object,
+    )
 
-    main = main.drop(columns="_k")
+    main = main.drop(columns=["_k", "_src_emails", "_src_website"])
 
     if out_csv:
         Path(out_csv).parent.mkdir(parents=True, exist_ok=True)
@@ -136,8 +144,9 @@ def merge_contacts_into_main(
     return main
 
 
-merge_contacts_into_main(
-    main_csv="data\details\details_rev-2000-2000000_nump-2000_sort-revenueDesc.csv",
-    other_csv="data\old\cccc.csv",
-    out_csv="data\out\out.csv",
-)
+if __name__ == "__main__":
+    merge_contacts_into_main(
+        main_csv="data\\details\\details_rev-2000-2000000_nump-2000_sort-revenueDesc.csv",
+        other_csv="data\\old\\cccc.csv",
+        out_csv="data\\out\\out.csv",
+    )
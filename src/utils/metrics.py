@@ -0,0 +1,278 @@
+"""
+Process-wide metrics for the scrapers: counters, histograms and per-stage throughput.
+
+    from src.utils import metrics
+    metrics.inc("http_requests_total", host="www.allabolag.se", status="200")
+    with metrics.timer("parse_seconds", kind="profile"):
+        ...
+    with metrics.Progress("details", total=len(companies)) as progress:
+        for details in ...:
+            progress.advance()
+    metrics.dump("data/metrics/run.prom")   # Prometheus text, or .json
+
+http_client.get records every request (count per host and status, bytes, latency
+per host, cache hits); the parsers record the time per page.
+"""
+import json
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+
+from src.scrape.setup import Metrics
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PARSE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+PREFIX = "foretagskollen_"
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other: "Histogram"):
+        for i, c in enumerate(other.counts):
+            self.counts[i] += c
+        self.sum += other.sum
+        self.count += other.count
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate from the buckets (linear within a bucket), like histogram_quantile().
+        """
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            if seen + c >= rank and c:
+                lo = self.buckets[i - 1] if i > 0 else 0.0
+                hi = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lo + (hi - lo) * (rank - seen) / c
+            seen += c
+        return self.buckets[-1]
+
+
+class Stage:
+    def __init__(self):
+        self.rows = 0
+        self.started = time.monotonic()
+        self.ended = None
+
+    @property
+    def seconds(self) -> float:
+        return (self.ended or time.monotonic()) - self.started
+
+    @property
+    def rate(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+
+def _labels(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _prom_labels(labels, extra=()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters: dict[tuple, float] = {}
+        self.histograms: dict[tuple, Histogram] = {}
+        self.stages: dict[str, Stage] = {}
+
+    def inc(self, name, value: float = 1, **labels):
+        key = (name, _labels(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value: float, buckets=LATENCY_BUCKETS, **labels):
+        key = (name, _labels(labels))
+        with self.lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram(buckets)
+            self.histograms[key].observe(value)
+
+    @contextmanager
+    def timer(self, name, buckets=LATENCY_BUCKETS, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, buckets, **labels)
+
+    def stage(self, name) -> Stage:
+        with self.lock:
+            if name not in self.stages:
+                self.stages[name] = Stage()
+            return self.stages[name]
+
+    def add_rows(self, stage, n: int = 1):
+        s = self.stage(stage)
+        with self.lock:
+            s.rows += n
+
+    def total(self, name, **match) -> float:
+        """
+        Sum of a counter over all label sets that contain `match`.
+        """
+        want = set(_labels(match))
+        with self.lock:
+            return sum(v for (n, labels), v in self.counters.items() if n == name and want <= set(labels))
+
+    def merged(self, name, **match) -> Histogram | None:
+        want = set(_labels(match))
+        out = None
+        with self.lock:
+            for (n, labels), h in self.histograms.items():
+                if n == name and want <= set(labels):
+                    if out is None:
+                        out = Histogram(h.buckets)
+                    out.merge(h)
+        return out
+
+    def cache_hit_ratio(self) -> float | None:
+        hits = self.total("http_cache_total", result="hit") + self.total("http_cache_total", result="revalidated")
+        lookups = hits + self.total("http_cache_total", result="miss")
+        return hits / lookups if lookups else None
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            counters = [{"name": n, "labels": dict(labels), "value": v} for (n, labels), v in self.counters.items()]
+            histograms = [
+                {"name": n, "labels": dict(labels), "count": h.count, "sum": round(h.sum, 6),
+                 "p50": round(h.quantile(0.5), 6), "p95": round(h.quantile(0.95), 6), "p99": round(h.quantile(0.99), 6),
+                 "buckets": dict(zip([*map(str, h.buckets), "+Inf"], h.counts))}
+                for (n, labels), h in self.histograms.items()
+            ]
+            stages = {name: {"rows": s.rows, "seconds": round(s.seconds, 3), "rows_per_sec": round(s.rate, 3)}
+                      for name, s in self.stages.items()}
+        return {"counters": counters, "histograms": histograms, "stages": stages, "cache_hit_ratio": self.cache_hit_ratio()}
+
+    def prometheus(self) -> str:
+        lines = []
+        with self.lock:
+            for name in sorted({n for n, _ in self.counters}):
+                lines.append(f"# TYPE {PREFIX}{name} counter")
+                for (n, labels), v in sorted(self.counters.items()):
+                    if n == name:
+                        lines.append(f"{PREFIX}{name}{_prom_labels(labels)} {v:g}")
+            for name in sorted({n for n, _ in self.histograms}):
+                lines.append(f"# TYPE {PREFIX}{name} histogram")
+                for (n, labels), h in sorted(self.histograms.items(), key=lambda kv: kv[0]):
+                    if n != name:
+                        continue
+                    cumulative = 0
+                    for le, c in zip([*map(str, h.buckets), "+Inf"], h.counts):
+                        cumulative += c
+                        lines.append(f"{PREFIX}{name}_bucket{_prom_labels(labels, [('le', le)])} {cumulative}")
+                    lines.append(f"{PREFIX}{name}_sum{_prom_labels(labels)} {h.sum:.6f}")
+                    lines.append(f"{PREFIX}{name}_count{_prom_labels(labels)} {h.count}")
+            if self.stages:
+                lines.append(f"# TYPE {PREFIX}stage_rows_total counter")
+                lines += [f'{PREFIX}stage_rows_total{{stage="{n}"}} {s.rows}' for n, s in self.stages.items()]
+                lines.append(f"# TYPE {PREFIX}stage_seconds gauge")
+                lines += [f'{PREFIX}stage_seconds{{stage="{n}"}} {s.seconds:.3f}' for n, s in self.stages.items()]
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        """
+        Write the metrics as JSON (.json) or Prometheus text (anything else).
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.suffix == ".json":
+            path.write_text(json.dumps(self.snapshot(), ensure_ascii=False, indent=2), encoding="utf-8")
+        else:
+            path.write_text(self.prometheus(), encoding="utf-8")
+
+
+REGISTRY = Registry()
+inc = REGISTRY.inc
+observe = REGISTRY.observe
+timer = REGISTRY.timer
+stage = REGISTRY.stage
+dump = REGISTRY.dump
+
+
+class Progress:
+    """
+    Live one-line progress for a stage: rows done, rows/sec, ETA, and the http
+    numbers (requests, errors, latency p50/p95, cache hit ratio) so far.
+    """
+    def __init__(self, name, total: int | None = None, interval: float = Metrics.PROGRESS_INTERVAL.value,
+                 registry: Registry = REGISTRY, stream=sys.stderr):
+        self.name = name
+        self.total = total
+        self.interval = interval
+        self.registry = registry
+        self.stream = stream
+        self.stage = registry.stage(name)
+        self.last = 0.0
+        self.width = 0
+
+    def advance(self, n: int = 1):
+        self.registry.add_rows(self.name, n)
+        now = time.monotonic()
+        if now - self.last >= self.interval:
+            self.last = now
+            self._write(self.line())
+
+    def line(self) -> str:
+        s = self.stage
+        done = f"{s.rows}/{self.total}" if self.total else str(s.rows)
+        parts = [f"[{self.name}] {done} {s.rate:.1f}/s"]
+        if self.total and s.rate > 0:
+            parts[0] += f" eta {_duration((self.total - s.rows) / s.rate)}"
+
+        r = self.registry
+        requests = r.total("http_requests_total")
+        if requests:
+            errors = requests - r.total("http_requests_total", status="200") - r.total("http_requests_total", status="304")
+            latency = r.merged("http_request_seconds")
+            parts.append(f"http {requests:.0f} ({errors:.0f} non-2xx/304) "
+                         f"p50 {latency.quantile(0.5) * 1000:.0f}ms p95 {latency.quantile(0.95) * 1000:.0f}ms")
+        ratio = r.cache_hit_ratio()
+        if ratio is not None:
+            parts.append(f"cache {ratio:.0%}")
+        return " | ".join(parts)
+
+    def close(self):
+        self.stage.ended = time.monotonic()
+        self._write(self.line() + "\n")
+
+    def _write(self, line):
+        # Pad over the rest of a longer previous line
+        self.stream.write("\r" + line.ljust(self.width))
+        self.stream.flush()
+        self.width = len(line)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _duration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
@@ -0,0 +1,311 @@
+"""
+Incremental re-scrape: only re-fetch profiles that are stale or whose listing
+entry changed, and write what changed to a delta file.
+
+Per company (company_key) the state keeps the last fetched record, its content
+hash, when it was fetched and where it stood in the (revenue sorted) listing.
+A company is re-fetched when it is
+  - new:     never fetched,
+  - stale:   fetched more than `max_age` seconds ago,
+  - listing: its name/profile url changed, or it moved more than
+             max(rank_slack, rank_tolerance * len(listing)) positions,
+             i.e. its revenue most likely changed.
+
+The details file is rewritten row by row: rows that were not re-fetched are
+copied as they are, and the details journal is rebuilt to match, so a normal
+run afterwards neither re-fetches nor duplicates what the refresh wrote.
+"""
+import csv
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from src.scrape.setup import FIELDNAMES, Refresh
+from src.utils import metrics
+from src.utils.checkpoint import Journal, company_key
+from src.utils.storage import normalize_record, read_records, to_csv_row
+
+
+class RefreshAborted(Exception):
+    """
+    The fresh listing can't be trusted (e.g. much smaller than the last one);
+    nothing was written.
+    """
+
+
+def listing_hash(company) -> str:
+    text = f"{str(company.get('name') or '').strip()}|{company.get('profile_url') or ''}"
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def content_hash(record: dict) -> str:
+    return hashlib.sha1(json.dumps(record, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def changed_fields(old: dict | None, new: dict) -> dict:
+    """
+    {field: {"old": ..., "new": ...}} for every field that differs.
+    """
+    old = old or {}
+    return {k: {"old": old.get(k), "new": v} for k, v in new.items() if old.get(k) != v}
+
+
+class RefreshState:
+    """
+    SQLite table of company_key -> last fetched record, content hash, fetch time
+    and listing position (rank) / listing hash at that fetch.
+    """
+    def __init__(self, path: str = Refresh.STATE_PATH.value):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            """CREATE TABLE IF NOT EXISTS companies (
+                key TEXT PRIMARY KEY,
+                record TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                rank INTEGER,
+                listing_hash TEXT
+            )"""
+        )
+        self.db.commit()
+
+    def __len__(self):
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM companies").fetchone()[0]
+
+    def entries(self) -> dict[str, tuple]:
+        """
+        key -> (fetched_at, rank, listing_hash), without the records.
+        """
+        with self.lock:
+            rows = self.db.execute("SELECT key, fetched_at, rank, listing_hash FROM companies").fetchall()
+        return {key: (fetched_at, rank, lhash) for key, fetched_at, rank, lhash in rows}
+
+    def records(self, keys) -> dict[str, dict]:
+        keys = list(keys)
+        out = {}
+        with self.lock:
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                rows = self.db.execute(
+                    f"SELECT key, record FROM companies WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                out.update((key, json.loads(record)) for key, record in rows)
+        return out
+
+    def seed(self, details, fetched_at: float, listing=()):
+        """
+        Import records fetched before the state existed (e.g. an existing details
+        file), with the listing they were fetched from for rank/listing hash.
+        """
+        ranks = {company_key(c): (i, listing_hash(c)) for i, c in enumerate(listing)}
+        rows = []
+        for d in details:
+            key = company_key(d)
+            record = normalize_record(d)
+            rank, lhash = ranks.get(key, (None, None))
+            rows.append((key, json.dumps(record, ensure_ascii=False), content_hash(record), fetched_at, rank, lhash))
+        with self.lock:
+            self.db.executemany("INSERT OR IGNORE INTO companies VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self.db.commit()
+        return len(rows)
+
+    def plan(
+            self,
+            companies,
+            max_age: float = Refresh.MAX_AGE.value,
+            rank_slack: int = Refresh.RANK_SLACK.value,
+            rank_tolerance: float = Refresh.RANK_TOLERANCE.value,
+            now: float | None = None,
+        ):
+        """
+        [(rank, company, reason)] for the companies in the listing that need a re-fetch.
+        """
+        now = time.time() if now is None else now
+        known = self.entries()
+        max_shift = max(rank_slack, int(rank_tolerance * len(companies)))
+        todo = []
+        for rank, company in enumerate(companies):
+            entry = known.get(company_key(company))
+            if entry is None:
+                reason = "new"
+            elif now - entry[0] > max_age:
+                reason = "stale"
+            elif entry[2] is not None and entry[2] != listing_hash(company):
+                reason = "listing"
+            elif entry[1] is not None and abs(entry[1] - rank) > max_shift:
+                reason = "listing"
+            else:
+                continue
+            todo.append((rank, company, reason))
+        return todo
+
+    def update(self, details: dict, rank: int, company: dict, now: float | None = None) -> dict:
+        """
+        Store a fresh record and return its changed fields (empty if identical).
+        """
+        key = company_key(details)
+        record = normalize_record(details)
+        new_hash = content_hash(record)
+        with self.lock:
+            row = self.db.execute("SELECT record, content_hash FROM companies WHERE key = ?", (key,)).fetchone()
+            self.db.execute(
+                "INSERT OR REPLACE INTO companies VALUES (?, ?, ?, ?, ?, ?)",
+                (key, json.dumps(record, ensure_ascii=False), new_hash,
+                 time.time() if now is None else now, rank, listing_hash(company)),
+            )
+            self.db.commit()
+        if row and row[1] == new_hash:
+            return {}
+        return changed_fields(json.loads(row[0]) if row else None, record)
+
+    def listed(self) -> int:
+        """
+        Companies that were in the listing at their last fetch.
+        """
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM companies WHERE rank IS NOT NULL").fetchone()[0]
+
+    def mark_dropped(self, keys):
+        """
+        Forget the listing position of companies that left the listing, so they
+        are reported as dropped once (and re-checked if they come back).
+        """
+        with self.lock:
+            self.db.executemany("UPDATE companies SET rank = NULL WHERE key = ?", [(k,) for k in keys])
+            self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+
+def _read_rows(path) -> tuple[list[str], dict[str, dict]]:
+    """
+    (columns, company_key -> row) of a details CSV, values as the strings on disk.
+    """
+    if not Path(path).exists():
+        return list(FIELDNAMES), {}
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        rows = {company_key(row): row for row in reader}
+        return list(reader.fieldnames or FIELDNAMES), rows
+
+
+def _rewrite_details(path, columns, rows, journal_path):
+    """
+    Replace the details file with `rows` and its journal with a "done" entry
+    per row. Both are written next to the originals first and then swapped in,
+    so a crash leaves the old pair.
+    """
+    tmp, tmp_journal = Path(f"{path}.tmp"), Path(f"{journal_path}.tmp")
+    tmp_journal.unlink(missing_ok=True)
+    with open(tmp, "w", newline="", encoding="utf-8") as f, Journal(tmp_journal, companions=[f]) as journal:
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            journal.record(company_key(row))
+    os.replace(tmp, path)
+    os.replace(tmp_journal, journal_path)
+
+
+def refresh_details(
+        companies,
+        fetch_details,
+        details_path: str,
+        state_path: str = Refresh.STATE_PATH.value,
+        delta_path: str | None = None,
+        previous_listing=(),
+        max_age: float = Refresh.MAX_AGE.value,
+        journal_path: str | None = None,
+        min_share: float = Refresh.MIN_LISTING_SHARE.value,
+    ):
+    """
+    Re-fetch what plan() selects from the fresh listing `companies` with
+    fetch_details(companies) (extract_many_company_details or the pooled
+    version, without the http cache; details may come back in any order, e.g.
+    from fetch_with_retries), write one JSON line per new, changed,
+    failed or dropped company to `delta_path`, and rewrite `details_path`
+    (and its journal, default: next to it) in listing order. Returns the
+    per-status counts.
+
+    Raises RefreshAborted, before anything is fetched or written, when the
+    listing has fewer than `min_share` of the companies of the previous one
+    (`previous_listing`, or what the state last saw listed): a partly failed
+    listing would otherwise mark the rest as dropped.
+    """
+    journal_path = journal_path or str(Path(details_path).with_suffix(".journal.jsonl"))
+    state = RefreshState(state_path)
+    previous_size = len(previous_listing) or state.listed()
+    if len(companies) < min_share * previous_size:
+        state.close()
+        raise RefreshAborted(f"listing has {len(companies)} companies, the previous one had {previous_size}")
+
+    columns, rows = _read_rows(details_path)
+    if len(state) == 0 and rows:
+        # First refresh: the existing details file is the baseline, fetched when it was last written
+        seeded = state.seed(read_records(details_path), Path(details_path).stat().st_mtime, previous_listing)
+        print(f"* Seeded refresh state with {seeded} companies from {details_path}")
+
+    todo = state.plan(companies, max_age=max_age)
+    reasons = {}
+    for _, _, reason in todo:
+        reasons[reason] = reasons.get(reason, 0) + 1
+    print(f"* Refresh: {len(todo)} of {len(companies)} companies to re-fetch {reasons}")
+
+    delta_path = delta_path or f"{Refresh.DELTA_DIR.value}delta_{time.strftime('%Y%m%d-%H%M%S')}.jsonl"
+    Path(delta_path).parent.mkdir(parents=True, exist_ok=True)
+    counts = {"new": 0, "changed": 0, "unchanged": 0, "failed": 0, "dropped": 0}
+    with open(delta_path, "w", encoding="utf-8") as delta:
+        def emit(status, key, company, **fields):
+            counts[status] += 1
+            metrics.inc("refresh_total", status=status)
+            if status != "unchanged":
+                entry = {"key": key, "status": status, "name": company.get("name"), **fields}
+                delta.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+        previous = state.entries()
+        progress = metrics.Progress("refresh", total=len(todo))
+        planned = {company_key(c): (rank, c, reason) for rank, c, reason in todo}
+        for details in fetch_details([c for _, c, _ in todo]):
+            progress.advance()
+            key = company_key(details)
+            rank, company, reason = planned[key]
+            if "sni_codes" not in details:
+                emit("failed", key, company, reason=reason)
+                continue
+            changes = state.update(details, rank, company)
+            rows[key] = to_csv_row(details)
+            if key not in previous:
+                emit("new", key, company, reason=reason, changes=changes)
+            elif changes:
+                emit("changed", key, company, reason=reason, changes=changes)
+            else:
+                emit("unchanged", key, company)
+
+        listed = {company_key(c) for c in companies}
+        dropped = [k for k, (_, rank, _) in previous.items() if k not in listed and rank is not None]
+        last_seen = state.records(dropped)
+        for key in dropped:
+            emit("dropped", key, last_seen.get(key, {}))
+        state.mark_dropped(dropped)
+        progress.close()
+
+    # Companies that left the listing go, failed re-fetches keep their last row,
+    # and companies fetched before but missing from the file come from the state
+    keys = list(dict.fromkeys(company_key(c) for c in companies))
+    for key, record in state.records(k for k in keys if k not in rows).items():
+        rows[key] = to_csv_row(record)
+    listed_rows = [rows[k] for k in keys if k in rows]
+    _rewrite_details(details_path, columns, listed_rows, journal_path)
+    state.close()
+
+    print(f"* Refresh: {counts}, delta in {delta_path}")
+    return counts
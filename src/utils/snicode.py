@@ -1,17 +1,37 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+"""
+Stream SNI codes out of a companies CSV into two tables:
+  - unique codes:      sni_code, sni_description
+  - company -> SNI:    org_number, legal_name, sni_code, sni_description
 
+Rows are read and written one at a time, so memory stays constant no matter how
+big the input is (only the set of distinct SNI codes is kept).
+
+    python -m src.utils.snicode --input cccc.csv --unique-out sni_codes_unique.csv --map-out company_sni.csv
+"""
+
+import argparse
 import csv
 import ast
 import re
+import sys
 from pathlib import Path
 
-INPUT_FILE = "cccc.csv"             # <-- change if needed
+INPUT_FILE = "cccc.csv"             # defaults for the CLI
 UNIQUE_OUT = "sni_codes_unique.csv"  # code, description (deduped)
 MAP_OUT    = "company_sni.csv"       # org_number, legal_name, code, description
 
+# Fast path: a plain python list of quoted strings without escapes, e.g.
+#   "['24100 Text', \"24310 Bolag's text\"]"
+# which is exactly what str(list) writes for SNI lists.
+_QUOTED = r"""'[^'\\]*'|"[^"\\]*\""""
+FAST_LIST_RE = re.compile(rf"\[\s*(?:(?:{_QUOTED})(?:\s*,\s*(?:{_QUOTED}))*\s*,?\s*)?\]")
+FAST_ITEM_RE = re.compile(_QUOTED)
+
 # Regex fallback to capture entries like "24100 Framställning av ..." inside the list text
 SNI_ITEM_RE = re.compile(r"(\d{5})\s+([^\]]+?)(?=(?:',|\",|\])|$)")
+CODE_DESC_RE = re.compile(r"^(\d{5})\s+(.*)$")
 
 def parse_sni_list(cell):
     """
@@ -25,6 +45,10 @@ def parse_sni_list(cell):
     if not s or s.lower() == "nan":
         return []
 
+    # 0) Fast path for the common format, same result as literal_eval
+    if FAST_LIST_RE.fullmatch(s):
+        return [m.group(0)[1:-1] for m in FAST_ITEM_RE.finditer(s)]
+
     # Some CSVs may double-quote the whole list; others not.
     # 1) Try a safe literal_eval first.
     try:
@@ -61,74 +85,67 @@ def split_code_desc(text):
     Split "24100 Framställning av järn ..." → ("24100", "Framställning av järn ...")
     """
     text = text.strip()
-    m = re.match(r"^(\d{5})\s+(.*)$", text)
+    m = CODE_DESC_RE.match(text)
     if m:
         return m.group(1), m.group(2).strip()
     return None, text  # fallback; shouldn't happen if upstream parsed correctly
 
-def main():
-    input_path = Path(INPUT_FILE)
+def iter_company_sni(rows):
+    """
+    Yield (org_number, legal_name, code, desc) for every SNI code of every row.
+    Expects the columns 'sni_codes', 'org_number' and 'legal_name'.
+    """
+    for row in rows:
+        org_number = (row.get("org_number") or "").strip()
+        legal_name = (row.get("legal_name") or "").strip()
+        for item in parse_sni_list(row.get("sni_codes")):
+            code, desc = split_code_desc(item)
+            if code and desc:
+                yield org_number, legal_name, code, desc
+
+def run(input_file=INPUT_FILE, unique_out=UNIQUE_OUT, map_out=MAP_OUT):
+    input_path = Path(input_file)
     if not input_path.exists():
-        raise SystemExit(f"Input file not found: {INPUT_FILE}")
-
-    # Collect unique SNI pairs and mapping rows
-    unique_pairs = set()  # (code, desc)
-    mapping_rows = []     # dicts with org_number, legal_name, code, desc
-
-    with open(INPUT_FILE, "r", encoding="utf-8-sig", newline="") as f:
-        reader = csv.DictReader(f)
-        # Expect column names as provided by you. We only require:
-        # - 'sni_codes'
-        # - 'org_number'
-        # - 'legal_name'
-        # If the header differs slightly, adjust here.
-        for row in reader:
-            sni_raw = row.get("sni_codes")
-            org_number = (row.get("org_number") or "").strip()
-            legal_name = (row.get("legal_name") or "").strip()
-
-            items = parse_sni_list(sni_raw)
-            if not items:
+        raise SystemExit(f"Input file not found: {input_file}")
+
+    csv.field_size_limit(min(sys.maxsize, 2**31 - 1))
+
+    unique_pairs = set()  # (code, desc), bounded by the SNI vocabulary
+    num_rows = 0
+
+    with open(input_path, "r", encoding="utf-8-sig", newline="") as f, \
+            open(unique_out, "w", encoding="utf-8", newline="") as uf, \
+            open(map_out, "w", encoding="utf-8", newline="") as mf:
+        unique_writer = csv.writer(uf)
+        unique_writer.writerow(["sni_code", "sni_description"])
+        map_writer = csv.writer(mf)
+        map_writer.writerow(["org_number", "legal_name", "sni_code", "sni_description"])
+
+        # Dedup (org_number, sni_code) within a company's consecutive rows
+        current_org, current_codes = None, set()
+        for org_number, legal_name, code, desc in iter_company_sni(csv.DictReader(f)):
+            if (code, desc) not in unique_pairs:
+                unique_pairs.add((code, desc))
+                unique_writer.writerow([code, desc])
+
+            if org_number != current_org:
+                current_org, current_codes = org_number, set()
+            if code in current_codes:
                 continue
+            current_codes.add(code)
+            map_writer.writerow([org_number, legal_name, code, desc])
+            num_rows += 1
 
-            for item in items:
-                code, desc = split_code_desc(item)
-                if not code or not desc:
-                    continue
-                pair = (code, desc)
-                if pair not in unique_pairs:
-                    unique_pairs.add(pair)
-                # Add mapping (no dedup within same company+code unless you want to)
-                mapping_rows.append({
-                    "org_number": org_number,
-                    "legal_name": legal_name,
-                    "sni_code": code,
-                    "sni_description": desc
-                })
-
-    # Write unique SNI list
-    with open(UNIQUE_OUT, "w", encoding="utf-8", newline="") as f:
-        w = csv.writer(f)
-        w.writerow(["sni_code", "sni_description"])
-        for code, desc in sorted(unique_pairs, key=lambda x: (x[0], x[1])):
-            w.writerow([code, desc])
-
-    # Write company → SNI mapping
-    with open(MAP_OUT, "w", encoding="utf-8", newline="") as f:
-        fieldnames = ["org_number", "legal_name", "sni_code", "sni_description"]
-        w = csv.DictWriter(f, fieldnames=fieldnames)
-        w.writeheader()
-        # Optional: dedup rows at (org_number, sni_code) level to avoid repeats per company
-        seen_map = set()
-        for r in mapping_rows:
-            key = (r["org_number"], r["sni_code"])
-            if key in seen_map:
-                continue
-            seen_map.add(key)
-            w.writerow(r)
+    print(f"✅ Wrote {len(unique_pairs)} unique SNI codes to {unique_out}")
+    print(f"✅ Wrote {num_rows} company→SNI rows to {map_out}")
 
-    print(f"✅ Wrote {len(unique_pairs)} unique SNI codes to {UNIQUE_OUT}")
-    print(f"✅ Wrote company→SNI mapping to {MAP_OUT}")
+def main():
+    parser = argparse.ArgumentParser(description="Extract SNI codes from a companies CSV")
+    parser.add_argument("--input", default=INPUT_FILE)
+    parser.add_argument("--unique-out", default=UNIQUE_OUT)
+    parser.add_argument("--map-out", default=MAP_OUT)
+    args = parser.parse_args()
+    run(args.input, args.unique_out, args.map_out)
 
 if __name__ == "__main__":
     main()
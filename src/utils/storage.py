@@ -0,0 +1,179 @@
+"""
+Columnar (Parquet) storage for the pipeline stages, with CSV as the fallback.
+
+The schema follows FIELDNAMES: list columns (emails, sni_codes) are stored as
+native lists and revenue as an integer, so nothing has to be re-parsed with
+ast.literal_eval on reload, and reads can be limited to the needed columns.
+employees stays a string, it is often a range like "10-19".
+
+    python -m src.utils.storage data/details/details_x.csv data/details/details_x.parquet
+"""
+import argparse
+import json
+import re
+from pathlib import Path
+
+import pandas as pd
+
+from src.scrape.setup import FIELDNAMES
+from src.utils.helpers import str_to_list
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+LIST_COLUMNS = {"emails", "sni_codes"}
+INT_COLUMNS = {"revenue": "int64"}
+
+_INT_RE = re.compile(r"-?\d+")
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("Parquet storage needs pyarrow: pip install pyarrow")
+
+
+def schema():
+    _require_pyarrow()
+    fields = []
+    for name in FIELDNAMES:
+        if name in LIST_COLUMNS:
+            fields.append(pa.field(name, pa.list_(pa.string())))
+        elif name in INT_COLUMNS:
+            fields.append(pa.field(name, getattr(pa, INT_COLUMNS[name])()))
+        else:
+            fields.append(pa.field(name, pa.string()))
+    return pa.schema(fields)
+
+
+def _is_missing(v) -> bool:
+    return v is None or v is pd.NA or (isinstance(v, float) and v != v) or str(v).strip().lower() in ("", "nan")
+
+
+def to_int(v):
+    """
+    123, "1 729 795" -> int. A range like "10-19" gives its lower bound.
+    """
+    if _is_missing(v):
+        return None
+    if isinstance(v, (int, float)):
+        return int(v)
+    match = _INT_RE.search(str(v).replace("\xa0", "").replace(" ", ""))
+    return int(match.group(0)) if match else None
+
+
+def to_list(v) -> list[str]:
+    if isinstance(v, list):
+        return [str(x) for x in v]
+    if _is_missing(v):
+        return []
+    return [str(x) for x in str_to_list(v)]
+
+
+def normalize_record(row: dict) -> dict:
+    out = {}
+    for name in FIELDNAMES:
+        v = row.get(name)
+        if name in LIST_COLUMNS:
+            out[name] = to_list(v)
+        elif name in INT_COLUMNS:
+            out[name] = to_int(v)
+        else:
+            out[name] = None if _is_missing(v) else str(v)
+    return out
+
+
+def to_csv_row(row: dict) -> dict:
+    """
+    `row` with the list columns as JSON arrays, the way they are stored in CSV
+    files (str_to_list reads them back).
+    """
+    return {k: json.dumps(to_list(v), ensure_ascii=False) if k in LIST_COLUMNS else v for k, v in row.items()}
+
+
+def write_table(rows, path, batch_size: int = 10_000):
+    """
+    Write dicts (or a DataFrame) to `path`, as Parquet if it ends in .parquet
+    (with the full FIELDNAMES schema, written in batches), otherwise as CSV.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if isinstance(rows, pd.DataFrame):
+        rows = rows.to_dict(orient="records")
+
+    if path.suffix != ".parquet":
+        df = pd.DataFrame([to_csv_row(row) for row in rows], dtype=object)  # ints with blanks stay ints
+        ordered = [c for c in FIELDNAMES if c in df.columns]
+        df[ordered + [c for c in df.columns if c not in ordered]].to_csv(path, index=False)
+        return
+
+    _require_pyarrow()
+    table_schema = schema()
+    with pq.ParquetWriter(path, table_schema) as writer:
+        batch = []
+        for row in rows:
+            batch.append(normalize_record(row))
+            if len(batch) >= batch_size:
+                writer.write_table(pa.Table.from_pylist(batch, schema=table_schema))
+                batch = []
+        if batch:
+            writer.write_table(pa.Table.from_pylist(batch, schema=table_schema))
+
+
+def _int_column(values: pd.Series, dtype: str) -> pd.Series:
+    """
+    Nullable integer column if every value is a whole number ("1 729 795"
+    included); otherwise the strings as they are, since to_int would keep only
+    the first number of e.g. a range.
+    """
+    cleaned = values.str.replace(r"[\s\xa0]", "", regex=True)
+    if not cleaned.dropna().str.fullmatch(r"-?\d+").all():
+        return values
+    return pd.to_numeric(cleaned).astype(dtype.capitalize())
+
+
+def read_table(path, columns: list[str] | None = None) -> pd.DataFrame:
+    """
+    Read only `columns` (default: all) from a Parquet or CSV file. List columns
+    come back as python lists in both cases.
+    """
+    path = Path(path)
+    if path.suffix == ".parquet":
+        _require_pyarrow()
+        nullable_ints = {pa.int64(): pd.Int64Dtype()}
+        df = pq.read_table(path, columns=columns).to_pandas(types_mapper=nullable_ints.get)
+        for c in LIST_COLUMNS & set(df.columns):
+            df[c] = df[c].map(lambda v: list(v) if v is not None else [])
+        return df
+
+    # As strings, then typed per the schema: pandas would make an integer
+    # column with blanks float ("243" -> 243.0)
+    df = pd.read_csv(path, usecols=columns, dtype=str)
+    for c in LIST_COLUMNS & set(df.columns):
+        df[c] = df[c].map(str_to_list)
+    for c, dtype in INT_COLUMNS.items():
+        if c in df.columns:
+            df[c] = _int_column(df[c], dtype)
+    return df
+
+
+def read_records(path, columns: list[str] | None = None) -> list[dict]:
+    return read_table(path, columns).to_dict(orient="records")
+
+
+def convert(src, dst):
+    """
+    Convert between CSV and Parquet, e.g. a details CSV into a typed snapshot.
+    """
+    write_table(read_records(src), dst)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a pipeline CSV to Parquet (or back)")
+    parser.add_argument("src")
+    parser.add_argument("dst")
+    args = parser.parse_args()
+    convert(args.src, args.dst)
+    print(f"✅ Wrote {args.dst}")
@@ -0,0 +1,380 @@
+"""
+Shared job queue for crawls split over several workers (processes or machines).
+
+    queue = open_queue("data/queue/queue.sqlite")     # or "redis://host:6379/0"
+    queue.put("profile", "5567029516", {"name": ..., "profile_url": ...})
+    for job in queue.lease(["profile"], n=4):
+        try:
+            queue.complete(job, result)
+        except ...:
+            queue.fail(job, "timeout")
+
+A leased job is hidden for `visibility_timeout` seconds; if its worker dies it
+becomes visible again and another worker takes it. A failed job is retried
+after `retry_delay * 2**(attempts - 1)` seconds, until `max_attempts` leases,
+then it's marked failed. Jobs and results are keyed by (kind, key) with key =
+company_key (org number), so enqueueing or completing the same company twice,
+e.g. after a lost lease, is harmless.
+
+SQLite (WAL) serves the workers of one box; the Redis backend needs only plain
+commands (no scripts), so any Redis-compatible server will do.
+"""
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import NamedTuple
+
+from src.scrape.setup import Queue
+
+try:
+    import redis
+    from redis.exceptions import WatchError
+except ImportError:
+    redis = None
+
+    class WatchError(Exception):
+        """
+        A watched key changed before EXEC (redis.exceptions.WatchError without redis-py).
+        """
+
+STATUSES = ("ready", "leased", "done", "failed")
+
+
+class Job(NamedTuple):
+    kind: str
+    key: str
+    payload: dict
+    attempts: int       # leases so far, this one included
+    lease: str          # token of this lease
+
+
+def _backoff(attempts: int, retry_delay: float) -> float:
+    return retry_delay * 2 ** max(0, attempts - 1)
+
+
+class SqliteQueue:
+    """
+    Jobs and results in one SQLite file. Leasing runs in a write transaction,
+    so any number of threads and processes on the box can share the file.
+    """
+    def __init__(
+            self,
+            path: str = Queue.URL.value,
+            visibility_timeout: float = Queue.VISIBILITY_TIMEOUT.value,
+            max_attempts: int = Queue.MAX_ATTEMPTS.value,
+            retry_delay: float = Queue.RETRY_DELAY.value,
+        ):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.lock = threading.Lock()
+        # Autocommit, transactions are explicit; wait for other processes' writes
+        self.db = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'ready',
+                available_at REAL NOT NULL DEFAULT 0,   -- ready: retry time, leased: lease deadline
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease TEXT,
+                error TEXT,
+                PRIMARY KEY (kind, key)
+            );
+            CREATE INDEX IF NOT EXISTS jobs_open ON jobs (kind, available_at) WHERE status IN ('ready', 'leased');
+            CREATE TABLE IF NOT EXISTS results (
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                result TEXT NOT NULL,
+                PRIMARY KEY (kind, key)
+            );"""
+        )
+
+    def put_many(self, kind: str, items) -> int:
+        """
+        Enqueue (key, payload) pairs; keys that are already queued (or done) are skipped.
+        """
+        rows = [(kind, key, json.dumps(payload, ensure_ascii=False)) for key, payload in items]
+        with self.lock:
+            before = self.db.total_changes
+            self.db.execute("BEGIN IMMEDIATE")
+            self.db.executemany("INSERT OR IGNORE INTO jobs (kind, key, payload) VALUES (?, ?, ?)", rows)
+            self.db.execute("COMMIT")
+            return self.db.total_changes - before
+
+    def put(self, kind: str, key: str, payload: dict) -> bool:
+        return self.put_many(kind, [(key, payload)]) == 1
+
+    def lease(self, kinds, n: int = 1, now: float | None = None) -> list[Job]:
+        """
+        Up to `n` visible jobs of `kinds`, tried in the given order.
+        """
+        now = time.time() if now is None else now
+        jobs = []
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                for kind in kinds:
+                    rows = self.db.execute(
+                        "SELECT key, payload, attempts FROM jobs WHERE kind = ? AND status IN ('ready', 'leased') "
+                        "AND available_at <= ? ORDER BY available_at LIMIT ?",
+                        (kind, now, n - len(jobs)),
+                    ).fetchall()
+                    for key, payload, attempts in rows:
+                        if attempts >= self.max_attempts:
+                            # Its workers kept dying (or timing out) on it
+                            self.db.execute(
+                                "UPDATE jobs SET status = 'failed', lease = NULL, error = COALESCE(error, 'lease expired') "
+                                "WHERE kind = ? AND key = ?", (kind, key),
+                            )
+                            continue
+                        token = uuid.uuid4().hex
+                        self.db.execute(
+                            "UPDATE jobs SET status = 'leased', available_at = ?, attempts = attempts + 1, lease = ? "
+                            "WHERE kind = ? AND key = ?",
+                            (now + self.visibility_timeout, token, kind, key),
+                        )
+                        jobs.append(Job(kind, key, json.loads(payload), attempts + 1, token))
+                    if len(jobs) >= n:
+                        break
+                self.db.execute("COMMIT")
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+        return jobs
+
+    def complete(self, job: Job, result=None):
+        """
+        Store the result (replacing an earlier one for the same key) and mark the job done.
+        """
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            self.db.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?)",
+                (job.kind, job.key, json.dumps(result, ensure_ascii=False)),
+            )
+            self.db.execute(
+                "UPDATE jobs SET status = 'done', lease = NULL, error = NULL WHERE kind = ? AND key = ?",
+                (job.kind, job.key),
+            )
+            self.db.execute("COMMIT")
+
+    def fail(self, job: Job, error: str = "", now: float | None = None):
+        """
+        Give the job back for a later retry, or mark it failed after max_attempts.
+        Does nothing if the lease was lost to another worker meanwhile.
+        """
+        now = time.time() if now is None else now
+        if job.attempts >= self.max_attempts:
+            status, available_at = "failed", now
+        else:
+            status, available_at = "ready", now + _backoff(job.attempts, self.retry_delay)
+        with self.lock:
+            self.db.execute(
+                "UPDATE jobs SET status = ?, available_at = ?, lease = NULL, error = ? "
+                "WHERE kind = ? AND key = ? AND lease = ?",
+                (status, available_at, str(error)[:500], job.kind, job.key, job.lease),
+            )
+
+    def counts(self) -> dict[str, dict[str, int]]:
+        """
+        {kind: {status: jobs}}
+        """
+        with self.lock:
+            rows = self.db.execute("SELECT kind, status, COUNT(*) FROM jobs GROUP BY kind, status").fetchall()
+        out = {}
+        for kind, status, n in rows:
+            out.setdefault(kind, dict.fromkeys(STATUSES, 0))[status] = n
+        return out
+
+    def results(self, kind: str):
+        """
+        Yield (key, result) for the done jobs of `kind`.
+        """
+        with self.lock:
+            rows = self.db.execute("SELECT key, result FROM results WHERE kind = ?", (kind,)).fetchall()
+        for key, result in rows:
+            yield key, json.loads(result)
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+class RedisQueue:
+    """
+    Same queue on a Redis-compatible server, for workers on several machines.
+
+    Per kind a sorted set holds the open job ids scored by when they are visible
+    (the retry time, or the lease deadline once leased), and a hash per job holds
+    its payload, status, attempts and lease token. Every state change writes that
+    hash inside a WATCH/MULTI transaction on it, so a lease, complete or fail that
+    raced another worker's is retried on the new state: two workers can never
+    hold the same job and a finished job never goes back to the open set.
+    Results live in one hash per kind.
+    """
+    def __init__(
+            self,
+            url: str = "redis://localhost:6379/0",
+            prefix: str = "foretagskollen:queue",
+            visibility_timeout: float = Queue.VISIBILITY_TIMEOUT.value,
+            max_attempts: int = Queue.MAX_ATTEMPTS.value,
+            retry_delay: float = Queue.RETRY_DELAY.value,
+            client=None,
+        ):
+        if client is None:
+            if redis is None:
+                raise ImportError("The Redis queue needs redis-py: pip install redis")
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self.r = client
+        self.prefix = prefix
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+    def _k(self, *parts) -> str:
+        return ":".join((self.prefix, *parts))
+
+    def _transaction(self, key: str, fn):
+        """
+        fn(pipe) with `key` watched: fn reads, calls pipe.multi(), queues its writes
+        and executes; it runs again if another client wrote `key` meanwhile.
+        """
+        with self.r.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    return fn(pipe)
+                except WatchError:
+                    continue
+
+    def put_many(self, kind: str, items) -> int:
+        added = 0
+        for key, payload in items:
+            job = self._k("job", kind, key)
+
+            def enqueue(pipe):
+                # The record and its open-set entry go in together, or not at all
+                if pipe.hexists(job, "status"):
+                    return False
+                pipe.multi()
+                pipe.hset(job, mapping={"payload": json.dumps(payload, ensure_ascii=False), "status": "ready", "attempts": 0})
+                pipe.zadd(self._k("open", kind), {key: 0})
+                pipe.sadd(self._k("kinds"), kind)
+                pipe.execute()
+                return True
+
+            added += self._transaction(job, enqueue)
+        return added
+
+    def put(self, kind: str, key: str, payload: dict) -> bool:
+        return self.put_many(kind, [(key, payload)]) == 1
+
+    def lease(self, kinds, n: int = 1, now: float | None = None) -> list[Job]:
+        now = time.time() if now is None else now
+        jobs = []
+        for kind in kinds:
+            candidates = self.r.zrangebyscore(self._k("open", kind), "-inf", now, start=0, num=4 * (n - len(jobs)))
+            for key in candidates:
+                job = self._lease_one(kind, key, now)
+                if job is None:
+                    continue  # another worker got it first, or it ran out of attempts
+                jobs.append(job)
+                if len(jobs) >= n:
+                    return jobs
+        return jobs
+
+    def _lease_one(self, kind: str, key: str, now: float) -> Job | None:
+        open_jobs, job = self._k("open", kind), self._k("job", kind, key)
+
+        def take(pipe):
+            visible_at = pipe.zscore(open_jobs, key)
+            state = pipe.hgetall(job)
+            if visible_at is None or visible_at > now or state.get("status") not in ("ready", "leased"):
+                return None
+            attempts = int(state.get("attempts", 0))
+            pipe.multi()
+            if attempts >= self.max_attempts:
+                # Its workers kept dying (or timing out) on it
+                self._finish(pipe, kind, key, "failed", error=state.get("error") or "lease expired")
+                pipe.execute()
+                return None
+            token = uuid.uuid4().hex
+            pipe.zadd(open_jobs, {key: now + self.visibility_timeout})
+            pipe.hset(job, mapping={"status": "leased", "attempts": attempts + 1, "lease": token})
+            pipe.execute()
+            return Job(kind, key, json.loads(state["payload"]), attempts + 1, token)
+
+        return self._transaction(job, take)
+
+    def _finish(self, pipe, kind, key, status, error=None):
+        other = "failed" if status == "done" else "done"
+        pipe.zrem(self._k("open", kind), key)
+        pipe.hset(self._k("job", kind, key), mapping={"status": status, "lease": "", "error": error or ""})
+        pipe.sadd(self._k(status, kind), key)
+        pipe.srem(self._k(other, kind), key)
+
+    def complete(self, job: Job, result=None):
+        def finish(pipe):
+            pipe.multi()
+            pipe.hset(self._k("results", job.kind), job.key, json.dumps(result, ensure_ascii=False))
+            self._finish(pipe, job.kind, job.key, "done")
+            pipe.execute()
+
+        self._transaction(self._k("job", job.kind, job.key), finish)
+
+    def fail(self, job: Job, error: str = "", now: float | None = None):
+        now = time.time() if now is None else now
+        error = str(error)[:500]
+        key = self._k("job", job.kind, job.key)
+
+        def give_back(pipe):
+            if pipe.hget(key, "lease") != job.lease:
+                return  # lost to another worker, or already finished
+            pipe.multi()
+            if job.attempts >= self.max_attempts:
+                self._finish(pipe, job.kind, job.key, "failed", error=error)
+            else:
+                pipe.zadd(self._k("open", job.kind), {job.key: now + _backoff(job.attempts, self.retry_delay)})
+                pipe.hset(key, mapping={"status": "ready", "lease": "", "error": error})
+            pipe.execute()
+
+        self._transaction(key, give_back)
+
+    def counts(self) -> dict[str, dict[str, int]]:
+        out = {}
+        now = time.time()
+        for kind in sorted(self.r.smembers(self._k("kinds"))):
+            open_jobs = self.r.zcard(self._k("open", kind))
+            # Open jobs hidden until later: leased, or waiting out a retry delay
+            leased = self.r.zcount(self._k("open", kind), f"({now}", "+inf")
+            out[kind] = {
+                "ready": open_jobs - leased,
+                "leased": leased,
+                "done": self.r.scard(self._k("done", kind)),
+                "failed": self.r.scard(self._k("failed", kind)),
+            }
+        return out
+
+    def results(self, kind: str):
+        for key, result in self.r.hscan_iter(self._k("results", kind)):
+            yield key, json.loads(result)
+
+    def close(self):
+        self.r.close()
+
+
+def open_queue(url: str = Queue.URL.value, **kwargs):
+    """
+    RedisQueue for a redis:// (or rediss://) url, else SqliteQueue on that path.
+    """
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisQueue(url, **kwargs)
+    return SqliteQueue(url, **kwargs)
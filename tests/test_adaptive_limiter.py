@@ -0,0 +1,73 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.scrape import concurrency
+from src.scrape.concurrency import AdaptiveLimiter
+
+URL = "https://www.allabolag.se/foretag/x"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    concurrency's time.monotonic, moved by hand with clock.advance(seconds).
+    """
+    clock = SimpleNamespace(now=1000.0)
+    clock.advance = lambda seconds: setattr(clock, "now", clock.now + seconds)
+    monkeypatch.setattr(concurrency.time, "monotonic", lambda: clock.now)
+    return clock
+
+
+def _answer(status=200, **headers):
+    return SimpleNamespace(status_code=status, headers=headers, raw=None)
+
+
+def _limiter():
+    return AdaptiveLimiter(rate=4.0, max_in_flight=8, burst=2, min_rate=0.5, max_rate=10.0,
+                           latency_target=1.0, decrease=0.5)
+
+
+def test_additive_increase_up_to_the_ceiling(clock):
+    limiter = _limiter()
+    host = limiter.host(URL)
+    assert (host.rate, host.limit) == (4.0, 4)
+
+    limiter.release(URL, _answer(), 0.1)
+    assert host.rate == pytest.approx(4.25) and host.limit == pytest.approx(4.25)
+
+    for _ in range(1000):
+        limiter.release(URL, _answer(), 0.1)
+    assert (host.rate, host.limit) == (10.0, 8)
+
+
+def test_multiplicative_decrease_once_per_round_trip(clock):
+    limiter = _limiter()
+    host = limiter.host(URL)
+
+    limiter.release(URL, _answer(429), 0.2)
+    assert host.rate == 2.0 and host.limit == 2.0
+    limiter.release(URL, _answer(503), 0.2)   # same burst of errors
+    assert host.rate == 2.0
+
+    clock.advance(1)
+    limiter.release(URL, None, 0.2)          # the request raised
+    assert host.rate == 1.0 and host.limit == 1.0
+
+    clock.advance(2)                         # past the round-trip the slow answer stretches
+    limiter.release(URL, _answer(), 5.0)     # slower than latency_target
+    assert host.rate == 0.5
+    clock.advance(5)
+    limiter.release(URL, _answer(429), 0.2)
+    assert host.rate == 0.5 and host.limit == 1.0   # min_rate, at least one in flight
+
+    for _ in range(200):
+        limiter.release(URL, _answer(), 0.1)
+    assert host.rate > 4.0 and host.limit > 4.0
+
+
+def test_retry_after_pauses_the_host(clock):
+    limiter = _limiter()
+    limiter.release(URL, _answer(429, **{"Retry-After": "30"}), 0.1)
+    assert limiter.host(URL).paused_until == clock.now + 30
+    assert limiter.host("https://other.se/").paused_until == 0.0   # per host
@@ -0,0 +1,25 @@
+import csv
+import json
+
+from src.utils.checkpoint import Journal
+from src.utils.storage import to_csv_row
+from src.utils.helpers import str_to_list
+
+
+def test_journal_never_ahead_of_companion(tmp_path):
+    details = tmp_path / "details.csv"
+    with open(details, "a", newline="", encoding="utf-8") as file, \
+            Journal(tmp_path / "details.journal.jsonl", companions=[file]) as journal:
+        writer = csv.DictWriter(file, fieldnames=["name", "emails"])
+        for i in range(3):
+            writer.writerow(to_csv_row({"name": f"AB {i}", "emails": [f"info@{i}.se"]}))
+            journal.record(str(i))
+            # What a crash right now would leave behind
+            written = details.read_text(encoding="utf-8").splitlines()
+            assert len(written) == len(Journal(tmp_path / "details.journal.jsonl")) == i + 1
+
+
+def test_csv_lists_are_json(tmp_path):
+    row = to_csv_row({"name": "Åkeri AB", "emails": ["a@å.se"], "sni_codes": None})
+    assert json.loads(row["emails"]) == ["a@å.se"] and row["sni_codes"] == "[]"
+    assert str_to_list(row["emails"]) == ["a@å.se"]
@@ -0,0 +1,51 @@
+import pandas as pd
+import pytest
+
+from src.utils.company_index import CompanyIndex
+
+
+@pytest.fixture
+def index():
+    return CompanyIndex(pd.DataFrame([
+        {"org_number": "556702-9516", "name": "A", "city": "Örebro", "revenue": "1 200",
+         "sni_codes": ["62010 Dataprogrammering", "62020 Datakonsult"]},
+        {"org_number": "5560000002", "name": "B", "city": " örebro ", "revenue": 50,
+         "sni_codes": ["47110 Livsmedel"]},
+        {"org_number": "5560000003", "name": "C", "city": "Stockholm", "revenue": None,
+         "sni_codes": '["62030 Datordrift"]'},
+        {"org_number": "5560000002", "name": "B igen", "city": "Kumla", "revenue": 9000, "sni_codes": []},
+    ]))
+
+
+def _names(index, ids):
+    return [r["name"] for r in index.rows(ids, columns=["name"])]
+
+
+def test_get_by_normalized_org_number(index):
+    assert index.get("5567029516")["name"] == "A"
+    assert index.get("556702-9516")["name"] == "A"
+    assert index.get("556000-0002")["name"] == "B"   # the first row wins
+    assert index.get("0000000000") is None and index.get(None) is None
+
+
+def test_sni_prefixes(index):
+    assert _names(index, index.filter(sni="62")) == ["A", "C"]
+    assert _names(index, index.filter(sni="6202")) == ["A"]
+    assert _names(index, index.filter(sni=["47", "62030"])) == ["B", "C"]
+    assert _names(index, index.filter(sni="99")) == []
+
+
+def test_city_and_revenue_filters_intersect(index):
+    assert _names(index, index.filter(city="ÖREBRO")) == ["A", "B"]
+    assert _names(index, index.filter(revenue_min=100)) == ["A", "B igen"]
+    assert _names(index, index.filter(revenue_max=1200)) == ["A", "B"]
+    assert _names(index, index.filter(city="örebro", revenue_min=100, sni="62")) == ["A"]
+    assert _names(index, index.filter()) == ["A", "B", "C", "B igen"]
+
+
+def test_load_from_csv(tmp_path, index):
+    path = tmp_path / "out.csv"
+    index.df.assign(sni_codes=index.df["sni_codes"].astype(str)).to_csv(path, index=False)
+    loaded = CompanyIndex.load(path)
+    assert len(loaded) == 4
+    assert _names(loaded, loaded.filter(sni="62", revenue_min=1000)) == ["A"]
@@ -0,0 +1,29 @@
+import csv
+
+from src.utils.compare_csv import diff_csv_by_orgnr
+
+
+def _write(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["org_number", "name", "profile_url"])
+        writer.writerows(rows)
+    return str(path)
+
+
+def test_diff_csv_by_orgnr_matches_on_stripped_org_number(tmp_path):
+    left = _write(tmp_path / "left.csv", [
+        [" 5560000001 ", "AB 1", "https://a/1"],
+        ["5560000001", "AB 1 igen", "https://a/other"],
+        ["5560000002", "AB 2", "https://a/2"],
+        ["5560000002", "AB 2 dubblett", "https://a/2"],
+        ["", "Utan orgnr", ""],
+    ])
+    right = _write(tmp_path / "right.csv", [["5560000001", "AB 1", "https://b/1"]])
+    out = tmp_path / "out" / "diff.csv"
+
+    orgs = diff_csv_by_orgnr(left, right, str(out))
+
+    assert list(orgs) == ["5560000002", "5560000002", ""]
+    with open(out, newline="", encoding="utf-8") as f:
+        assert [r["name"] for r in csv.DictReader(f)] == ["AB 2", "AB 2 dubblett", "Utan orgnr"]
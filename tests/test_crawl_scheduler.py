@@ -0,0 +1,60 @@
+from pathlib import Path
+
+import pytest
+
+from benchmarks.stand_in import DATA_CSV, StandInServer, routed_to
+from src.scrape.crawl_scheduler import crawl_segments, partition_segments, split_band
+from src.scrape.scrape_allabolag import default_segment
+from src.utils.checkpoint import company_key
+
+
+@pytest.mark.parametrize("band, halves", [
+    ((100, 10_000), ((100, 1000), (1001, 10_000))),   # geometric mean for positive bands
+    ((1, 2), ((1, 1), (2, 2))),
+    ((0, 10), ((0, 5), (6, 10))),                      # arithmetic mean from zero ...
+    ((-10, 10), ((-10, 0), (1, 10))),                  # ... or below
+    ((5, 5), None),
+])
+def test_split_band(band, halves):
+    assert split_band(*band) == halves
+
+
+needs_data = pytest.mark.skipif(not Path(DATA_CSV).exists(), reason=f"needs {DATA_CSV} for the stand-in")
+
+
+@pytest.fixture
+def server():
+    with StandInServer(limit=64) as server, routed_to(server):
+        yield server
+
+
+def _revenues(server, band):
+    return [r["_revenue"] for r in server.rows if band[0] <= r["_revenue"] <= band[1]]
+
+
+@needs_data
+def test_partition_segments_covers_the_band_within_the_budget(server):
+    segment = default_segment()
+    bands = partition_segments([segment], page_budget=2, use_cache=False, workers=4, rate=1000)
+
+    assert len(bands) > 1
+    assert all(b._replace(revenue=segment.revenue) == segment for b in bands)
+    revenue = [b.revenue for b in bands]
+    # High to low for the "...Desc" sort, contiguous, covering the whole band
+    assert revenue[0][1] == segment.revenue[1] and revenue[-1][0] == segment.revenue[0]
+    assert all(lower[1] + 1 == upper[0] for upper, lower in zip(revenue, revenue[1:]))
+    assert all(len(_revenues(server, band)) <= 2 * 10 for band in revenue)
+    assert sum(len(_revenues(server, band)) for band in revenue) == len(server.rows)
+
+
+@needs_data
+def test_crawl_segments_dedupes_overlapping_segments(server):
+    upper = default_segment()._replace(revenue=(800_000, 2_000_000))
+    lower = default_segment()._replace(revenue=(300_000, 1_000_000))
+    companies, membership = crawl_segments([upper, lower, upper], journal_dir=None, use_cache=False, workers=4, rate=1000)
+
+    keys = [company_key(c) for c in companies]
+    assert len(keys) == len(set(keys)) == len(_revenues(server, (300_000, 2_000_000)))
+    both = [key for key, tags in membership.items() if tags == [upper.tag, lower.tag]]
+    assert len(both) == len(_revenues(server, (800_000, 1_000_000))) > 0
+    assert set(membership) == set(keys)
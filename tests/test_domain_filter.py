@@ -0,0 +1,34 @@
+import pytest
+
+from src.scrape.domain_filter import DomainMatcher
+
+MATCHER = DomainMatcher(["allabolag.se", "www.na.se", "https://Google.com/maps/", "facebook.com/pages"])
+
+
+@pytest.mark.parametrize("url", [
+    "https://allabolag.se/foretag/x",
+    "https://www.allabolag.se/",
+    "http://sub.deep.allabolag.se",
+    "allabolag.se/x",                        # no scheme
+    "https://WWW.AllaBolag.SE./",            # case and a trailing dot
+    "https://na.se/", "https://shop.na.se/",
+    "https://www.google.com/maps", "https://google.com/maps/place/AB",
+    "https://sv-se.facebook.com/pages/ab",
+])
+def test_excluded(url):
+    assert MATCHER.matches(url) and url in MATCHER
+
+
+@pytest.mark.parametrize("url", [
+    "https://hanna.se/",                     # ends in "na.se" but is another domain
+    "https://allabolag.se.example.com/",
+    "https://notallabolag.se/",
+    "https://www.google.com/",               # only /maps is excluded
+    "https://www.google.com/mapsearch",
+    "https://facebook.com/ab",
+    "https://example.com/allabolag.se",      # the rule is a domain, not a substring
+    "",
+    "not a url",
+])
+def test_allowed(url):
+    assert not MATCHER.matches(url)
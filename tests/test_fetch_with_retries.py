@@ -0,0 +1,35 @@
+from src.scrape.concurrency import AdaptiveLimiter
+from src.scrape.scrape_allabolag import fetch_with_retries
+
+
+def test_retry_batches_share_one_limiter():
+    limiters, failures = [], {"AB 1": 2, "AB 2": 1}
+
+    def fetch_details(companies, limiter=None, **kwargs):
+        limiters.append(limiter)
+        for company in companies:
+            if failures.get(company["name"], 0):
+                failures[company["name"]] -= 1
+                yield company
+            else:
+                yield {**company, "sni_codes": []}
+
+    companies = [{"name": f"AB {i}"} for i in range(3)]
+    rows = list(fetch_with_retries(fetch_details, companies, attempts=3, delay=0, adaptive=True))
+
+    assert sorted(r["name"] for r in rows) == ["AB 0", "AB 1", "AB 2"]
+    assert all("sni_codes" in r for r in rows)
+    assert len(limiters) == 3
+    assert isinstance(limiters[0], AdaptiveLimiter) and all(limiter is limiters[0] for limiter in limiters)
+
+
+def test_given_limiter_is_passed_through():
+    seen = []
+    limiter = object()
+
+    def fetch_details(companies, limiter=None):
+        seen.append(limiter)
+        yield from ({**c, "sni_codes": []} for c in companies)
+
+    list(fetch_with_retries(fetch_details, [{"name": "AB 0"}], limiter=limiter))
+    assert seen == [limiter]
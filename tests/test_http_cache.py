@@ -0,0 +1,69 @@
+import itertools
+import os
+
+import pytest
+import requests
+
+from src.scrape import http_cache, http_client
+from src.scrape.http_cache import ResponseCache
+
+
+def _response(body: bytes, **headers) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response.headers.update(headers)
+    response._content = body
+    return response
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    time.time() in http_cache ticks one second per call, so access order is strict.
+    """
+    ticks = itertools.count(1_000_000)
+    monkeypatch.setattr(http_cache.time, "time", lambda: float(next(ticks)))
+
+
+def test_entries_turn_stale_after_ttl(tmp_path):
+    path = str(tmp_path / "http.sqlite")
+    ResponseCache(path, ttl=60).store("https://a.se/", _response(b"<html>a</html>", ETag='"v1"'))
+
+    cached, fresh = ResponseCache(path, ttl=60).lookup("https://a.se/")
+    assert fresh and cached.content == b"<html>a</html>" and cached.headers["ETag"] == '"v1"'
+    assert ResponseCache(path, ttl=0).lookup("https://a.se/")[1] is False
+    assert ResponseCache(path, ttl=60).lookup("https://b.se/") is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    # Random bodies don't compress, so two fit and a third evicts one
+    cache = ResponseCache(str(tmp_path / "http.sqlite"), max_bytes=2500)
+    for name in "ab":
+        cache.store(f"https://{name}.se/", _response(os.urandom(1000)))
+    cache.lookup("https://a.se/")
+    cache.store("https://c.se/", _response(os.urandom(1000)))
+
+    assert cache.lookup("https://b.se/") is None
+    assert cache.lookup("https://a.se/") is not None and cache.lookup("https://c.se/") is not None
+    assert cache.total_bytes <= 2500
+
+
+def test_stale_entry_is_revalidated_with_etag(local_server, tmp_path, monkeypatch):
+    def route(handler):
+        if handler.headers.get("If-None-Match") == '"v1"':
+            return 304, {"ETag": '"v1"'}, b""
+        return 200, {"Content-Type": "text/html; charset=utf-8", "ETag": '"v1"'}, "<html>v1</html>"
+
+    local_server.route = route
+    monkeypatch.setattr(http_client, "_cache", ResponseCache(str(tmp_path / "http.sqlite"), ttl=0))
+    url = f"{local_server.url}/profile"
+
+    assert http_client.get(url, cache=True).text == "<html>v1</html>"
+    second = http_client.get(url, cache=True)
+    assert second.text == "<html>v1</html>" and second.from_cache
+    assert [headers.get("If-None-Match") for _, headers in local_server.requests] == [None, '"v1"']
+
+    # Fresh entries are answered without a request
+    http_client._cache.ttl = 60
+    assert http_client.get(url, cache=True).text == "<html>v1</html>"
+    assert len(local_server.requests) == 2
@@ -0,0 +1,24 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from src.scrape import http_client
+from src.utils import metrics
+
+
+def test_one_session_is_shared_across_threads():
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        sessions = set(map(id, pool.map(lambda _: http_client.get_session(), range(16))))
+    assert sessions == {id(http_client.get_session())}
+
+
+def test_get_retries_a_503_and_records_the_request(local_server, monkeypatch):
+    monkeypatch.setattr(http_client, "_session", http_client.make_session(backoff_factor=0))
+    answers = iter([(503, {}, "busy"), (200, {"Content-Type": "text/html"}, "<html>ok</html>")])
+    local_server.route = lambda handler: next(answers)
+    before = metrics.REGISTRY.total("http_requests_total", host="127.0.0.1", status=200)
+
+    response = http_client.get(f"{local_server.url}/page")
+
+    assert response.status_code == 200 and response.text == "<html>ok</html>"
+    assert len(local_server.requests) == 2
+    assert "gzip" in local_server.requests[0][1]["Accept-Encoding"]
+    assert metrics.REGISTRY.total("http_requests_total", host="127.0.0.1", status=200) == before + 1
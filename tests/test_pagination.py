@@ -0,0 +1,69 @@
+"""
+scrape_multiple_pages against the stand-in: a failed page stops the run
+instead of passing for the end of the listing, and a second run resumes from
+the page journal.
+"""
+import re
+from pathlib import Path
+
+import pytest
+
+from benchmarks.stand_in import DATA_CSV, StandInServer, routed_to
+from src.scrape.crawl_scheduler import partition_segments
+from src.scrape import scrape_allabolag
+from src.scrape.scrape_allabolag import ListingError, default_segment, scrape_multiple_pages
+
+pytestmark = pytest.mark.skipif(not Path(DATA_CSV).exists(), reason=f"needs {DATA_CSV} for the stand-in")
+
+_PAGE = re.compile(r"[?&]page=(\d+)")
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(scrape_allabolag.time, "sleep", lambda seconds: None)  # no backoff between attempts
+    with StandInServer(limit=64) as server, routed_to(server):
+        server.listing_requests = []
+        server.failing_pages = set()
+        respond = server.respond
+
+        def listing_aware(path):
+            if path.startswith("/segmentering"):
+                match = _PAGE.search(path)
+                page = int(match.group(1)) if match else 1
+                server.listing_requests.append(page)
+                if page in server.failing_pages:
+                    return 404, "<html><body>Not found</body></html>"
+            return respond(path)
+
+        server.respond = listing_aware
+        yield server
+
+
+def test_resume_after_failed_page(server, tmp_path):
+    journal = str(tmp_path / "pages.journal.jsonl")
+    expected = scrape_multiple_pages(use_cache=False, workers=2)
+    assert len(expected) == len(server.rows)
+
+    server.failing_pages = {3}
+    with pytest.raises(ListingError):
+        scrape_multiple_pages(journal_path=journal, use_cache=False, workers=2)
+
+    server.failing_pages = set()
+    server.listing_requests.clear()
+    assert scrape_multiple_pages(journal_path=journal, use_cache=False, workers=2) == expected
+    assert 3 in server.listing_requests
+    assert 1 not in server.listing_requests  # journaled by the failed run
+
+    # Everything is journaled now: only the probes past the end are sent again
+    server.listing_requests.clear()
+    assert scrape_multiple_pages(journal_path=journal, use_cache=False, workers=2) == expected
+    last = -(-len(server.rows) // 10)
+    assert all(page > last for page in server.listing_requests)
+
+
+def test_failed_split_probe_is_not_taken_for_a_small_band(server):
+    assert len(partition_segments([default_segment()], page_budget=2, use_cache=False, workers=2, max_depth=2)) > 1
+
+    server.failing_pages = {3}
+    with pytest.raises(ListingError):
+        partition_segments([default_segment()], page_budget=2, use_cache=False, workers=2, max_depth=2)
@@ -0,0 +1,55 @@
+"""
+Every installed parser backend gives the same result on the same pages: the
+recorded fixtures in benchmarks/fixtures/ when there are any, plus pages
+rendered by the stand-in with the markup the parsers read.
+"""
+import glob
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from benchmarks.stand_in import DATA_CSV, FIXTURES, render_listing, render_profile
+from src.scrape.parse_allabolag import BACKENDS, parse_company_details, parse_company_links
+
+PROFILE_URL = "https://www.allabolag.se/foretag/x/-/{}"
+
+EDGE_CASES = [
+    "",
+    "<html><body></body></html>",
+    # missing values, nested markup and odd whitespace
+    '<div class="SegmentationSearchResultCard-card"><a href="/foretag/a/-/5560000001"> <b>A</b>  AB </a></div>'
+    '<div class="SegmentationSearchResultCard-card">no link</div>'
+    '<table class="AccountFiguresWidget-accountingtable"><tr><th>Omsättning <span>(tkr)</span></th><td> 1\xa0234 </td></tr></table>'
+    '<span class="OfficialCompanyInformationCard-propertyList"><span class="OfficialCompanyInformationCard-property"> Postadress </span>'
+    '<span class="OfficialCompanyInformationCard-propertyValue">Box 1<br/>123 45  Stad</span></span>'
+    '<span class="ContactInformationCard-smallPropertyList"><span class="ContactInformationCard-smallProperty">E-post</span>'
+    '<span class="ContactInformationCard-smallPropertyValue"><button> a@b.se </button></span></span>',
+]
+
+
+def _pages():
+    pages = [(f"edge-{i}", html, "5560000001") for i, html in enumerate(EDGE_CASES)]
+    for path in sorted(glob.glob(str(FIXTURES / "*.html"))):
+        name = Path(path).stem
+        pages.append((name, Path(path).read_text(encoding="utf-8"), name.rsplit("-", 1)[-1]))
+    if Path(DATA_CSV).exists():
+        df = pd.read_csv(DATA_CSV, dtype=str, nrows=30)
+        df["_org"] = df["org_number"].fillna("").str.replace(r"\D", "", regex=True)
+        rows = df.to_dict(orient="records")
+        pages.append(("listing", render_listing(rows[:10]), "0"))
+        pages += [(f"profile-{r['_org']}", render_profile(r, f"http://127.0.0.1/site/{r['_org']}"), r["_org"]) for r in rows]
+    return pages
+
+
+PAGES = _pages()
+
+
+@pytest.mark.skipif(len(BACKENDS) < 2, reason="only one parser backend installed")
+@pytest.mark.parametrize("name, html, org", PAGES, ids=[p[0] for p in PAGES])
+def test_backends_agree(name, html, org):
+    links = {b: parse_company_links(html, backend=b) for b in BACKENDS}
+    details = {b: parse_company_details({"profile_url": PROFILE_URL.format(org)}, html, backend=b) for b in BACKENDS}
+    for backend in BACKENDS:
+        assert links[backend] == links["bs4"], backend
+        assert details[backend] == details["bs4"], backend
@@ -0,0 +1,40 @@
+import threading
+import time
+
+from src.scrape.parse_pool import parse_profiles_in_pool, pooled_parse
+
+
+def _double(item, payload):
+    return payload * 2
+
+
+def test_results_in_input_order_with_failed_fetches_kept():
+    def fetch(i):
+        return None if i == 3 else i
+
+    out = list(pooled_parse(range(8), fetch, _double, fetch_workers=4, parse_workers=2, queue_size=4,
+                            on_fetch_failed=lambda item, payload: f"failed {item}"))
+    assert out == [0, 2, 4, "failed 3", 8, 10, 12, 14]
+
+
+def test_consumer_stopping_early_releases_the_feeder():
+    fetched = []
+
+    def fetch(i):
+        fetched.append(i)
+        return i
+
+    threads = threading.active_count()
+    results = pooled_parse(range(1000), fetch, _double, fetch_workers=2, parse_workers=1, queue_size=2)
+    assert [next(results) for _ in range(3)] == [0, 2, 4]
+    results.close()
+
+    deadline = time.monotonic() + 5
+    while threading.active_count() > threads and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert threading.active_count() == threads  # the feeder and its fetch threads are gone
+    assert len(fetched) < 1000
+
+
+def test_workers_is_taken_for_fetch_workers():
+    assert list(parse_profiles_in_pool([], workers=2, use_cache=False)) == []
@@ -0,0 +1,90 @@
+import json
+import re
+from pathlib import Path
+
+import pytest
+
+from benchmarks.stand_in import DATA_CSV, StandInServer, routed_to
+from src.scrape import scrape_allabolag
+from src.scrape.pipeline import listing, run_pipeline, write_rows
+from src.scrape.scrape_allabolag import ListingError
+from src.utils.checkpoint import Journal, company_key
+from src.utils.storage import read_records
+
+needs_stand_in = pytest.mark.skipif(not Path(DATA_CSV).exists(), reason=f"needs {DATA_CSV} for the stand-in")
+
+_PAGE = re.compile(r"[?&]page=(\d+)")
+
+
+def test_write_rows_serializes_lists_and_journals_after_the_row(tmp_path):
+    path, journal_path = tmp_path / "details.csv", tmp_path / "details.journal.jsonl"
+    rows = [
+        {"name": "AB 1", "org_number": "5560000001", "emails": ["info@ab1.se", "order@ab1.se"],
+         "sni_codes": ["62010 Dataprogrammering"]},
+        {"name": "AB 2", "org_number": "5560000002"},  # no details: failed
+    ]
+    with open(path, "a", newline="", encoding="utf-8") as file, Journal(str(journal_path), companions=[file]) as journal:
+        counts = write_rows(iter(rows), file, journal)
+        # The row is on disk before the journal says it's done
+        assert read_records(path)[0]["emails"] == ["info@ab1.se", "order@ab1.se"]
+
+    assert counts == {"written": 1, "failed": 1}
+    [row] = read_records(path)
+    assert row["sni_codes"] == ["62010 Dataprogrammering"]
+    with open(path, encoding="utf-8") as f:
+        assert '"[""info@ab1.se"", ""order@ab1.se""]"' in f.read()
+    states = [json.loads(line).get("state") for line in open(journal_path, encoding="utf-8")]
+    assert len(states) == 2 and states[1] == "failed"
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(scrape_allabolag.time, "sleep", lambda seconds: None)  # no backoff between attempts
+    with StandInServer(limit=64) as server, routed_to(server):
+        server.failing_pages = set()
+        respond = server.respond
+
+        def failing(path):
+            match = _PAGE.search(path)
+            if path.startswith("/segmentering") and match and int(match.group(1)) in server.failing_pages:
+                return 503, "<html><body>Service unavailable</body></html>"
+            return respond(path)
+
+        server.respond = failing
+        yield server
+
+
+def _fake_details(companies, **kwargs):
+    for company in companies:
+        yield {**company, "org_number": company_key(company), "sni_codes": []}
+
+
+@needs_stand_in
+def test_failed_listing_page_stops_the_pipeline(server, tmp_path):
+    assert len(list(listing(use_cache=False, workers=2, rate=1000))) == len(server.rows)
+
+    server.failing_pages = {2}
+    with pytest.raises(ListingError):
+        list(listing(use_cache=False, workers=2, rate=1000))
+    with pytest.raises(ListingError):
+        run_pipeline(str(tmp_path / "details.csv"), fetch_details=_fake_details, find_emails=False, use_cache=False)
+
+
+@needs_stand_in
+def test_details_file_from_before_the_journal_is_not_fetched_again(server, tmp_path):
+    path = tmp_path / "details.csv"
+    run_pipeline(str(path), fetch_details=_fake_details, find_emails=False, use_cache=False)
+    rows = read_records(path)
+    assert len(rows) == len(server.rows)
+    (tmp_path / "details.journal.jsonl").unlink()
+
+    fetched = []
+
+    def fetch_details(companies, **kwargs):
+        companies = list(companies)
+        fetched.extend(companies)
+        return _fake_details(companies)
+
+    assert run_pipeline(str(path), fetch_details=fetch_details, find_emails=False, use_cache=False) == {"written": 0, "failed": 0}
+    assert fetched == []
+    assert len(read_records(path)) == len(rows)
@@ -0,0 +1,69 @@
+import csv
+
+import pytest
+
+from src.scrape.setup import FIELDNAMES
+from src.utils.checkpoint import Journal, company_key
+from src.utils.refresh import RefreshAborted, refresh_details
+from src.utils.storage import to_csv_row
+
+
+def _company(i):
+    return {"name": f"AB {i}", "profile_url": f"https://www.allabolag.se/foretag/ab-{i}/orebro/-/55600000{i:02d}"}
+
+
+def _details(company, **fields):
+    return {**company, "org_number": company_key(company), "revenue": 243, "employees": "10-19",
+            "emails": ["info@ab.se"], "sni_codes": ["62010 Dataprogrammering"], **fields}
+
+
+@pytest.fixture
+def files(tmp_path):
+    details = tmp_path / "details_x.csv"
+    with open(details, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+        writer.writeheader()
+        for i in range(10):
+            writer.writerow(to_csv_row(_details(_company(i))))
+    return {
+        "details_path": str(details),
+        "state_path": str(tmp_path / "state.sqlite"),
+        "delta_path": str(tmp_path / "delta.jsonl"),
+        "journal": tmp_path / "details_x.journal.jsonl",
+    }
+
+
+def _refresh(companies, files, fetched, **kwargs):
+    def fetch_details(todo):
+        fetched.extend(todo)
+        return [_details(c) for c in todo]
+
+    return refresh_details(companies, fetch_details, files["details_path"], state_path=files["state_path"],
+                           delta_path=files["delta_path"], previous_listing=[_company(i) for i in range(10)], **kwargs)
+
+
+def test_short_listing_aborts_without_writing(files):
+    before = open(files["details_path"], "rb").read()
+    fetched = []
+    with pytest.raises(RefreshAborted):
+        _refresh([_company(i) for i in range(3)], files, fetched)
+    assert fetched == []
+    assert open(files["details_path"], "rb").read() == before
+    assert not files["journal"].exists()
+
+
+def test_rewrite_keeps_rows_and_rebuilds_journal(files):
+    before = open(files["details_path"], encoding="utf-8").read().splitlines()
+    fetched = []
+    companies = [_company(i) for i in range(11)]  # one new company
+    counts = _refresh(companies, files, fetched)
+    assert counts["new"] == 1 and [company_key(c) for c in fetched] == [company_key(companies[10])]
+
+    after = open(files["details_path"], encoding="utf-8").read().splitlines()
+    assert after[:11] == before  # untouched rows byte for byte, "10-19" included
+    assert len(after) == 12
+
+    # A normal run afterwards has nothing left to fetch
+    journal = Journal(files["journal"])
+    assert all(journal.is_done(company_key(c)) for c in companies)
+    journal.close()
@@ -0,0 +1,47 @@
+"""
+Email discovery against the stand-in's company websites, on threads and with
+the scanning on a process pool.
+"""
+from pathlib import Path
+
+import pytest
+
+from benchmarks.stand_in import DATA_CSV, StandInServer
+from src.scrape.parse_pool import find_emails_in_pool
+from src.scrape.scrape_mail import find_emails_on_website
+from src.scrape.setup import Mail
+
+
+@pytest.mark.parametrize("url", [None, float("nan"), "", "  "])
+def test_no_website(url):
+    assert find_emails_on_website(url, use_cache=False) is None
+    assert list(find_emails_in_pool([url], use_cache=False)) == [None]
+
+
+@pytest.mark.skipif(not Path(DATA_CSV).exists(), reason=f"needs {DATA_CSV} for the stand-in")
+def test_contact_link_first_and_early_stop():
+    with StandInServer(limit=10) as server:
+        paths = []
+        respond = server.respond
+        server.respond = lambda path: (paths.append(path), respond(path))[1]
+        # separate sites, a stopped crawl may still finish a request in the background
+        threaded_rows, pooled_rows = server.rows[:3], server.rows[3:6]
+
+        threaded = [find_emails_on_website(server.site_url(r["_org"]), use_cache=False, min_emails=1, workers=1)
+                    for r in threaded_rows]
+        assert threaded == [[f"info@{r['_org']}.se"] for r in threaded_rows]
+        # homepage, then its "Kontakta oss" link; the worker may take a page or
+        # two more before it sees the stop, but not the other MAIL_SEARCH_PAGES
+        _assert_stopped_early(paths, threaded_rows)
+
+        urls = [server.site_url(r["_org"]) for r in pooled_rows]
+        pooled = list(find_emails_in_pool(urls, use_cache=False, min_emails=1, workers=1, parse_workers=2))
+        assert pooled == [[f"info@{r['_org']}.se"] for r in pooled_rows]
+        _assert_stopped_early(paths, pooled_rows)
+
+
+def _assert_stopped_early(paths, rows):
+    for r in rows:
+        fetched = [p for p in paths if p.startswith(f"/site/{r['_org']}/")]
+        assert fetched[:2] == [f"/site/{r['_org']}/", f"/site/{r['_org']}/kontakt"]
+        assert len(fetched) < len(Mail.MAIL_SEARCH_PAGES.value) // 2
@@ -0,0 +1,97 @@
+import csv
+import io
+import json
+import threading
+import urllib.error
+import urllib.request
+from functools import partial
+from http.server import ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+import serve
+
+
+@pytest.fixture(scope="module")
+def base_url(tmp_path_factory):
+    data = tmp_path_factory.mktemp("serve") / "companies.csv"
+    data.write_text(
+        "name,org_number,revenue,postal_address,city,website,sni_codes,emails\n"
+        + "".join(f"AB {i},55600000{i:02d},{i * 1000},,Örebro,,[],[]\n" for i in range(30)),
+        encoding="utf-8",
+    )
+    handler = type("TestHandler", (serve.Handler,), {"store": serve.CompanyStore(str(data)), "log_message": lambda *a: None})
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), partial(handler, directory=str(serve.ROOT)))
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+def _status(url):
+    try:
+        with urllib.request.urlopen(url) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+@pytest.mark.parametrize("path, status", [
+    ("/", 200), ("/index.html", 200),
+    ("/.git/HEAD", 404), ("/serve.py", 404), ("/data/", 404), ("/requests.jsonl", 404),
+    ("/bundle/", 404), ("/bundle/%2e%2e/serve.py", 404),
+])
+def test_static_whitelist(base_url, path, status):
+    assert _status(base_url + path) == status
+
+
+@pytest.mark.parametrize("query", ["start=x", "length=1.5", "draw=abc"])
+def test_bad_params_are_400(base_url, query):
+    assert _status(f"{base_url}/api/companies?{query}") == 400
+
+
+class _Store:
+    columns = ["name"]
+    index = list(range(30))
+
+    def query(self, **kwargs):
+        return np.arange(30)
+
+    def rows(self, ids, columns=None):
+        return [{"name": int(i)} for i in ids]
+
+
+def test_length_is_clamped(monkeypatch):
+    monkeypatch.setattr(serve, "MAX_PAGE", 10)
+    response = serve.datatables_response(_Store(), {"length": ["-1"], "start": ["-3"]})
+    assert len(response["data"]) == 10 and response["data"][0] == {"name": 0}
+    assert len(serve.datatables_response(_Store(), {"length": ["500"]})["data"]) == 10
+
+
+def _get(url):
+    with urllib.request.urlopen(url) as response:
+        return response.headers, response.read().decode("utf-8")
+
+
+def test_csv_export_has_every_filtered_row(base_url, monkeypatch):
+    monkeypatch.setattr(serve, "MAX_PAGE", 10)
+    query = ("fields=name,revenue&revMin=5000&order%5B0%5D%5Bcolumn%5D=1&columns%5B1%5D%5Bdata%5D=revenue"
+             "&order%5B0%5D%5Bdir%5D=desc&start=0&length=-1")
+
+    page = json.loads(_get(f"{base_url}/api/companies?{query}")[1])
+    assert page["recordsFiltered"] == 25 and len(page["data"]) == 10
+
+    headers, body = _get(f"{base_url}/api/companies.csv?{query}")
+    assert headers["Content-Type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(body)))
+    assert len(rows) == 25 and list(rows[0]) == ["name", "revenue"]
+    assert [int(r["revenue"]) for r in rows] == list(range(29000, 4000, -1000))
+
+
+def test_csv_export_of_no_rows_is_the_header():
+    class _Empty(_Store):
+        def query(self, **kwargs):
+            return np.arange(0)
+
+    store = _Empty()
+    assert "".join(serve.csv_export(store, {"fields": ["name"]})) == "name\r\n"
@@ -0,0 +1,50 @@
+import ast
+import csv
+import json
+
+import pytest
+
+from src.utils.snicode import parse_sni_list, run
+
+
+@pytest.mark.parametrize("cell", [
+    "['24100 Text', \"24310 Bolag's text\"]",
+    "[]",
+    "['62010 Dataprogrammering',]",
+    "['62010 Data, program']",
+])
+def test_fast_path_matches_literal_eval(cell):
+    assert parse_sni_list(cell) == ast.literal_eval(cell)
+
+
+def test_other_formats():
+    assert parse_sni_list(json.dumps(["62010 Dataprogrammering", "62020 Datakonsult"])) == \
+        ["62010 Dataprogrammering", "62020 Datakonsult"]
+    assert parse_sni_list("['a\\'b']") == ["a'b"]                      # escapes: literal_eval
+    assert parse_sni_list("[’62010 Dataprogrammering’]") == ["62010 Dataprogrammering"]  # regex fallback
+    assert parse_sni_list(None) == parse_sni_list("nan") == parse_sni_list("") == []
+
+
+def test_run_streams_deduped_tables_in_first_seen_order(tmp_path):
+    src = tmp_path / "companies.csv"
+    with open(src, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["org_number", "legal_name", "sni_codes"])
+        writer.writerow(["5560000002", "B AB", "['62020 Datakonsult', '62010 Dataprogrammering', '62020 Datakonsult']"])
+        writer.writerow(["5560000001", "A AB", json.dumps(["62010 Dataprogrammering", "47110 Livsmedel"])])
+        writer.writerow(["5560000003", "C AB", ""])
+    unique_out, map_out = tmp_path / "unique.csv", tmp_path / "map.csv"
+
+    run(src, unique_out, map_out)
+
+    with open(unique_out, newline="", encoding="utf-8") as f:
+        assert list(csv.reader(f)) == [
+            ["sni_code", "sni_description"],
+            ["62020", "Datakonsult"], ["62010", "Dataprogrammering"], ["47110", "Livsmedel"],
+        ]
+    with open(map_out, newline="", encoding="utf-8") as f:
+        assert [r[::2] for r in csv.reader(f)] == [
+            ["org_number", "sni_code"],
+            ["5560000002", "62020"], ["5560000002", "62010"],
+            ["5560000001", "62010"], ["5560000001", "47110"],
+        ]
@@ -0,0 +1,44 @@
+import csv
+
+import pandas as pd
+import pytest
+
+from src.utils.storage import convert, read_records, schema
+
+
+def test_csv_round_trip_keeps_values(tmp_path):
+    src, dst = tmp_path / "in.csv", tmp_path / "out.csv"
+    src.write_text(
+        'name,revenue,employees,emails\n'
+        'A AB,243,10-19,"[""info@a.se""]"\n'
+        'B AB,,3,[]\n',
+        encoding="utf-8",
+    )
+    rows = read_records(src)
+    assert rows[0]["revenue"] == 243 and rows[1]["revenue"] is None
+    assert rows[0]["employees"] == "10-19"
+    assert rows[0]["emails"] == ["info@a.se"]
+
+    convert(src, dst)
+    with open(dst, newline="", encoding="utf-8") as f:
+        out = list(csv.DictReader(f))
+    assert [r["revenue"] for r in out] == ["243", ""]
+    assert [r["employees"] for r in out] == ["10-19", "3"]
+
+
+def test_parquet_snapshot_keeps_employee_ranges(tmp_path):
+    pytest.importorskip("pyarrow")
+    src, dst = tmp_path / "in.csv", tmp_path / "out.parquet"
+    src.write_text(
+        'name,revenue,employees,emails\n'
+        'A AB,1 729 795,10-19,"[""info@a.se""]"\n'
+        'B AB,,3,[]\n',
+        encoding="utf-8",
+    )
+    convert(src, dst)
+    assert str(schema().field("employees").type) == "string"
+
+    rows = read_records(dst, columns=["name", "revenue", "employees", "emails"])
+    assert [r["employees"] for r in rows] == ["10-19", "3"]
+    assert rows[0]["revenue"] == 1729795 and pd.isna(rows[1]["revenue"])
+    assert rows[0]["emails"] == ["info@a.se"] and rows[1]["emails"] == []
@@ -0,0 +1,72 @@
+import pytest
+
+from src.scrape import website_search
+from src.scrape.search_for_website import WEBSITE_EXCLUSIONS
+from src.scrape.website_search import WebsiteSearch
+
+
+@pytest.fixture
+def providers(monkeypatch):
+    """
+    google and brave replaced by fakes answering from `answers[provider][name]`
+    (an exception is raised); every lookup is kept in `calls`.
+    """
+    fakes = {"calls": [], "answers": {"google": {}, "brave": {}}}
+
+    def fake(provider):
+        def lookup(name):
+            fakes["calls"].append((provider, name))
+            answer = fakes["answers"][provider].get(name, [])
+            if isinstance(answer, Exception):
+                raise answer
+            return answer
+        return lookup
+
+    for provider in ("google", "brave"):
+        monkeypatch.setitem(website_search.PROVIDERS, provider, (fake(provider), WEBSITE_EXCLUSIONS))
+    return fakes
+
+
+def _search(tmp_path, **quota):
+    return WebsiteSearch(providers=["google", "brave"], qps={"google": 1000.0, "brave": 1000.0},
+                         daily_quota={"google": None, "brave": None, **quota},
+                         cache_path=str(tmp_path / "search.sqlite"))
+
+
+def test_cached_links_save_the_call(providers, tmp_path):
+    providers["answers"]["google"]["AB 1"] = ["https://www.ab1.se/"]
+    search = _search(tmp_path)
+    assert search.search("AB 1") == "https://www.ab1.se/"
+    assert search.search("  ab   1 ") == "https://www.ab1.se/"   # same normalized query
+    # The cache is on disk, a new run doesn't ask again either
+    assert _search(tmp_path).search("AB 1") == "https://www.ab1.se/"
+
+    assert providers["calls"] == [("google", "AB 1")]
+    assert search.meter.counts[("google", "cache_hits")] == 1
+    assert "1 calls, 1 cache hits" in search.meter.summary()
+
+
+def test_used_up_quota_skips_the_provider(providers, tmp_path):
+    providers["answers"]["google"] = {"AB 1": ["https://www.ab1.se/"], "AB 2": ["https://www.ab2.se/"]}
+    providers["answers"]["brave"]["AB 2"] = ["https://ab2.brave.se/"]
+    search = _search(tmp_path, google=1)
+
+    assert search.search("AB 1") == "https://www.ab1.se/"
+    assert search.search("AB 2") == "https://ab2.brave.se/"
+    assert ("google", "AB 2") not in providers["calls"]
+    assert search.meter.counts[("google", "over_quota")] == 1
+    # The quota is per day, not per run
+    assert _search(tmp_path, google=1).links("google", "AB 3") is None
+
+
+def test_falls_back_when_a_provider_fails_or_finds_only_excluded_sites(providers, tmp_path):
+    providers["answers"]["google"] = {"AB 1": RuntimeError("blocked"), "AB 2": ["https://www.allabolag.se/foretag/ab-2"]}
+    providers["answers"]["brave"] = {"AB 1": ["https://www.ab1.se/"], "AB 2": ["https://www.ab2.se/"]}
+    search = _search(tmp_path)
+
+    assert search.search("AB 1") == "https://www.ab1.se/"
+    assert search.search("AB 2") == "https://www.ab2.se/"
+    assert search.search("AB 3") is None
+    assert search.meter.counts[("google", "failed")] == 1
+    assert providers["calls"] == [("google", "AB 1"), ("brave", "AB 1"), ("google", "AB 2"), ("brave", "AB 2"),
+                                  ("google", "AB 3"), ("brave", "AB 3")]
@@ -0,0 +1,241 @@
+from collections import Counter
+
+import pytest
+
+from src.utils.work_queue import RedisQueue, SqliteQueue, WatchError
+
+
+def _bound(b):
+    b = str(b)
+    return (float(b[1:]), True) if b.startswith("(") else (float(b), False)
+
+
+def _within(score, lo, hi):
+    (lo, lo_open), (hi, hi_open) = _bound(lo), _bound(hi)
+    return (score > lo if lo_open else score >= lo) and (score < hi if hi_open else score <= hi)
+
+
+class FakeRedis:
+    """
+    The commands RedisQueue uses, on dicts, with WATCH/MULTI/EXEC semantics.
+    `before_exec` is called once before the next EXEC, to play another client.
+    """
+    def __init__(self):
+        self.data = {}
+        self.versions = Counter()
+        self.before_exec = None
+
+    def _write(self, name, value):
+        self.versions[name] += 1
+        return self.data.setdefault(name, value)
+
+    def hexists(self, name, key):
+        return key in self.data.get(name, {})
+
+    def hset(self, name, key=None, value=None, mapping=None):
+        items = dict(mapping or {}, **({key: value} if key is not None else {}))
+        h = self._write(name, {})
+        added = sum(k not in h for k in items)
+        h.update({k: str(v) for k, v in items.items()})
+        return added
+
+    def hget(self, name, key):
+        return self.data.get(name, {}).get(key)
+
+    def hgetall(self, name):
+        return dict(self.data.get(name, {}))
+
+    def hscan_iter(self, name):
+        yield from list(self.data.get(name, {}).items())
+
+    def zadd(self, name, mapping):
+        self._write(name, {}).update({m: float(s) for m, s in mapping.items()})
+
+    def zrem(self, name, *members):
+        z = self._write(name, {})
+        return sum(z.pop(m, None) is not None for m in members)
+
+    def zscore(self, name, member):
+        return self.data.get(name, {}).get(member)
+
+    def zrangebyscore(self, name, lo, hi, start=0, num=None):
+        found = sorted((s, m) for m, s in self.data.get(name, {}).items() if _within(s, lo, hi))
+        found = [m for _, m in found][start:]
+        return found if num is None else found[:num]
+
+    def zcard(self, name):
+        return len(self.data.get(name, {}))
+
+    def zcount(self, name, lo, hi):
+        return sum(_within(s, lo, hi) for s in self.data.get(name, {}).values())
+
+    def sadd(self, name, *members):
+        s = self._write(name, set())
+        before = len(s)
+        s.update(members)
+        return len(s) - before
+
+    def srem(self, name, *members):
+        s = self._write(name, set())
+        before = len(s)
+        s.difference_update(members)
+        return before - len(s)
+
+    def smembers(self, name):
+        return set(self.data.get(name, set()))
+
+    def scard(self, name):
+        return len(self.data.get(name, set()))
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def close(self):
+        pass
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.reset()
+
+    def reset(self):
+        self.watched, self.queued = {}, None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.reset()
+
+    def watch(self, *names):
+        self.watched.update({n: self.client.versions[n] for n in names})
+
+    def multi(self):
+        self.queued = []
+
+    def execute(self):
+        hook, self.client.before_exec = self.client.before_exec, None
+        if hook:
+            hook()
+        try:
+            if any(self.client.versions[n] != v for n, v in self.watched.items()):
+                raise WatchError("watched key changed")
+            return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.queued or []]
+        finally:
+            self.reset()
+
+    def __getattr__(self, name):
+        command = getattr(self.client, name)
+
+        def call(*args, **kwargs):
+            if self.watched and self.queued is None:
+                return command(*args, **kwargs)  # immediate mode between WATCH and MULTI
+            if self.queued is None:
+                self.queued = []
+            self.queued.append((name, args, kwargs))
+            return self
+        return call
+
+
+OPTIONS = {"visibility_timeout": 10, "max_attempts": 3, "retry_delay": 5}
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def queue(request, tmp_path):
+    if request.param == "sqlite":
+        q = SqliteQueue(str(tmp_path / "queue.sqlite"), **OPTIONS)
+    else:
+        q = RedisQueue(client=FakeRedis(), **OPTIONS)
+    yield q
+    q.close()
+
+
+def _counts(queue):
+    return queue.counts()["profile"]
+
+
+def test_put_is_idempotent(queue):
+    assert queue.put("profile", "1", {"name": "AB 1"})
+    assert not queue.put("profile", "1", {"name": "AB 1 igen"})
+    [job] = queue.lease(["profile"], now=0)
+    assert job.payload == {"name": "AB 1"} and job.attempts == 1
+
+
+def test_expired_lease_is_taken_over_and_late_complete_does_not_reopen(queue):
+    queue.put("profile", "1", {})
+    [first] = queue.lease(["profile"], now=0)
+    assert queue.lease(["profile"], now=5) == []
+
+    [second] = queue.lease(["profile"], now=11)
+    assert second.attempts == 2 and second.lease != first.lease
+
+    queue.complete(first, {"by": "first"})
+    queue.fail(second, "too late", now=12)   # its lease went with the completion
+    queue.complete(second, {"by": "second"})
+    queue.complete(second, {"by": "second"})
+
+    assert queue.lease(["profile"], now=1000) == []
+    assert _counts(queue) == {"ready": 0, "leased": 0, "done": 1, "failed": 0}
+    assert list(queue.results("profile")) == [("1", {"by": "second"})]
+
+
+def test_failed_job_is_retried_after_backoff_then_marked_failed(queue):
+    queue.put("profile", "1", {})
+    [job] = queue.lease(["profile"], now=0)
+    queue.fail(job, "timeout", now=1)
+    assert queue.lease(["profile"], now=5) == []      # backoff 5s from t=1
+
+    [job] = queue.lease(["profile"], now=6)
+    assert job.attempts == 2
+    queue.fail(job, "timeout", now=7)                 # backoff 10s
+    [job] = queue.lease(["profile"], now=17)
+    assert job.attempts == 3
+    queue.fail(job, "timeout", now=18)
+
+    assert queue.lease(["profile"], now=1000) == []
+    assert _counts(queue) == {"ready": 0, "leased": 0, "done": 0, "failed": 1}
+
+
+def test_job_whose_leases_keep_expiring_is_marked_failed(queue):
+    queue.put("profile", "1", {})
+    for now in (0, 11, 22):
+        assert len(queue.lease(["profile"], now=now)) == 1
+    assert queue.lease(["profile"], now=33) == []
+    assert _counts(queue)["failed"] == 1
+
+
+def test_redis_lease_racing_a_complete_is_retried():
+    client = FakeRedis()
+    queue = RedisQueue(client=client, **OPTIONS)
+    queue.put("profile", "1", {})
+    [stale] = queue.lease(["profile"], now=0)
+
+    # The first worker finishes between the second one's reads and its EXEC
+    client.before_exec = lambda: queue.complete(stale, {"by": "first"})
+    assert queue.lease(["profile"], now=11) == []
+
+    assert client.zcard("foretagskollen:queue:open:profile") == 0
+    assert client.hget("foretagskollen:queue:job:profile:1", "status") == "done"
+    assert _counts(queue) == {"ready": 0, "leased": 0, "done": 1, "failed": 0}
+
+
+def test_redis_put_racing_another_put_enqueues_once():
+    client = FakeRedis()
+    queue = RedisQueue(client=client, **OPTIONS)
+    # Another worker puts the same job between this put's check and its EXEC
+    client.before_exec = lambda: queue.put("profile", "1", {"by": "other"})
+    assert not queue.put("profile", "1", {"by": "this"})
+
+    [job] = queue.lease(["profile"], now=0)
+    assert job.payload == {"by": "other"}
+    assert client.zcard("foretagskollen:queue:open:profile") == 1
+
+
+def test_redis_put_requeues_a_record_that_never_got_queued():
+    # What a crash between the two steps of the old put left behind
+    client = FakeRedis()
+    client.hset("foretagskollen:queue:job:profile:1", "payload", "{}")
+    queue = RedisQueue(client=client, **OPTIONS)
+    assert queue.put("profile", "1", {"name": "AB 1"})
+    assert queue.lease(["profile"], now=0)[0].payload == {"name": "AB 1"}